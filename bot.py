@@ -5,6 +5,15 @@ from pyrogram.raw.all import layer
 from config import Config
 from aiohttp import web
 from route import web_server
+from helper.broadcast import broadcaster
+from helper.metadata import metadata_service
+from helper.metrics import monitor_loop_lag
+from helper.database import DvisPappa
+from helper.downloader import close_session_pools
+from helper.storage import sweep_orphans, sweep_periodically
+from helper.job_queue import shared_queue, has_local_capacity
+from helper.journal import journal, resumable_workspaces
+import asyncio
 import pyrogram.utils
 
 # Kuch utility values set kar rahe hain
@@ -13,14 +22,18 @@ pyrogram.utils.MIN_CHANNEL_ID = -1009999999999
 
 class Bot(Client):
     def __init__(self):
+        # Worker ko updates nahi chahiye (woh frontend ke paas aate hain), aur har worker ka apna session
+        worker = Config.ROLE == "worker"
         super().__init__(
-            name="renamer",
+            name=f"renamer_{shared_queue.owner}" if worker else "renamer",
             api_id=Config.API_ID,
             api_hash=Config.API_HASH,
             bot_token=Config.BOT_TOKEN,
             workers=200,
             plugins={"root": "plugins"},
             sleep_threshold=15,
+            no_updates=worker,
+            in_memory=worker,
         )
 
     async def start(self):
@@ -35,6 +48,29 @@ class Bot(Client):
             await app_runner.setup()
             await web.TCPSite(app_runner, "0.0.0.0", 8080).start()
         print(f"{me.first_name} Is Started.....✨️")
+        asyncio.create_task(monitor_loop_lag())
+        if DvisPappa.writes is not None:
+            DvisPappa.writes.start()
+        try:
+            await DvisPappa.ensure_indexes()
+        except Exception as e:
+            print(f"Index Error: {e}")
+        # Pichle run ke partial downloads hata do (journal wale adhure jobs ki directories chhod kar), phir timer par sweep
+        unfinished = await journal.unfinished()
+        sweep_orphans(keep=resumable_workspaces(unfinished))
+        asyncio.create_task(sweep_periodically(Config.SWEEP_INTERVAL, Config.SWEEP_MIN_AGE))
+        if Config.ROLE == "worker":
+            # Updates nahi aate, kaam sirf shared Mongo queue se
+            from plugins.file_rename import run_shared_job
+            asyncio.create_task(shared_queue.run_worker(self, run_shared_job, has_local_capacity))
+        else:
+            # Known user IDs memory mein, taaki har message par add_user ko Mongo na jana pade
+            asyncio.create_task(DvisPappa.load_known_users())
+            # Restart se pehle adhura broadcast reh gaya ho to checkpoint se resume karo
+            asyncio.create_task(broadcaster.resume(self))
+            if unfinished:
+                from plugins.file_rename import resume_jobs
+                asyncio.create_task(resume_jobs(self, unfinished))
         for admin_id in Config.ADMIN:
             try:
                 await self.send_message(Config.LOG_CHANNEL, f"**{me.first_name} Is Started.....✨️**")
@@ -54,7 +90,12 @@ class Bot(Client):
 
     async def stop(self):
         # Override stop() to ensure ye async coroutine return kare
+        await close_session_pools()
         await super().stop()
+        # Buffer mein pade settings/new users Mongo tak pahunchne chahiye
+        if DvisPappa.writes is not None:
+            await DvisPappa.writes.stop()
+        metadata_service.shutdown()
 
 if __name__ == "__main__":
     Bot().run()
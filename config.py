@@ -10,7 +10,103 @@ class Config(object):
     # database config
     DB_NAME = os.environ.get("DB_NAME","DvisPappa")     
     DB_URL  = os.environ.get("DB_URL","")
+
+    # user settings cache config
+    SETTINGS_CACHE_SIZE = int(os.environ.get("SETTINGS_CACHE_SIZE", "10000"))
+    SETTINGS_CACHE_TTL  = int(os.environ.get("SETTINGS_CACHE_TTL", "300"))
+
+    # write-behind: settings updates aur naye users buffer hokar bulk_write mein jate hain
+    WRITE_BEHIND        = os.environ.get("WRITE_BEHIND", "True").lower() in ("true", "1", "yes")
+    WRITE_BATCH_SIZE    = int(os.environ.get("WRITE_BATCH_SIZE", "500"))
+    WRITE_FLUSH_INTERVAL = float(os.environ.get("WRITE_FLUSH_INTERVAL", "1"))
  
+    # rename queue config
+    MAX_CONCURRENT_DOWNLOADS = int(os.environ.get("MAX_CONCURRENT_DOWNLOADS", "5"))
+    MAX_CONCURRENT_UPLOADS   = int(os.environ.get("MAX_CONCURRENT_UPLOADS", "5"))
+    PER_USER_JOBS            = int(os.environ.get("PER_USER_JOBS", "0"))   # 0 = pipeline mein download + upload depth, warna 1
+    QUEUE_REFRESH_INTERVAL   = int(os.environ.get("QUEUE_REFRESH_INTERVAL", "10"))
+
+    # priority lanes: chhoti files ke liye har stage mein reserved slots, badi files ke liye bounded hissa;
+    # lane ke andar chhota job pehle, aur har second ke wait par JOB_AGING_RATE bytes ki chhoot (starvation nahi)
+    SMALL_FILE_SIZE     = int(os.environ.get("SMALL_FILE_SIZE", str(50 * 1024 * 1024)))
+    LARGE_FILE_SIZE     = int(os.environ.get("LARGE_FILE_SIZE", str(1024 * 1024 * 1024)))
+    SMALL_LANE_RESERVED = int(os.environ.get("SMALL_LANE_RESERVED", "1"))
+    LARGE_LANE_SLOTS    = int(os.environ.get("LARGE_LANE_SLOTS", "0"))    # 0 = har stage ke aadhe slots
+    JOB_AGING_RATE      = int(os.environ.get("JOB_AGING_RATE", str(10 * 1024 * 1024)))
+
+    # pipelined mode: user ki agli file ka download pichli file ke upload ke saath chalta hai
+    PIPELINE_MODE           = os.environ.get("PIPELINE_MODE", "True").lower() in ("true", "1", "yes")
+    PIPELINE_DOWNLOAD_DEPTH = int(os.environ.get("PIPELINE_DOWNLOAD_DEPTH", "1"))
+    PIPELINE_UPLOAD_DEPTH   = int(os.environ.get("PIPELINE_UPLOAD_DEPTH", "1"))
+
+    # naam/type/thumbnail same ho to file_id se hi dobara bhej do (no download/upload)
+    FAST_PATH = os.environ.get("FAST_PATH", "True").lower() in ("true", "1", "yes")
+
+    # is size (bytes) se chhoti files disk ki jagah RAM mein, total RAM budget ke andar
+    IN_MEMORY_THRESHOLD = int(os.environ.get("IN_MEMORY_THRESHOLD", str(20 * 1024 * 1024)))
+    IN_MEMORY_BUDGET    = int(os.environ.get("IN_MEMORY_BUDGET", str(256 * 1024 * 1024)))
+
+    # disk admission: itni jagah hamesha khali rakho; DOWNLOAD_QUOTA > 0 ho to wahi capacity
+    DISK_FREE_MARGIN    = int(os.environ.get("DISK_FREE_MARGIN", str(512 * 1024 * 1024)))
+    DOWNLOAD_QUOTA      = int(os.environ.get("DOWNLOAD_QUOTA", "0"))
+    SWEEP_INTERVAL      = int(os.environ.get("SWEEP_INTERVAL", "600"))
+    SWEEP_MIN_AGE       = int(os.environ.get("SWEEP_MIN_AGE", "3600"))
+
+    # download engine: "default" (pyrogram stream) ya "parallel" (kai connections se chunks)
+    DOWNLOAD_ENGINE      = os.environ.get("DOWNLOAD_ENGINE", "default").lower()
+    DOWNLOAD_PARALLELISM = int(os.environ.get("DOWNLOAD_PARALLELISM", "4"))
+    PARALLEL_MIN_SIZE    = int(os.environ.get("PARALLEL_MIN_SIZE", str(100 * 1024 * 1024)))
+    # upload engine: "default" (pyrogram ke send_*) ya "parallel" (SaveBigFilePart kai sessions se)
+    UPLOAD_ENGINE        = os.environ.get("UPLOAD_ENGINE", "default").lower()
+    UPLOAD_PARALLELISM   = int(os.environ.get("UPLOAD_PARALLELISM", "4"))
+
+    # batch mode: ek user ki burst mein aayi files (ya album) ek session mein, episode order mein
+    BATCH_MODE      = os.environ.get("BATCH_MODE", "True").lower() in ("true", "1", "yes")
+    BATCH_WINDOW    = float(os.environ.get("BATCH_WINDOW", "2"))
+    BATCH_MAX_WAIT  = float(os.environ.get("BATCH_MAX_WAIT", "10"))
+    BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "50"))
+
+    # in-flight job registry: itne seconds tak koi state change na ho to entry expire
+    JOB_TTL           = int(os.environ.get("JOB_TTL", str(6 * 3600)))
+    JOB_REGISTRY_SIZE = int(os.environ.get("JOB_REGISTRY_SIZE", "10000"))
+
+    # multi-instance: "all" (ek hi process), "frontend" (sirf updates -> Mongo queue), "worker" (queue se jobs)
+    ROLE              = os.environ.get("ROLE", "all").lower()
+    WORKER_ID         = os.environ.get("WORKER_ID", "")
+    JOB_LEASE         = int(os.environ.get("JOB_LEASE", "120"))
+    JOB_HEARTBEAT     = int(os.environ.get("JOB_HEARTBEAT", "30"))
+    JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "2"))
+    JOB_MAX_ATTEMPTS  = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+    JOB_HISTORY_TTL   = int(os.environ.get("JOB_HISTORY_TTL", str(7 * 24 * 3600)))
+
+    # job journal: har job ka stage Mongo mein, restart/crash ke baad adhure jobs resume
+    JOURNAL                   = os.environ.get("JOURNAL", "True").lower() in ("true", "1", "yes")
+    JOURNAL_PROGRESS_INTERVAL = int(os.environ.get("JOURNAL_PROGRESS_INTERVAL", "15"))
+    RESTART_DRAIN_TIMEOUT     = int(os.environ.get("RESTART_DRAIN_TIMEOUT", "300"))
+
+    # processed thumbnails ka disk cache (MB)
+    THUMB_CACHE_MB = int(os.environ.get("THUMB_CACHE_MB", "100"))
+
+    # hachoir metadata worker pool ("process" ya "thread") aur header read size
+    METADATA_POOL       = os.environ.get("METADATA_POOL", "process").lower()
+    METADATA_WORKERS    = int(os.environ.get("METADATA_WORKERS", "2"))
+    METADATA_HEAD_BYTES = int(os.environ.get("METADATA_HEAD_BYTES", str(4 * 1024 * 1024)))
+
+    # progress edits: per chat min gap (seconds) aur poore bot ke edits/second
+    PROGRESS_CHAT_INTERVAL = float(os.environ.get("PROGRESS_CHAT_INTERVAL", "5"))
+    PROGRESS_GLOBAL_RATE   = float(os.environ.get("PROGRESS_GLOBAL_RATE", "20"))
+
+    # broadcast config (Telegram bulk limit ~30 msg/s)
+    BROADCAST_CONCURRENCY     = int(os.environ.get("BROADCAST_CONCURRENCY", "10"))
+    BROADCAST_RATE            = float(os.environ.get("BROADCAST_RATE", "25"))
+    BROADCAST_BATCH_SIZE      = int(os.environ.get("BROADCAST_BATCH_SIZE", "500"))
+    BROADCAST_STATUS_INTERVAL = int(os.environ.get("BROADCAST_STATUS_INTERVAL", "10"))
+
+    # force-sub membership cache (seconds)
+    FSUB_POSITIVE_TTL = int(os.environ.get("FSUB_POSITIVE_TTL", "600"))
+    FSUB_NEGATIVE_TTL = int(os.environ.get("FSUB_NEGATIVE_TTL", "15"))
+    FSUB_CACHE_SIZE   = int(os.environ.get("FSUB_CACHE_SIZE", "50000"))
+
     # other configs
     BOT_UPTIME  = time.time()
     START_PIC   = os.environ.get("START_PIC", "https://files.catbox.moe/4kwe69.jpg")
@@ -0,0 +1,125 @@
+import asyncio, logging
+from contextlib import asynccontextmanager
+from config import Config
+from .filename_parser import parse_filename
+
+logger = logging.getLogger(__name__)
+
+
+def media_name(msg):
+    media = msg.document or msg.video or msg.audio
+    return (media.file_name if media else None) or ""
+
+
+def episode_key(msg):
+    # Batch ka order: season, phir episode; jinka episode na mile woh aakhir mein
+    info = parse_filename(media_name(msg))
+    season = int(info.season) if info.season else 0
+    episode = int(info.episode) if info.episode else float("inf")
+    return season, episode
+
+
+class OrderedGate:
+    # Batch ki files kisi bhi order mein download hon, bhejna index ke order mein hi hota hai
+
+    def __init__(self):
+        self.next = 0
+        self._finished = set()
+        self._cond = asyncio.Condition()
+
+    async def wait(self, index):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.next >= index)
+
+    @asynccontextmanager
+    async def turn(self, index):
+        await self.wait(index)
+        yield
+
+    async def finish(self, index):
+        # Har index ke liye kam se kam ek baar, chahe file fail hi kyun na ho, warna agli files atak jayengi.
+        # Dobara finish karna safe hai
+        async with self._cond:
+            if index < self.next:
+                return
+            self._finished.add(index)
+            while self.next in self._finished:
+                self._finished.discard(self.next)
+                self.next += 1
+            self._cond.notify_all()
+
+
+class RenameBatch:
+    # Ek user ki burst: ek settings snapshot, ek status message, ek thumbnail
+
+    def __init__(self, uid, msgs, settings):
+        self.uid = uid
+        self.msgs = msgs
+        self.settings = settings
+        self.status_msg = None
+        self.thumb = (None, None)       # (cache key, path) custom thumbnail ka
+        self.gate = OrderedGate()         # upload ka order
+        self.disk_gate = OrderedGate()    # disk reservation ka order
+        self.done = 0
+
+    @property
+    def total(self):
+        return len(self.msgs)
+
+    def label(self, index):
+        return f"[{index + 1}/{self.total}] "
+
+
+class BatchCollector:
+    # Same user ki `window` seconds ke andar aayi files (aur album ke saare parts) ek saath flush hoti hain.
+    # Har nayi file window aage badhati hai, lekin `max_wait` ke baad ya `max_files` par flush ho hi jaata hai.
+
+    def __init__(self, window, max_files, max_wait, on_flush=None):
+        self.window = window
+        self.max_files = max_files
+        self.max_wait = max_wait
+        self.on_flush = on_flush        # async callable(client, uid, msgs)
+        self._pending = {}              # uid -> [msgs, first_seen, timer, client]
+        self._tasks = set()
+        self.batches = 0
+
+    def add(self, client, uid, msg):
+        loop = asyncio.get_running_loop()
+        entry = self._pending.get(uid)
+        if entry is None:
+            entry = self._pending[uid] = [[], loop.time(), None, client]
+        msgs = entry[0]
+        msgs.append(msg)
+        if entry[2]:
+            entry[2].cancel()
+
+        # Album ke parts ek hi batch mein rahein, chahe max_files bhar gaya ho
+        album = msg.media_group_id
+        if len(msgs) >= self.max_files and not album:
+            return self._flush(uid)
+        delay = min(self.window, max(0, entry[1] + self.max_wait - loop.time()))
+        entry[2] = loop.call_later(delay, self._flush, uid)
+
+    def _flush(self, uid):
+        entry = self._pending.pop(uid, None)
+        if not entry:
+            return
+        if entry[2]:
+            entry[2].cancel()
+        self.batches += 1
+        task = asyncio.create_task(self._run(entry[3], uid, entry[0]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, client, uid, msgs):
+        try:
+            await self.on_flush(client, uid, msgs)
+        except Exception as e:
+            logger.error(f"Batch flush failed for {uid} : {e}")
+
+    @property
+    def waiting(self):
+        return sum(len(entry[0]) for entry in self._pending.values())
+
+
+batch_collector = BatchCollector(Config.BATCH_WINDOW, Config.BATCH_MAX_FILES, Config.BATCH_MAX_WAIT)
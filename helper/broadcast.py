@@ -0,0 +1,151 @@
+import asyncio, datetime, logging, time
+from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
+from config import Config
+from .database import DvisPappa
+from .ratelimit import TokenBucket
+from .metrics import FLOOD_WAITS
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    # N senders ek global token bucket ke peeche, dead users batch mein delete,
+    # aur har batch ke baad Mongo mein checkpoint taaki restart ke baad resume ho sake
+
+    def __init__(self, db, concurrency, rate, batch_size, status_interval):
+        self.db = db
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate)
+        self.batch_size = batch_size
+        self.status_interval = status_interval
+        self.running = False
+        self._task = None
+
+    def launch(self, broadcast_msg, sts_msg):
+        self._task = asyncio.create_task(self.start(broadcast_msg, sts_msg))
+        return self._task
+
+    async def send_msg(self, user_id, message):
+        while True:
+            await self.bucket.acquire()
+            try:
+                await message.copy(chat_id=int(user_id))
+                return 200
+            except FloodWait as e:
+                # Sabhi senders ruk jayein, phir isi user ko dobara try karo
+                FLOOD_WAITS.inc(source="broadcast")
+                self.bucket.pause(e.value)
+                await asyncio.sleep(e.value)
+            except InputUserDeactivated:
+                logger.info(f"{user_id} : Deactivated")
+                return 400
+            except UserIsBlocked:
+                logger.info(f"{user_id} : Blocked The Bot")
+                return 400
+            except PeerIdInvalid:
+                logger.info(f"{user_id} : User ID Invalid")
+                return 400
+            except Exception as e:
+                logger.error(f"{user_id} : {e}")
+                return 500
+
+    async def _send_batch(self, ids, message, ck):
+        dead = []
+        pending = iter(ids)
+
+        async def sender():
+            for user_id in pending:
+                sts = await self.send_msg(user_id, message)
+                if sts == 200:
+                    ck['success'] += 1
+                else:
+                    ck['failed'] += 1
+                if sts == 400:
+                    dead.append(user_id)
+                ck['done'] += 1
+
+        await asyncio.gather(*(sender() for _ in range(min(self.concurrency, len(ids)))))
+        return dead
+
+    async def _status_loop(self, sts_msg, ck):
+        last = None
+        while True:
+            await asyncio.sleep(self.status_interval)
+            text = f"Broadcast In Progress: \n\nTotal Users {ck['total']} \nCompleted : {ck['done']} / {ck['total']}\nSuccess : {ck['success']}\nFailed : {ck['failed']}"
+            if text != last:
+                try:
+                    await sts_msg.edit(text)
+                    last = text
+                except Exception:
+                    pass
+
+    async def run(self, broadcast_msg, sts_msg, ck):
+        status = asyncio.create_task(self._status_loop(sts_msg, ck))
+        try:
+            cursor = await self.db.get_all_user_ids(after=ck['last_id'])
+            while True:
+                batch = await cursor.to_list(length=self.batch_size)
+                if not batch:
+                    break
+                ids = [user['_id'] for user in batch]
+                dead = await self._send_batch(ids, broadcast_msg, ck)
+                if dead:
+                    await self.db.delete_users(dead)
+                ck['last_id'] = ids[-1]
+                await self.db.save_broadcast_checkpoint(ck)
+        finally:
+            status.cancel()
+        await self.db.clear_broadcast_checkpoint()
+        completed_in = datetime.timedelta(seconds=int(time.time() - ck['started']))
+        rate = ck['done'] / max(time.time() - ck['started'], 1)
+        await sts_msg.edit(f"Bʀᴏᴀᴅᴄᴀꜱᴛ Cᴏᴍᴩʟᴇᴛᴇᴅ: \nCᴏᴍᴩʟᴇᴛᴇᴅ Iɴ `{completed_in}`.\n\nTotal Users {ck['total']}\nCompleted: {ck['done']} / {ck['total']}\nSuccess: {ck['success']}\nFailed: {ck['failed']}\nSpeed: {rate:.1f} msg/s")
+
+    async def start(self, broadcast_msg, sts_msg):
+        try:
+            # Flag usi try mein jiska finally use hatata hai, warna Mongo error par running atka rehta
+            self.running = True
+            ck = {
+                'chat_id': broadcast_msg.chat.id,
+                'message_id': broadcast_msg.id,
+                'status_chat_id': sts_msg.chat.id,
+                'last_id': None,
+                'done': 0,
+                'success': 0,
+                'failed': 0,
+                'total': await self.db.total_users_count(),
+                'started': time.time(),
+            }
+            await self.db.save_broadcast_checkpoint(ck)
+            await self.run(broadcast_msg, sts_msg, ck)
+        finally:
+            self.running = False
+
+    async def resume(self, client):
+        # Restart ke baad adhura broadcast checkpoint se aage chalao
+        if self.running:
+            return
+        try:
+            self.running = True
+            ck = await self.db.get_broadcast_checkpoint()
+            if not ck:
+                return
+            try:
+                broadcast_msg = await client.get_messages(ck['chat_id'], ck['message_id'])
+                if broadcast_msg.empty:
+                    raise ValueError("broadcast message deleted")
+                sts_msg = await client.send_message(ck['status_chat_id'], f"Broadcast Resumed From Checkpoint..! \n\nCompleted : {ck['done']} / {ck['total']}")
+            except Exception as e:
+                logger.error(f"Broadcast resume failed : {e}")
+                return await self.db.clear_broadcast_checkpoint()
+            await self.run(broadcast_msg, sts_msg, ck)
+        finally:
+            self.running = False
+
+
+broadcaster = Broadcaster(
+    DvisPappa,
+    Config.BROADCAST_CONCURRENCY,
+    Config.BROADCAST_RATE,
+    Config.BROADCAST_BATCH_SIZE,
+    Config.BROADCAST_STATUS_INTERVAL,
+)
@@ -1,73 +1,481 @@
+import time, asyncio, logging
 import motor.motor_asyncio
+from datetime import datetime
+from pymongo import ReturnDocument, UpdateOne
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import islice
 from config import Config
 from .utils import send_log
+from .template import compile_filename_template, compile_caption_template
+from .metrics import Gauge
+from .dbaudit import CountingCollection
+
+logger = logging.getLogger(__name__)
+
+
+class UserSettings:
+    # Poore user document ka compact snapshot, ek hi find_one se bana hua
+    # format/caption templates ke compiled tokens bhi yahin cache hote hain
+    __slots__ = ("id", "file_id", "thumb_unique_id", "caption", "format_template", "media_type",
+                 "format_tokens", "caption_tokens")
+    # find_one mein sirf yahi fields aati hain, document mein kuch aur pada ho to bhi
+    PROJECTION = {"_id": 1, "file_id": 1, "thumb_unique_id": 1, "caption": 1, "format_template": 1, "media_type": 1}
+
+    def __init__(self, doc):
+        self.id = doc["_id"]
+        self.file_id = doc.get("file_id")
+        self.thumb_unique_id = doc.get("thumb_unique_id")
+        self.media_type = doc.get("media_type")
+        self.update({"format_template": doc.get("format_template"), "caption": doc.get("caption")})
+
+    def update(self, fields, format_tokens=None):
+        # format_tokens: caller ne template pehle hi compile kar liya ho to wahi rakho, dobara compile nahi
+        for key, value in fields.items():
+            if key in self.__slots__:
+                setattr(self, key, value)
+        if "format_template" in fields:
+            if format_tokens is None and self.format_template:
+                format_tokens = compile_filename_template(self.format_template)
+            self.format_tokens = format_tokens if self.format_template else None
+        if "caption" in fields:
+            self.caption_tokens = compile_caption_template(self.caption) if self.caption else None
+
+
+class TTLCache:
+    # Bounded LRU cache, har entry `ttl` seconds ke baad expire ho jati hai
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key):
+        # Counters ko chhede bina value dekhna (write-through ke liye)
+        entry = self._data.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key):
+        entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+class KnownUsers:
+    # Startup par saare user IDs ek sorted int64 array mein (8 bytes/user),
+    # uske baad ke inserts/deletes chhote sets mein. Load hone tak Mongo fallback.
+
+    COMPACT_AT = 100000
+
+    def __init__(self):
+        self.loaded = False
+        self._base = array('q')
+        self._added = set()
+        self._removed = set()
+
+    def load(self, ids):
+        base = array('q', sorted(ids))
+        # Load ke dauraan hue changes sets mein pehle se hain, woh barkaraar rehte hain
+        self._base = base
+        self._added = {i for i in self._added if not self._in_base(i)}
+        self.loaded = True
+
+    def _in_base(self, uid):
+        i = bisect_left(self._base, uid)
+        return i < len(self._base) and self._base[i] == uid
+
+    def __contains__(self, uid):
+        if uid in self._added:
+            return True
+        if uid in self._removed:
+            return False
+        return self._in_base(uid)
+
+    def add(self, uid):
+        self._removed.discard(uid)
+        if not self._in_base(uid):
+            self._added.add(uid)
+            if len(self._added) >= self.COMPACT_AT:
+                self._compact()
+
+    def discard(self, uid):
+        self._added.discard(uid)
+        if self._in_base(uid):
+            self._removed.add(uid)
+
+    def _compact(self):
+        ids = set(self._base)
+        ids.difference_update(self._removed)
+        ids.update(self._added)
+        self._base = array('q', sorted(ids))
+        self._added.clear()
+        self._removed.clear()
+
+    def __len__(self):
+        return len(self._base) + len(self._added) - len(self._removed)
+
+
+class WriteBehind:
+    # User collection ke writes memory mein jama hote hain, ek user ke saare changes ek op mein,
+    # aur har `interval` seconds ya `max_size` users hone par ek unordered bulk_write.
+    # Reads settings cache + overlay() se hote hain, isliye flush se pehle bhi apna likha dikhta hai.
+    # Crash par max ek interval ke writes ja sakte hain; normal stop par flush() sab likh deta hai.
+
+    def __init__(self, collection, max_size, interval):
+        self.collection = collection
+        self.max_size = max_size
+        self.interval = interval
+        self.flushed = 0
+        self._pending = {}      # uid -> {'$set': {...}, '$setOnInsert': {...}}
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._kick = None
+
+    def update(self, uid, fields):
+        self._merge(uid, fields=fields)
+        self._maybe_flush()
+
+    def insert(self, uid, fields):
+        self._merge(uid, insert=fields)
+        self._maybe_flush()
+
+    def _merge(self, uid, fields=None, insert=None):
+        ops = self._pending.setdefault(uid, {})
+        if insert is not None:
+            ops['$setOnInsert'] = {k: v for k, v in insert.items() if k not in ops.get('$set', {})}
+        if fields:
+            ops.setdefault('$set', {}).update(fields)
+            # Ek hi field $set aur $setOnInsert dono mein ho to Mongo conflict deta hai, $set jeetega
+            for key in fields:
+                ops.get('$setOnInsert', {}).pop(key, None)
+
+    def discard(self, uid):
+        self._pending.pop(uid, None)
+
+    def overlay(self, uid, doc):
+        # Mongo se aaya doc (ya None) + abhi tak na likhe gaye changes
+        ops = self._pending.get(uid)
+        if not ops:
+            return doc
+        if doc is None:
+            if '$setOnInsert' not in ops:
+                return None     # update_one upsert nahi karta, user hai hi nahi
+            doc = dict(ops['$setOnInsert'], _id=uid)
+        return dict(doc, **ops.get('$set', {}))
+
+    def _maybe_flush(self):
+        if len(self._pending) >= self.max_size and (self._kick is None or self._kick.done()):
+            self._kick = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        async with self._lock:
+            while self._pending:
+                batch = {uid: self._pending.pop(uid) for uid in list(islice(self._pending, self.max_size))}
+                requests = [UpdateOne({'_id': uid}, ops, upsert='$setOnInsert' in ops) for uid, ops in batch.items()]
+                try:
+                    await self.collection.bulk_write(requests, ordered=False)
+                except Exception as e:
+                    for uid, ops in batch.items():
+                        self._requeue(uid, ops)
+                    logger.warning(f"Write-behind flush of {len(batch)} users failed, will retry : {e}")
+                    return
+                self.flushed += len(batch)
+
+    async def flush_user(self, uid):
+        # Dusra process (shared queue worker) is user ki settings Mongo se padhega, uske pending writes abhi likho.
+        # Lock isliye ki chal raha bulk_write (jisme yeh user pehle hi nikal chuka ho) bhi khatam ho jaye
+        async with self._lock:
+            ops = self._pending.pop(uid, None)
+            if not ops:
+                return
+            try:
+                await self.collection.update_one({'_id': uid}, ops, upsert='$setOnInsert' in ops)
+            except Exception:
+                self._requeue(uid, ops)
+                raise
+            self.flushed += 1
+
+    def _requeue(self, uid, ops):
+        # Fail hua write wapas buffer mein, is beech aaye naye changes upar se
+        newer = self._pending.pop(uid, {})
+        self._merge(uid, ops.get('$set'), ops.get('$setOnInsert'))
+        self._merge(uid, newer.get('$set'), newer.get('$setOnInsert'))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def __len__(self):
+        return len(self._pending)
+
 
 class Database:
 
     def __init__(self, uri, database_name):
         self._client = motor.motor_asyncio.AsyncIOMotorClient(uri)
         self.DvisPappa = self._client[database_name]
-        self.col = self.DvisPappa.user
+        self.col = CountingCollection(self.DvisPappa.user, "user")
+        self.broadcast = CountingCollection(self.DvisPappa.broadcast, "broadcast")
+        self.jobs = CountingCollection(self.DvisPappa.rename_jobs, "rename_jobs")
+        self.settings_cache = TTLCache(Config.SETTINGS_CACHE_SIZE, Config.SETTINGS_CACHE_TTL)
+        self.known_users = KnownUsers()
+        self.writes = WriteBehind(self.col, Config.WRITE_BATCH_SIZE, Config.WRITE_FLUSH_INTERVAL) if Config.WRITE_BEHIND else None
+
+    async def ensure_indexes(self):
+        # Startup par ek baar; index pehle se ho to Mongo kuch nahi karta
+        # user collection ki saari queries _id par hain, uska index default hota hai
+        await self.jobs.create_index([('state', 1), ('lease_until', 1)], name='claim')
+        await self.jobs.create_index([('state', 1), ('created', 1)], name='state_created')
+        # Khatam jobs ki history apne aap saaf ho
+        await self.jobs.create_index('finished_at', name='history_ttl', expireAfterSeconds=Config.JOB_HISTORY_TTL)
+
+    async def load_known_users(self):
+        ids = []
+        cursor = await self.get_all_user_ids()
+        async for user in cursor:
+            ids.append(user['_id'])
+        self.known_users.load(ids)
 
     def new_user(self, id):
         return dict(
-            _id=int(id),                                   
+            _id=int(id),
             file_id=None,
             caption=None,
             format_template=None  # Add this line for the format template
         )
 
+    async def get_user_settings(self, id, fresh=False):
+        # fresh=True: cache aur known-users dono skip (worker process ke liye, jahan settings
+        # ya naye users dusre process ne likhe hain)
+        id = int(id)
+        settings = None if fresh else self.settings_cache.get(id)
+        if settings is not None:
+            return settings
+        if not fresh and self.known_users.loaded and id not in self.known_users:
+            return None
+        user = await self.col.find_one({'_id': id}, UserSettings.PROJECTION)
+        if self.writes is not None:
+            user = self.writes.overlay(id, user)
+        if not user:
+            return None
+        settings = UserSettings(user)
+        self.settings_cache.set(id, settings)
+        return settings
+
+    async def sync_user(self, id):
+        # Write-behind on ho to is user ke buffered writes Mongo tak pahuncha do
+        if self.writes is not None:
+            await self.writes.flush_user(int(id))
+
+    async def _update_settings(self, id, fields, format_tokens=None):
+        id = int(id)
+        if self.writes is not None:
+            self.writes.update(id, fields)
+        else:
+            await self.col.update_one({'_id': id}, {'$set': fields})
+        # Write-through: cached snapshot ko bhi update kar do
+        settings = self.settings_cache.peek(id)
+        if settings is not None:
+            settings.update(fields, format_tokens)
+
     async def add_user(self, b, m):
         u = m.from_user
-        if not await self.is_user_exist(u.id):
-            user = self.new_user(u.id)
-            await self.col.insert_one(user)            
+        if await self.is_user_exist(u.id):
+            return
+        # Sirf asli miss par upsert; do messages ek saath aayein to bhi ek hi insert hoga
+        user = self.new_user(u.id)
+        fields = {k: v for k, v in user.items() if k != '_id'}
+        if self.writes is not None and self.known_users.loaded:
+            # Known users poore loaded hain to yahan pahuncha user naya hi hai; upsert buffer se jayega
+            self.writes.insert(user['_id'], fields)
+            self.known_users.add(user['_id'])
+            self.settings_cache.set(user['_id'], UserSettings(user))
+            await send_log(b, u)
+            return
+        result = await self.col.update_one({'_id': user['_id']}, {'$setOnInsert': fields}, upsert=True)
+        self.known_users.add(user['_id'])
+        if result.upserted_id is not None:
+            self.settings_cache.set(user['_id'], UserSettings(user))
             await send_log(b, u)
 
     async def is_user_exist(self, id):
-        user = await self.col.find_one({'_id': int(id)})
-        return bool(user)
+        if self.known_users.loaded:
+            return int(id) in self.known_users
+        return bool(await self.get_user_settings(id))
 
     async def total_users_count(self):
+        if self.known_users.loaded:
+            return len(self.known_users)
         count = await self.col.count_documents({})
         return count
 
     async def get_all_users(self):
-        all_users = self.col.find({})
-        return all_users
+        # Callers ko sirf _id chahiye (broadcast), poore documents stream karne ki zarurat nahi
+        return await self.get_all_user_ids()
+
+    async def get_all_user_ids(self, after=None):
+        # Sirf _id, sorted, taaki broadcast checkpoint se resume ho sake
+        query = {'_id': {'$gt': after}} if after is not None else {}
+        return self.col.find(query, {'_id': 1}).sort('_id', 1).batch_size(1000)
 
     async def delete_user(self, user_id):
+        if self.writes is not None:
+            self.writes.discard(int(user_id))
         await self.col.delete_many({'_id': int(user_id)})
-    
-    async def set_thumbnail(self, id, file_id):
-        await self.col.update_one({'_id': int(id)}, {'$set': {'file_id': file_id}})
+        self.settings_cache.pop(int(user_id))
+        self.known_users.discard(int(user_id))
+
+    async def delete_users(self, user_ids):
+        ids = [int(i) for i in user_ids]
+        if self.writes is not None:
+            for i in ids:
+                self.writes.discard(i)
+        await self.col.delete_many({'_id': {'$in': ids}})
+        for i in ids:
+            self.settings_cache.pop(i)
+            self.known_users.discard(i)
+
+    async def get_broadcast_checkpoint(self):
+        return await self.broadcast.find_one({'_id': 'current'})
+
+    async def save_broadcast_checkpoint(self, ck):
+        await self.broadcast.replace_one({'_id': 'current'}, ck, upsert=True)
+
+    async def clear_broadcast_checkpoint(self):
+        await self.broadcast.delete_one({'_id': 'current'})
+
+    # --- Shared rename queue (ROLE=frontend/worker) ---
+    # queued jobs ka lease_until 0 hota hai, isliye ek hi filter naye aur expire hue dono jobs pakadta hai
+
+    async def enqueue_job(self, job):
+        job = dict(job, state='queued', owner=None, lease_until=0, attempts=0, created=time.time())
+        await self.jobs.update_one({'_id': job['_id']}, {'$setOnInsert': job}, upsert=True)
+
+    async def claim_job(self, owner, lease, max_attempts):
+        now = time.time()
+        return await self.jobs.find_one_and_update(
+            {'state': {'$in': ['queued', 'claimed']}, 'lease_until': {'$lt': now}, 'attempts': {'$lt': max_attempts}},
+            {'$set': {'state': 'claimed', 'owner': owner, 'lease_until': now + lease}, '$inc': {'attempts': 1}},
+            sort=[('created', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def renew_job_lease(self, job_id, owner, lease):
+        # False matlab lease kisi aur worker ke paas ja chuki hai
+        result = await self.jobs.update_one(
+            {'_id': job_id, 'owner': owner, 'state': 'claimed'},
+            {'$set': {'lease_until': time.time() + lease}}
+        )
+        return result.matched_count == 1
+
+    async def finish_job(self, job_id, owner, state='done'):
+        # state 'queued' ho to job wapas line mein (agla worker dobara try karega)
+        fields = {'state': state, 'lease_until': 0}
+        if state != 'queued':
+            fields['finished_at'] = datetime.utcnow()   # TTL index sirf khatam jobs ko hataye
+        await self.jobs.update_one({'_id': job_id, 'owner': owner}, {'$set': fields})
+
+    async def fail_exhausted_jobs(self, max_attempts):
+        result = await self.jobs.update_many(
+            {'state': {'$in': ['queued', 'claimed']}, 'lease_until': {'$lt': time.time()}, 'attempts': {'$gte': max_attempts}},
+            {'$set': {'state': 'failed', 'finished_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    # --- Job journal (crash ke baad resume) ---
+
+    async def journal_job(self, job_id, fields, insert=None):
+        update = {'$set': fields}
+        if insert:
+            update['$setOnInsert'] = insert
+        await self.jobs.update_one({'_id': job_id}, update, upsert=bool(insert))
+
+    async def get_unfinished_jobs(self):
+        # Pichle process ke local jobs jo done tak nahi pahunche
+        return await self.jobs.find({'state': 'local'}).sort('created', 1).to_list(length=None)
+
+    async def set_thumbnail(self, id, file_id, unique_id=None):
+        await self._update_settings(id, {'file_id': file_id, 'thumb_unique_id': unique_id})
 
     async def get_thumbnail(self, id):
-        user = await self.col.find_one({'_id': int(id)})
-        return user.get('file_id', None)
+        settings = await self.get_user_settings(id)
+        return settings.file_id if settings else None
 
     async def set_caption(self, id, caption):
-        await self.col.update_one({'_id': int(id)}, {'$set': {'caption': caption}})
+        await self._update_settings(id, {'caption': caption})
 
     async def get_caption(self, id):
-        user = await self.col.find_one({'_id': int(id)})
-        return user.get('caption', None)
+        settings = await self.get_user_settings(id)
+        return settings.caption if settings else None
 
-    async def set_format_template(self, id, format_template):
-        await self.col.update_one({'_id': int(id)}, {'$set': {'format_template': format_template}})
+    async def set_format_template(self, id, format_template, tokens=None):
+        await self._update_settings(id, {'format_template': format_template}, format_tokens=tokens)
 
     async def get_format_template(self, id):
-        user = await self.col.find_one({'_id': int(id)})
-        return user.get('format_template', None)
-        
+        settings = await self.get_user_settings(id)
+        return settings.format_template if settings else None
+
     async def set_media_preference(self, id, media_type):
-        await self.col.update_one({'_id': int(id)}, {'$set': {'media_type': media_type}})
-        
+        await self._update_settings(id, {'media_type': media_type})
+
     async def get_media_preference(self, id):
-        user = await self.col.find_one({'_id': int(id)})
-        return user.get('media_type', None)
+        settings = await self.get_user_settings(id)
+        return settings.media_type if settings else None
 
 
 
 DvisPappa = Database(Config.DB_URL, Config.DB_NAME)
-        
+
+Gauge("settings_cache_hit_ratio", "User settings cache hit ratio", fn=lambda: round(DvisPappa.settings_cache.stats()["hit_rate"], 4))
+Gauge("write_behind_pending", "Users with buffered, unflushed writes", fn=lambda: len(DvisPappa.writes) if DvisPappa.writes else 0)
+
@@ -0,0 +1,100 @@
+import inspect
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .metrics import Counter, MONGO_SECONDS
+
+# Har Mongo call ki ginti aur latency: /metrics ke liye global counter + histogram, aur code path ke
+# liye query budget (jaise "ek rename = max 1 read") check karne ko track_queries()
+
+READ_OPS = {"find_one", "find", "count_documents", "estimated_document_count", "aggregate", "distinct"}
+
+MONGO_QUERIES = Counter("mongo_queries_total", "Mongo calls by collection and operation", labels=("collection", "op"))
+
+_tracker = ContextVar("mongo_query_tracker", default=None)
+
+
+class QueryTracker:
+
+    def __init__(self):
+        self.ops = _Tally()
+
+    @property
+    def reads(self):
+        return sum(n for op, n in self.ops.items() if op in READ_OPS)
+
+    @property
+    def writes(self):
+        return sum(n for op, n in self.ops.items() if op not in READ_OPS)
+
+    def __repr__(self):
+        return f"QueryTracker(reads={self.reads}, writes={self.writes}, ops={dict(self.ops)})"
+
+
+@contextmanager
+def track_queries():
+    # Is block (aur isse bane tasks) ke saare Mongo calls gin lo
+    tracker = QueryTracker()
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+
+
+async def _timed(awaitable, op):
+    with MONGO_SECONDS.time(op=op):
+        return await awaitable
+
+
+class _TimedCursor:
+    # find/aggregate ka cursor: sort/limit jaise chaining calls wrapper hi lautate hain, to_list ka await
+    # time hota hai. `async for` wali streaming time nahi hoti, usme consumer ka apna kaam bhi shamil hai
+
+    def __init__(self, cursor, op):
+        self._cursor = cursor
+        self._op = op
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if result is self._cursor:
+                return self
+            if inspect.isawaitable(result):
+                return _timed(result, self._op)
+            return result
+
+        return call
+
+    def __aiter__(self):
+        return self._cursor.__aiter__()
+
+
+class CountingCollection:
+    # Motor collection ka patla wrapper, har method call ginta aur time karta hai, baaki sab as-is
+
+    def __init__(self, collection, name):
+        self._collection = collection
+        self._name = name
+
+    def __getattr__(self, op):
+        attr = getattr(self._collection, op)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            MONGO_QUERIES.inc(collection=self._name, op=op)
+            tracker = _tracker.get()
+            if tracker is not None:
+                tracker.ops[op] += 1
+            result = attr(*args, **kwargs)
+            if inspect.isawaitable(result):
+                return _timed(result, op)
+            # find/aggregate turant cursor dete hain, query uske to_list par jaati hai
+            return _TimedCursor(result, op) if hasattr(result, "to_list") else result
+
+        return call
@@ -0,0 +1,220 @@
+import asyncio, json, logging, os
+from pyrogram import raw, StopTransmission
+from pyrogram.errors import FloodWait
+from pyrogram.file_id import FileId, FileType
+from pyrogram.session import Session, Auth
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024    # upload.GetFile ki max limit
+
+
+class MediaSessionPool:
+    # Har DC ke media sessions ek hi baar bante hain aur saare parallel transfers mein share hote hain
+    # (pyrogram ke client.media_sessions jaisa). Dusre DC ke liye auth key aur Export/ImportAuthorization
+    # bhi ek hi baar; uske baad us key se naye sessions seedha start ho jaate hain.
+
+    def __init__(self, client):
+        self.client = client
+        self._sessions = {}     # dc_id -> [Session]
+        self._auth_keys = {}    # dc_id -> authorized auth key
+        self._lock = asyncio.Lock()
+
+    async def get(self, dc_id, count):
+        # Kam se kam `count` sessions (zarurat ho to naye), har session start hote hi pool mein,
+        # taaki beech mein fail hone par bhi jo ban chuke woh close() tak pahunchein
+        async with self._lock:
+            sessions = self._sessions.setdefault(dc_id, [])
+            while len(sessions) < count:
+                sessions.append(await self._start(dc_id))
+            return sessions[:count]
+
+    async def _start(self, dc_id):
+        home_dc = await self.client.storage.dc_id()
+        test_mode = await self.client.storage.test_mode()
+        auth_key = self._auth_keys.get(dc_id)
+        fresh = auth_key is None
+        if fresh:
+            auth_key = await Auth(self.client, dc_id, test_mode).create() if dc_id != home_dc else await self.client.storage.auth_key()
+        session = Session(self.client, dc_id, auth_key, test_mode, is_media=True)
+        await session.start()
+        if fresh and dc_id != home_dc:
+            try:
+                exported = await self.client.invoke(raw.functions.auth.ExportAuthorization(dc_id=dc_id))
+                await session.invoke(raw.functions.auth.ImportAuthorization(id=exported.id, bytes=exported.bytes))
+            except BaseException:
+                await session.stop()
+                raise
+        self._auth_keys[dc_id] = auth_key
+        return session
+
+    async def close(self):
+        async with self._lock:
+            for sessions in self._sessions.values():
+                for session in sessions:
+                    try:
+                        await session.stop()
+                    except Exception:
+                        pass
+            self._sessions.clear()
+            self._auth_keys.clear()
+
+
+_pools = {}     # client -> MediaSessionPool
+
+
+def session_pool(client):
+    pool = _pools.get(client)
+    if pool is None:
+        pool = _pools[client] = MediaSessionPool(client)
+    return pool
+
+
+async def close_session_pools():
+    # Bot.stop() par, client band hone se pehle
+    for pool in list(_pools.values()):
+        await pool.close()
+    _pools.clear()
+
+
+class TelegramChunkSource:
+    # Ek file ke byte ranges file ke DC ke pooled media sessions se (har session ek alag MTProto connection)
+
+    def __init__(self, client, file_id):
+        self.client = client
+        self.file_id = FileId.decode(file_id)
+
+    def _location(self):
+        f = self.file_id
+        if f.file_type == FileType.PHOTO:
+            return raw.types.InputPhotoFileLocation(
+                id=f.media_id, access_hash=f.access_hash,
+                file_reference=f.file_reference, thumb_size=f.thumbnail_size
+            )
+        return raw.types.InputDocumentFileLocation(
+            id=f.media_id, access_hash=f.access_hash,
+            file_reference=f.file_reference, thumb_size=f.thumbnail_size
+        )
+
+    async def open(self, count):
+        sessions = await session_pool(self.client).get(self.file_id.dc_id, count)
+        location = self._location()
+
+        def fetcher(session):
+            async def fetch(offset, limit):
+                r = await session.invoke(raw.functions.upload.GetFile(location=location, offset=offset, limit=limit))
+                return r.bytes
+            return fetch
+
+        return [fetcher(s) for s in sessions]
+
+    async def close(self):
+        pass    # sessions pool ke hain, agli file bhi inhi se aayegi
+
+
+class ChunkedDownloader:
+    # Kai byte ranges ek saath, preallocated file mein sahi offset par os.pwrite.
+    # Poore hue chunks `<path>.parts` mein likhe jaate hain, failure ke baad wahin se resume.
+
+    def __init__(self, parallelism, chunk_size=CHUNK_SIZE, retries=3):
+        self.parallelism = parallelism
+        self.chunk_size = chunk_size
+        self.retries = retries
+
+    def _load_state(self, state_path, size):
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+            if state.get("size") == size and state.get("chunk") == self.chunk_size:
+                return set(state["done"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return set()
+
+    def _save_state(self, state_path, size, done):
+        tmp = f"{state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"size": size, "chunk": self.chunk_size, "done": sorted(done)}, f)
+        os.replace(tmp, state_path)
+
+    async def download(self, source, path, size, progress=None, progress_args=()):
+        state_path = f"{path}.parts"
+        total_chunks = (size + self.chunk_size - 1) // self.chunk_size
+        done = self._load_state(state_path, size) if os.path.exists(path) else set()
+        pending = asyncio.Queue()
+        for idx in range(total_chunks):
+            if idx not in done:
+                pending.put_nowait(idx)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT)
+        try:
+            os.ftruncate(fd, size)      # preallocate
+            completed = [len(done) * self.chunk_size]
+
+            async def worker(fetch):
+                while not pending.empty():
+                    idx = pending.get_nowait()
+                    offset = idx * self.chunk_size
+                    expected = min(self.chunk_size, size - offset)
+                    data = await self._fetch(fetch, offset, expected)
+                    os.pwrite(fd, data, offset)
+                    done.add(idx)
+                    completed[0] += len(data)
+                    if len(done) % 16 == 0:
+                        self._save_state(state_path, size, done)
+                    if progress:
+                        await progress(min(completed[0], size), size, *progress_args)
+
+            tasks = []
+            try:
+                # open() bhi try ke andar, beech mein fail ho to bhi close() chale
+                fetchers = await source.open(min(self.parallelism, max(pending.qsize(), 1)))
+                tasks = [asyncio.create_task(worker(f)) for f in fetchers]
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # Ek worker fail hua to baaki bhi rok do, warna band fd par likhenge
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                self._save_state(state_path, size, done)
+                await source.close()
+
+            # Verify: har chunk aaya aur file ka size sahi hai
+            if len(done) != total_chunks or os.fstat(fd).st_size != size:
+                raise IOError(f"Incomplete download: {len(done)}/{total_chunks} chunks")
+        finally:
+            os.close(fd)
+        os.remove(state_path)
+        return path
+
+    async def _fetch(self, fetch, offset, expected):
+        for attempt in range(self.retries + 1):
+            try:
+                data = await fetch(offset, self.chunk_size)
+                if len(data) != expected:
+                    raise IOError(f"Short chunk at {offset}: {len(data)} != {expected}")
+                return data
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"Chunk {offset} retry {attempt + 1} : {e}")
+                await asyncio.sleep(1 + attempt)
+        raise IOError(f"Chunk {offset} failed")
+
+
+async def parallel_download(client, file_id, path, size, parallelism, progress=None, progress_args=(), attempts=2):
+    downloader = ChunkedDownloader(parallelism)
+    for attempt in range(attempts):
+        try:
+            return await downloader.download(TelegramChunkSource(client, file_id), path, size, progress, progress_args)
+        except StopTransmission:
+            raise       # user ne cancel kiya, retry nahi
+        except Exception as e:
+            # .parts state bachi rehti hai, agli koshish wahin se shuru hogi
+            if attempt == attempts - 1:
+                raise
+            logger.warning(f"Parallel download failed, resuming : {e}")
@@ -0,0 +1,82 @@
+import re
+
+# Saare patterns ek hi alternation mein, import par ek baar compile.
+# Har token ka pehla character fixed hai, isliye scan linear rehta hai
+# (purane `.*?(\d{3,4}[^\dp]*p).*?` jaisa backtracking nahi hota).
+# Fansub ke [CRC32] tags pehle hi nigal liye jaate hain, taaki "[E047ECB1]" episode 047 na ban jaye.
+_TOKENS = re.compile(
+    r"""
+      \[(?P<crc>[0-9A-F]{8})\]
+    | S(?P<se_season>\d{1,3})\s*(?:EP|E|-\s*EP)\s*(?P<se_episode>\d{1,4})
+    | [(\[{<]\s*EP?\s*(?P<bracket_episode>\d{1,4})\s*[)\]}>]
+    | \b(?:EPISODE|EP|E)[\s._-]*(?P<episode>\d{1,4})(?!\d)
+    | (?<!\d)(?P<resolution>\d{3,4}[PI])(?![a-z0-9])
+    | (?<![a-z0-9])(?P<k_quality>[24]K)(?!\d)
+    | (?P<codec>[XH]\.?26[45]|HEVC|AVC|AV1|VP9|XVID)(?![a-z0-9])
+    | \b(?P<source>WEB[\s._-]?DL|WEB[\s._-]?RIP|BLU[\s._-]?RAY|BDRIP|BRRIP|HDRIP|DVDRIP|HDTV|HDCAM|CAMRIP|WEB)(?![a-z0-9])
+    | \bS(?:EASON)?[\s._-]*(?P<season>\d{1,2})(?!\d)
+    | -\s*(?P<dash_number>\d{1,4})(?!\d|\.\d|[PI](?![a-z0-9]))
+    | (?P<number>\d+)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+_CODECS = {"X264": "x264", "X265": "x265", "H264": "H.264", "H265": "H.265", "HEVC": "HEVC",
+           "AVC": "AVC", "AV1": "AV1", "VP9": "VP9", "XVID": "XviD"}
+_SOURCES = {"WEBDL": "WEB-DL", "WEBRIP": "WEBRip", "BLURAY": "BluRay", "BDRIP": "BDRip",
+            "BRRIP": "BRRip", "HDRIP": "HdRip", "DVDRIP": "DVDRip", "HDTV": "HDTV",
+            "HDCAM": "HDCAM", "CAMRIP": "CAMRip", "WEB": "WEB"}
+_STRIP = str.maketrans("", "", " ._-")
+
+
+class ParsedName:
+    __slots__ = ("season", "episode", "quality", "codec", "source")
+
+    def __init__(self, season=None, episode=None, quality="Unknown", codec=None, source=None):
+        self.season = season
+        self.episode = episode
+        self.quality = quality
+        self.codec = codec
+        self.source = source
+
+    def __repr__(self):
+        return (f"ParsedName(season={self.season!r}, episode={self.episode!r}, "
+                f"quality={self.quality!r}, codec={self.codec!r}, source={self.source!r})")
+
+
+def parse_filename(fname: str) -> ParsedName:
+    # Ek hi scan mein season, episode, quality, codec aur source
+    season = se_episode = bracket_episode = episode = dash_episode = loose_episode = None
+    resolution = k_quality = codec = source = None
+    after_season = False
+
+    for m in _TOKENS.finditer(fname):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "se_episode":
+            if se_episode is None:
+                se_episode = value
+                season = season or m.group("se_season")
+        elif kind == "bracket_episode":
+            bracket_episode = bracket_episode or value
+        elif kind == "episode":
+            episode = episode or value
+        elif kind == "resolution":
+            resolution = resolution or value.lower()
+        elif kind == "k_quality":
+            k_quality = k_quality or value.lower()
+        elif kind == "codec":
+            codec = codec or _CODECS.get(value.upper().replace(".", ""), value)
+        elif kind == "source":
+            source = source or _SOURCES.get(value.upper().translate(_STRIP), value)
+        elif kind == "season":
+            season = season or value
+            after_season = True
+        elif kind == "dash_number":
+            dash_episode = dash_episode or value
+        elif kind == "number" and after_season and loose_episode is None:
+            loose_episode = value
+
+    ep = se_episode or bracket_episode or episode or dash_episode or loose_episode
+    quality = resolution or k_quality or ("HdRip" if source == "HdRip" else "Unknown")
+    return ParsedName(season, ep, quality, codec, source)
@@ -0,0 +1,118 @@
+import asyncio, logging, os, socket
+from config import Config
+from .database import DvisPappa
+from .jobs import jobs
+from .scheduler import scheduler
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+QUEUE_EVENTS = Counter("shared_queue_events_total", "Shared queue claims, completions, requeues and lost leases", labels=("event",))
+
+
+class SharedQueue:
+    # Multi-instance mode: frontend (updates lene wala) jobs Mongo mein daalta hai,
+    # har worker process apne pyrogram session se job claim karke lease ke saath chalata hai.
+    # Worker mar jaye to heartbeat rukti hai, lease expire hoti hai aur koi dusra worker job utha leta hai.
+
+    def __init__(self, db, owner, lease, heartbeat, poll, max_attempts):
+        self.db = db
+        self.owner = owner
+        self.lease = lease
+        self.heartbeat = heartbeat
+        self.poll = poll
+        self.max_attempts = max_attempts
+        self._tasks = set()
+
+    async def enqueue(self, msg, status_msg=None):
+        media = msg.document or msg.video or msg.audio
+        # Worker settings fresh=True se Mongo se padhta hai; frontend ke buffer mein atke writes pehle likho
+        await self.db.sync_user(msg.from_user.id)
+        await self.db.enqueue_job({
+            '_id': f"{msg.chat.id}:{msg.id}",
+            'uid': msg.from_user.id,
+            'chat_id': msg.chat.id,
+            'message_id': msg.id,
+            'status_id': status_msg.id if status_msg else None,
+            'file_unique_id': media.file_unique_id,
+            'file_size': media.file_size or 0,
+        })
+        QUEUE_EVENTS.inc(event="enqueued")
+
+    async def run_worker(self, client, handle, has_capacity):
+        # handle: async callable(client, doc), job poora hone tak await karta hai
+        last_sweep = 0
+        loop = asyncio.get_running_loop()
+        while True:
+            if loop.time() - last_sweep > self.lease:
+                last_sweep = loop.time()
+                try:
+                    failed = await self.db.fail_exhausted_jobs(self.max_attempts)
+                    if failed:
+                        logger.warning(f"{failed} shared jobs ran out of attempts")
+                except Exception as e:
+                    logger.warning(f"Shared queue sweep failed : {e}")
+            if not has_capacity():
+                await asyncio.sleep(self.poll)
+                continue
+            try:
+                doc = await self.db.claim_job(self.owner, self.lease, self.max_attempts)
+            except Exception as e:
+                logger.warning(f"Shared queue claim failed : {e}")
+                doc = None
+            if doc is None:
+                await asyncio.sleep(self.poll)
+                continue
+            QUEUE_EVENTS.inc(event="claimed")
+            task = asyncio.create_task(self._process(client, doc, handle))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, client, doc, handle):
+        beat = asyncio.create_task(self._heartbeat(doc))
+        state = 'queued'
+        try:
+            await handle(client, doc)
+            state = 'done'
+        except Exception as e:
+            # Yahan tak sirf infra errors aate hain (rename pipeline apni errors user ko khud batata hai),
+            # isliye job wapas line mein; attempts khatam hone par sweep use failed kar deta hai
+            logger.error(f"Shared job {doc['_id']} failed on {self.owner} : {e}")
+        finally:
+            beat.cancel()
+            try:
+                await self.db.finish_job(doc['_id'], self.owner, state)
+            except Exception as e:
+                logger.error(f"Shared job {doc['_id']} finish failed : {e}")
+            QUEUE_EVENTS.inc(event=state)
+
+    async def _heartbeat(self, doc):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                alive = await self.db.renew_job_lease(doc['_id'], self.owner, self.lease)
+            except Exception as e:
+                logger.warning(f"Lease renew failed for {doc['_id']} : {e}")
+                continue
+            if not alive:
+                # Lease kisi aur worker ne le li, double upload se bachne ke liye yahan ka kaam rok do
+                logger.warning(f"Lost lease on {doc['_id']}, cancelling local job")
+                QUEUE_EVENTS.inc(event="lost")
+                key = (doc['uid'], doc['file_unique_id'])
+                jobs.cancel(key)
+                scheduler.cancel([key])
+                return
+
+
+def has_local_capacity():
+    return not scheduler.paused and scheduler.running + scheduler.queued < scheduler.max_active
+
+
+shared_queue = SharedQueue(
+    DvisPappa,
+    Config.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}",
+    Config.JOB_LEASE,
+    Config.JOB_HEARTBEAT,
+    Config.JOB_POLL_INTERVAL,
+    Config.JOB_MAX_ATTEMPTS,
+)
@@ -0,0 +1,166 @@
+import asyncio, time
+from collections import OrderedDict
+from config import Config
+from .metrics import Gauge
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobEntry:
+    __slots__ = ("key", "uid", "name", "size", "state", "created", "touched", "cancelled", "messages", "wakeup")
+
+    def __init__(self, key, uid, name, size, now):
+        self.key = key
+        self.uid = uid
+        self.name = name
+        self.size = size
+        self.state = "queued"
+        self.created = now
+        self.touched = now
+        self.cancelled = False
+        self.messages = set()       # (chat_id, message_id) jin par Cancel button hai
+        self.wakeup = None          # asyncio.Event, guard() mein ruke waits ko cancel par jagane ke liye
+
+
+class JobRegistry:
+    # In-flight renames, (uid, file_unique_id) se keyed. Same file dobara aaye to ignore.
+    # Har state change par entry refresh hoti hai; `ttl` seconds tak kuch na badle to entry expire
+    # (leak hui entries ke liye safety net). `maxsize` se upar sabse purani entry hat jaati hai.
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # key -> JobEntry, sabse purana touch pehle
+        self._by_message = {}           # (chat_id, message_id) -> set(keys)
+        self.expired = 0
+        self.cancelled = 0
+
+    def _expire(self, now):
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if now - entry.touched < self.ttl and len(self._entries) <= self.maxsize:
+                return
+            self._drop(entry.key)
+            self.expired += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            for ref in entry.messages:
+                keys = self._by_message.get(ref)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_message[ref]
+        return entry
+
+    def register(self, uid, unique_id, name=None, size=0):
+        # None matlab yeh file pehle se chal rahi hai
+        now = time.monotonic()
+        self._expire(now)
+        key = (uid, unique_id)
+        if key in self._entries:
+            return None
+        entry = self._entries[key] = JobEntry(key, uid, name, size, now)
+        self._expire(now)
+        return entry
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry.touched >= self.ttl:
+            self._drop(key)
+            self.expired += 1
+            return None
+        return entry
+
+    def set_state(self, key, state):
+        entry = self.get(key)
+        if entry:
+            entry.state = state
+            entry.touched = time.monotonic()
+            self._entries.move_to_end(key)
+        return entry
+
+    def attach(self, key, message):
+        entry = self.get(key)
+        if entry and message:
+            ref = (message.chat.id, message.id)
+            entry.messages.add(ref)
+            self._by_message.setdefault(ref, set()).add(key)
+
+    def check(self, key):
+        # Stage boundaries par: user ne cancel kiya ho to yahin ruk jao
+        entry = self._entries.get(key)
+        if entry and entry.cancelled:
+            raise JobCancelled(entry.name)
+
+    def cancel(self, key):
+        entry = self.get(key)
+        if not entry or entry.cancelled:
+            return False
+        entry.cancelled = True
+        self.cancelled += 1
+        if entry.wakeup is not None:
+            entry.wakeup.set()
+        return True
+
+    async def guard(self, key, wait):
+        # Lamba wait (disk jagah, stage slot) jo cancel hote hi chhoot jaye.
+        # wait: coroutine function; cancel se pehle hi poora ho gaya ho to uska result milta hai
+        # (jaise slot mil gaya), taaki caller use release kar sake aur agla check() cancel pakde
+        self.check(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            return await wait()
+        if entry.wakeup is None:
+            entry.wakeup = asyncio.Event()
+        task = asyncio.ensure_future(wait())
+        waiter = asyncio.ensure_future(entry.wakeup.wait())
+        try:
+            await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            task.cancel()
+            raise
+        finally:
+            waiter.cancel()
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                raise JobCancelled(entry.name)
+        return task.result()
+
+    def cancel_message(self, chat_id, message_id, user_id=None):
+        # Cancel button kis job(s) ka tha; batch status message par poora batch
+        cancelled = []
+        for key in list(self._by_message.get((chat_id, message_id), ())):
+            entry = self._entries.get(key)
+            if entry and (user_id is None or entry.uid == user_id) and self.cancel(key):
+                cancelled.append(key)
+        return cancelled
+
+    def message_cancelled(self, chat_id, message_id):
+        # Progress callback har chunk par yeh poochta hai, isliye sirf dict lookups
+        for key in self._by_message.get((chat_id, message_id), ()):
+            entry = self._entries.get(key)
+            if entry and entry.cancelled:
+                return True
+        return False
+
+    def finish(self, key):
+        return self._drop(key)
+
+    def active(self):
+        self._expire(time.monotonic())
+        return sorted(self._entries.values(), key=lambda e: e.created)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+jobs = JobRegistry(Config.JOB_TTL, Config.JOB_REGISTRY_SIZE)
+
+Gauge("rename_jobs_in_flight", "Entries in the in-flight job registry", fn=lambda: len(jobs))
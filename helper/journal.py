@@ -0,0 +1,121 @@
+import asyncio, logging, os, time
+from datetime import datetime
+from config import Config
+from .database import DvisPappa
+from .job_queue import shared_queue
+from .storage import workspace_path
+
+logger = logging.getLogger(__name__)
+
+# Har job ka stage rename_jobs collection mein: received -> downloading -> downloaded -> uploading -> done.
+# Process crash/restart ho to jo job done tak nahi pahuncha woh startup par dobara chalta hai,
+# aur agar file poori download ho chuki thi to downloads/ se hi reuse hoti hai.
+
+
+def journal_id(msg):
+    return f"{msg.chat.id}:{msg.id}"
+
+
+def workspace_name(chat_id, message_id):
+    # Message se hi bana naam, taaki restart ke baad bhi wahi directory mile
+    return f"{chat_id}_{message_id}"
+
+
+def download_complete(path, size):
+    # pyrogram poori file hone par hi final naam deta hai; parallel engine ki .parts file tab tak rehti hai
+    return bool(path) and os.path.isfile(path) and os.path.getsize(path) == size and not os.path.exists(f"{path}.parts")
+
+
+class JobJournal:
+
+    def __init__(self, db, owner, enabled, progress_interval):
+        self.db = db
+        self.owner = owner
+        self.enabled = enabled
+        self.progress_interval = progress_interval
+        self._last_progress = {}        # journal id -> last write time
+        self._tasks = set()
+        self._interrupted = False
+
+    async def received(self, msg):
+        # ROLE=all mein naya doc (state "local", workers isko claim nahi karte);
+        # worker mode mein queue wala doc pehle se hai, sirf stage badalta hai
+        if not self.enabled:
+            return
+        media = msg.document or msg.video or msg.audio
+        await self._write(journal_id(msg), {'stage': 'received'}, insert={
+            'state': 'local',
+            'owner': self.owner,
+            'uid': msg.from_user.id,
+            'chat_id': msg.chat.id,
+            'message_id': msg.id,
+            'file_unique_id': media.file_unique_id,
+            'file_size': media.file_size or 0,
+            'lease_until': 0,
+            'attempts': 0,
+            'created': time.time(),
+        })
+
+    async def stage(self, msg, stage, **fields):
+        if self.enabled:
+            self._last_progress.pop(journal_id(msg), None)
+            await self._write(journal_id(msg), dict(fields, stage=stage))
+
+    def progress(self, msg, offset):
+        # Download callback se; har `progress_interval` seconds mein max ek write, background mein
+        if not self.enabled:
+            return
+        jid = journal_id(msg)
+        now = time.monotonic()
+        if now - self._last_progress.get(jid, 0) < self.progress_interval:
+            return
+        self._last_progress[jid] = now
+        task = asyncio.create_task(self._write(jid, {'offset': offset}))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def interrupt(self):
+        # Restart drain ki deadline nikal gayi: ab jo jobs fail honge woh band hote session ki wajah se,
+        # unhe done nahi likhna aur unki workspace rehne deni hai, taaki restart ke baad resume hon
+        self._interrupted = True
+
+    @property
+    def interrupted(self):
+        return self.enabled and self._interrupted
+
+    async def done(self, msg):
+        await self.close(journal_id(msg))
+
+    async def close(self, jid):
+        if not self.enabled:
+            return
+        self._last_progress.pop(jid, None)
+        fields = {'stage': 'done'}
+        if Config.ROLE == "all":
+            # worker mode mein state aur finished_at shared queue ka finish_job set karta hai
+            fields['state'] = 'done'
+            fields['finished_at'] = datetime.utcnow()   # history_ttl index isi se purane docs hatata hai
+        await self._write(jid, fields)
+
+    async def _write(self, jid, fields, insert=None):
+        try:
+            await self.db.journal_job(jid, fields, insert)
+        except Exception as e:
+            # Journal best-effort hai, rename iski wajah se nahi rukna chahiye
+            logger.warning(f"Journal write failed for {jid} : {e}")
+
+    async def unfinished(self):
+        if not self.enabled or Config.ROLE != "all":
+            return []
+        try:
+            return await self.db.get_unfinished_jobs()
+        except Exception as e:
+            logger.warning(f"Journal read failed, nothing to resume : {e}")
+            return []
+
+
+def resumable_workspaces(docs):
+    return {workspace_path(workspace_name(doc['chat_id'], doc['message_id'])) for doc in docs}
+
+
+journal = JobJournal(DvisPappa, shared_queue.owner, Config.JOURNAL, Config.JOURNAL_PROGRESS_INTERVAL)
@@ -0,0 +1,71 @@
+import asyncio, logging
+from pyrogram import enums
+from pyrogram.errors import UserNotParticipant
+from config import Config
+from .database import TTLCache
+from .metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+NOT_MEMBER = "not_member"
+BLOCKED = (NOT_MEMBER, enums.ChatMemberStatus.BANNED, enums.ChatMemberStatus.LEFT)
+
+
+class MembershipCache:
+    # Force-sub channel membership ka cache: member wale results der tak, baaki thodi der.
+    # Ek hi user ke concurrent messages ek hi get_chat_member call share karte hain.
+
+    def __init__(self, positive_ttl, negative_ttl, maxsize):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(maxsize, positive_ttl)
+        self._inflight = {}     # user_id -> Future
+        self.shared = 0
+        self.lookups = 0
+
+    def _store(self, user_id, status):
+        ttl = self.negative_ttl if status in BLOCKED else self.positive_ttl
+        self._cache.set(user_id, status, ttl=ttl)
+
+    async def get_status(self, client, chat, user_id):
+        status = self._cache.get(user_id)
+        if status is not None:
+            return status
+        if user_id in self._inflight:
+            self.shared += 1
+            return await asyncio.shield(self._inflight[user_id])
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = fut
+        try:
+            self.lookups += 1
+            try:
+                member = await client.get_chat_member(chat, user_id)
+                status = member.status
+            except UserNotParticipant:
+                status = NOT_MEMBER
+            self._store(user_id, status)
+        except Exception as e:
+            # API error par user ko rokna nahi, bas cache bhi nahi karna
+            logger.warning(f"get_chat_member failed for {user_id} : {e}")
+            status = None
+        finally:
+            self._inflight.pop(user_id, None)
+            if not fut.done():
+                fut.set_result(status)
+        return status
+
+    def update(self, user_id, status):
+        # chat_member updates se (bot channel mein admin ho to) seedha cache update
+        self._store(user_id, status or NOT_MEMBER)
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats["shared"] = self.shared
+        stats["api_lookups"] = self.lookups
+        return stats
+
+
+membership = MembershipCache(Config.FSUB_POSITIVE_TTL, Config.FSUB_NEGATIVE_TTL, Config.FSUB_CACHE_SIZE)
+
+Gauge("force_sub_cache_hit_ratio", "Force-sub membership cache hit ratio", fn=lambda: round(membership.stats()["hit_rate"], 4))
+Gauge("force_sub_api_lookups", "get_chat_member calls made for force-sub", fn=lambda: membership.lookups)
@@ -0,0 +1,117 @@
+import asyncio, io, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from hachoir.metadata import extractMetadata
+from hachoir.parser import createParser, guessParser
+from hachoir.stream import InputIOStream
+from config import Config
+from .storage import memory_budget
+
+
+class MediaInfo:
+    __slots__ = ("duration", "width", "height", "codec")
+
+    def __init__(self, duration=0, width=0, height=0, codec=None):
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.codec = codec
+
+
+def _collect(meta):
+    # Video/audio streams alag groups mein hote hain, sabse pehli value le lo
+    found = {}
+    groups = [meta] + list(meta.iterGroups()) if hasattr(meta, "iterGroups") else [meta]
+    for group in groups:
+        for key in ("duration", "width", "height", "compression"):
+            if key not in found and group.has(key):
+                found[key] = group.get(key)
+    duration = found.get("duration")
+    return (
+        int(duration.total_seconds()) if duration else 0,
+        int(found.get("width") or 0),
+        int(found.get("height") or 0),
+        str(found["compression"]) if "compression" in found else None,
+    )
+
+
+def _parse(parser):
+    if not parser:
+        return None
+    with parser:
+        meta = extractMetadata(parser)
+    return _collect(meta) if meta else None
+
+
+def _from_bytes(data, name):
+    return _parse(guessParser(InputIOStream(io.BytesIO(data), tags=[("filename", name)])))
+
+
+def extract_sync(source, name, head_bytes, full=True):
+    # Pehle sirf container header padho (MKV/faststart MP4 ke liye kaafi hai),
+    # duration na mile to (full=True par) poori file par lazy parse
+    try:
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                head = f.read(head_bytes)
+        else:
+            head = source[:head_bytes]
+        result = _from_bytes(head, name)
+        if result and result[0]:
+            return result
+    except Exception:
+        pass
+    if not full:
+        return None
+    try:
+        if isinstance(source, str):
+            return _parse(createParser(source))
+        return _from_bytes(source, name)
+    except Exception as e:
+        print(f"Metadata Error: {e}")
+    return None
+
+
+class MetadataService:
+    # hachoir parsing event loop se bahar, ek bounded worker pool mein
+
+    def __init__(self, workers, use_processes, head_bytes):
+        self.head_bytes = head_bytes
+        # Bot process mein pyrogram/motor ke threads chal rahe hote hain, unke beech fork kiya child
+        # kisi aur thread ka pakda lock le kar atak sakta hai; spawn saaf interpreter se shuru karta hai
+        self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if use_processes else ThreadPoolExecutor(workers)
+
+    async def extract(self, file, name):
+        # file disk path ho sakta hai ya in-memory BytesIO
+        loop = asyncio.get_running_loop()
+        try:
+            if isinstance(file, str):
+                result = await loop.run_in_executor(self._pool, extract_sync, file, name, self.head_bytes)
+            else:
+                result = await self._extract_buffer(loop, file, name)
+        except Exception as e:
+            print(f"Metadata Error: {e}")
+            result = None
+        return MediaInfo(*result) if result else MediaInfo()
+
+    async def _extract_buffer(self, loop, file, name):
+        # Worker ko pehle sirf header ki copy. Poori file ki copy (process pool mein pickle hoti hai)
+        # tabhi jab header kaafi na ho, aur woh bhi memory budget ke andar
+        with file.getbuffer() as buffer:
+            result = await loop.run_in_executor(self._pool, extract_sync, bytes(buffer[:self.head_bytes]), name, self.head_bytes, False)
+            size = len(buffer)
+            if (result and result[0]) or size <= self.head_bytes or not memory_budget.try_reserve(size):
+                return result
+            try:
+                return await loop.run_in_executor(self._pool, extract_sync, bytes(buffer), name, self.head_bytes)
+            finally:
+                memory_budget.release(size)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+metadata_service = MetadataService(
+    Config.METADATA_WORKERS,
+    Config.METADATA_POOL == "process",
+    Config.METADATA_HEAD_BYTES,
+)
@@ -0,0 +1,158 @@
+import asyncio, time
+from contextlib import contextmanager
+
+# Chhota sa in-process metrics registry, /metrics par Prometheus text format mein
+
+REGISTRY = []
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def _fmt_labels(self, key, extra=None):
+        pairs = list(zip(self.labels, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{self._fmt_labels(key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def total(self):
+        return sum(self._values.values())
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self.fn = fn    # fn diya ho to value render ke time padhi jati hai
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        if self.fn:
+            return self.fn()
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        if self.fn:
+            return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.fn()}"]
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = state[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def mean(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[1] / state[2] if state and state[2] else 0.0
+
+    def quantile(self, q, **labels):
+        # Buckets se andaza (Prometheus histogram_quantile jaisa, bucket ke andar linear);
+        # sabse bade bucket se upar ho to uska bound hi milta hai
+        state = self._values.get(self._key(labels))
+        if not state or not state[2]:
+            return 0.0
+        counts, _, count = state
+        rank = q * count
+        prev_bound, prev_count = 0.0, 0
+        for bound, c in zip(self.buckets, counts):
+            if c >= rank:
+                if c == prev_count:
+                    return bound
+                return prev_bound + (bound - prev_bound) * (rank - prev_count) / (c - prev_count)
+            prev_bound, prev_count = bound, c
+        return self.buckets[-1]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._values.items()):
+            for bound, c in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._fmt_labels(key, ('le', bound))} {c}")
+            lines.append(f"{self.name}_bucket{self._fmt_labels(key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._fmt_labels(key)} {count}")
+        return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("rename_stage_seconds", "Per-job stage latency", labels=("stage",))
+LOOP_LAG = Gauge("event_loop_lag_seconds", "Latest measured event loop lag")
+LOOP_LAG_SECONDS = Histogram("event_loop_lag_histogram_seconds", "Event loop lag samples",
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+BYTES_TOTAL = Counter("transfer_bytes_total", "Bytes downloaded (in) and uploaded (out)", labels=("direction",))
+FLOOD_WAITS = Counter("flood_waits_total", "FloodWait errors received", labels=("source",))
+JOB_SECONDS = Histogram("rename_job_seconds", "Queue wait + run time per rename job", labels=("lane",),
+                        buckets=(1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200, 1800, 3600))
+MONGO_SECONDS = Histogram("mongo_query_seconds", "Mongo query latency", labels=("op",),
+                          buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+
+
+async def monitor_loop_lag(interval=1.0):
+    # sleep jitna late jaage utna hi event loop block tha
+    while True:
+        start = time.monotonic()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.monotonic() - start - interval)
+        LOOP_LAG.set(round(lag, 6))
+        LOOP_LAG_SECONDS.observe(lag)
@@ -0,0 +1,184 @@
+import asyncio, time
+from pyrogram.errors import FloodWait
+from .ratelimit import TokenBucket
+from .metrics import FLOOD_WAITS
+
+
+class _Transfer:
+    __slots__ = ("last_current", "last_time", "speed", "last_text", "editing", "touched", "pending", "flusher")
+
+    def __init__(self, now):
+        self.last_current = 0
+        self.last_time = now
+        self.speed = 0.0
+        self.last_text = None
+        self.editing = False
+        self.touched = now
+        self.pending = None                 # coalesced callback ka latest (current, total, ud_type, message, start)
+        self.flusher = None                 # pending state ko baad mein bhejne wala task
+
+
+class ProgressReporter:
+    # Saare transfers ke progress edits yahin se jaate hain:
+    # - har chat mein `chat_interval` seconds mein max ek edit
+    # - poore bot ke liye global token bucket (Telegram edit limits ke hisaab se)
+    # - beech ke callbacks coalesce hote hain, sirf latest state bheji jaati hai; jo state
+    #   budget ki wajah se ruki wo trailing edit mein jaati hai, isliye 100% kabhi nahi chhootta
+    # - same text dobara edit nahi hota, speed/ETA moving average se
+
+    def __init__(self, render, chat_interval=5, global_rate=20, smoothing=0.3, stale_after=600):
+        self.render = render                # callable(current, total, speed, eta_s, ud_type) -> (text, markup)
+        self.chat_interval = chat_interval
+        self.bucket = TokenBucket(global_rate)
+        self.smoothing = smoothing
+        self.stale_after = stale_after
+        self._transfers = {}                # (chat_id, message_id) -> _Transfer
+        self._chat_next = {}                # chat_id -> next allowed edit time
+        self.edits = 0
+        self.coalesced = 0
+        self.trailing = 0
+        self.unchanged = 0
+        self.flood_waits = 0
+
+    async def report(self, current, total, ud_type, message, start):
+        now = time.monotonic()
+        key = (message.chat.id, message.id)
+        state = self._transfers.get(key)
+        if state is None:
+            self._prune(now)
+            state = self._transfers[key] = _Transfer(now)
+        self._update_speed(state, current, now)
+        state.touched = now
+
+        args = (current, total, ud_type, message, start)
+        if state.editing or now < self._chat_next.get(key[0], 0) or not self.bucket.try_acquire():
+            self.coalesced += 1
+            self._defer(key, state, args)
+            return
+
+        state.pending = None
+        sent = await self._show(state, *args, now)
+        if sent is None and state.pending is None:
+            # FloodWait: ye state bhi baad mein jaayegi
+            self._defer(key, state, args)
+        elif current >= total and state.pending is None:
+            self._forget(key, state)
+
+    async def _show(self, state, current, total, ud_type, message, start, now, trailing=False):
+        speed = state.speed or (current / max(time.time() - start, 1e-3))
+        eta = (total - current) / speed if speed else 0
+        text, markup = self.render(current, total, speed, eta, ud_type)
+        if text == state.last_text:
+            # Trailing edit koi naya callback nahi, isliye sirf report wale gine jaate hain
+            if not trailing:
+                self.unchanged += 1
+            return False
+
+        state.editing = True
+        try:
+            sent = await self._send(message, text, markup, now)
+        finally:
+            state.editing = False
+        if sent:
+            state.last_text = text
+            self.trailing += trailing
+        return sent
+
+    def _defer(self, key, state, args):
+        state.pending = args
+        if state.flusher is None:
+            state.flusher = asyncio.create_task(self._flush(key, state))
+
+    async def _flush(self, key, state):
+        # Ruki hui state ko chat interval aur bucket ke andar hi bhejta hai. Chat slot
+        # pehle hi claim ho jaata hai taaki usi chat ke dusre flushers ek saath na aayein
+        chat_id = key[0]
+        last = None
+        try:
+            while state.pending is not None:
+                now = time.monotonic()
+                wait = self._chat_next.get(chat_id, 0) - now
+                if wait > 0 or state.editing:
+                    await asyncio.sleep(max(wait, 0.05))
+                    continue
+                self._chat_next[chat_id] = now + self.chat_interval
+                await self.bucket.acquire()
+                last, state.pending = state.pending, None
+                if last is None:
+                    break
+                sent = await self._show(state, *last, time.monotonic(), trailing=True)
+                if sent is None and state.pending is None:
+                    state.pending = last
+        finally:
+            state.flusher = None
+        # Aakhri (done) state chali gayi, transfer khatam
+        if last is not None and last[0] >= last[1] and self._transfers.get(key) is state:
+            del self._transfers[key]
+
+    def discard(self, message):
+        # Status message kisi aur kaam ke liye edit hone wala hai (error, agla stage):
+        # ruki hui progress state baad mein use overwrite na kare
+        key = (message.chat.id, message.id)
+        state = self._transfers.get(key)
+        if state is not None:
+            self._forget(key, state)
+
+    def _forget(self, key, state):
+        if self._transfers.get(key) is state:
+            del self._transfers[key]
+        state.pending = None
+        if state.flusher is not None:
+            state.flusher.cancel()
+            state.flusher = None
+
+    async def edit(self, message, text, markup=None):
+        # Transfer ke bahar wale status edits (jaise queue position) bhi isi budget se jaate hain.
+        # False matlab abhi budget nahi tha, caller baad mein dobara koshish kare
+        now = time.monotonic()
+        if now < self._chat_next.get(message.chat.id, 0) or not self.bucket.try_acquire():
+            return False
+        return await self._send(message, text, markup, now)
+
+    async def _send(self, message, text, markup, now):
+        chat_id = message.chat.id
+        self._chat_next[chat_id] = now + self.chat_interval
+        try:
+            await message.edit(text=text, reply_markup=markup)
+            self.edits += 1
+            return True
+        except FloodWait as e:
+            self.flood_waits += 1
+            FLOOD_WAITS.inc(source="progress")
+            self._chat_next[chat_id] = time.monotonic() + e.value
+            self.bucket.pause(min(e.value, self.chat_interval))
+            return None
+        except Exception:
+            return False
+
+    def _update_speed(self, state, current, now):
+        dt = now - state.last_time
+        if dt <= 0 or current < state.last_current:
+            return
+        inst = (current - state.last_current) / dt
+        state.speed = inst if not state.speed else self.smoothing * inst + (1 - self.smoothing) * state.speed
+        state.last_current = current
+        state.last_time = now
+
+    def _prune(self, now):
+        # Jo transfers beech mein mar gaye (error/cancel) unki state hata do
+        if len(self._transfers) < 256 and len(self._chat_next) < 1024:
+            return
+        for key in [k for k, s in self._transfers.items() if now - s.touched > self.stale_after]:
+            del self._transfers[key]
+        for chat_id in [c for c, t in self._chat_next.items() if t < now]:
+            del self._chat_next[chat_id]
+
+    def stats(self):
+        return {
+            "active": len(self._transfers),
+            "edits": self.edits,
+            "coalesced": self.coalesced,
+            "trailing": self.trailing,
+            "unchanged": self.unchanged,
+            "flood_waits": self.flood_waits,
+        }
@@ -0,0 +1,365 @@
+import asyncio, itertools, logging, time
+from bisect import bisect
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, AsyncExitStack
+from config import Config
+from .metrics import Gauge, JOB_SECONDS
+from .jobs import jobs
+from .utils import CANCEL_MARKUP, progress_reporter
+
+logger = logging.getLogger(__name__)
+
+LANES = ("small", "medium", "large")
+VIDEO_OVERHEAD = 20 * 1024 * 1024     # video par metadata + thumbnail ka extra kaam, bytes ke hisaab se
+
+
+def job_cost(msg):
+    # Job kitna lamba chalega uska andaza: file size, video ho to thoda zyada
+    media = msg.document or msg.video or msg.audio
+    cost = (media.file_size or 0) if media else 0
+    if msg.video:
+        cost += VIDEO_OVERHEAD
+    return cost
+
+
+def position_moved(old, new):
+    # Line ke aage har badlav dikhta hai, peeche sirf ~10% ka; warna har dequeue par saari lambi line edit hoti
+    return old is None or abs(old - new) >= max(1, old // 10)
+
+
+class RenameJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, uid, msg, run, batch=None, index=0, key=None):
+        self.id = next(self._ids)
+        self.uid = uid
+        self.key = key              # (uid, file_unique_id), job registry mein isi naam se
+        self.msg = msg
+        self.run = run              # async callable(job)
+        self.status_msg = None      # "position in queue" wala message
+        self.position = None
+        self.created = time.monotonic()
+        self.started = None
+        self.path = None            # "fast" (file_id reuse) ya "stream" (download + upload)
+        self.batch = batch          # RenameBatch, agar job kisi burst ka hissa hai
+        self.index = index          # batch mein position (episode order)
+        self.cost = job_cost(msg)
+        self.lane = None            # submit par scheduler set karta hai
+
+
+class RenameScheduler:
+    # Rename jobs ka queue: global download/upload limits semaphores se lagte hain,
+    # per-user cap se ek user saare slots nahi le sakta, aur users ke beech round-robin hota hai.
+    # Har user ki apni line mein sabse chhota expected job pehle, aur wait ke saath priority badhti hai
+    # (aging), isliye uski badi file bhi aakhir mein turn paati hai.
+    # Jobs size ke hisaab se lanes mein bhi jaate hain: chhoti files ke liye har stage mein kuch slots reserved,
+    # badi files ek bounded hisse tak; jis user ka job abhi kisi band lane ka hai uski agli chal sakne wali file chalti hai.
+
+    def __init__(self, max_downloads, max_uploads, per_user, refresh_interval=10, on_position=None, stage_depths=None,
+                 small_size=0, large_size=float("inf"), small_reserved=0, large_slots=0, aging_rate=0):
+        self.max_active = max_downloads + max_uploads
+        # Pipelined mode mein har user ke download aur upload stages ki alag depth hoti hai,
+        # taaki file N ka upload aur file N+1 ka download ek saath chal sake.
+        # per_user (0 = default) user ke kul running jobs ki hard limit hai, stage depths uske andar lagti hain
+        self.stage_depths = stage_depths
+        self.per_user = per_user or (sum(stage_depths.values()) if stage_depths else 1)
+        self._user_stages = {}             # uid -> {stage: Semaphore}
+        self.refresh_interval = refresh_interval
+        self.on_position = on_position     # async callable(job, position)
+        self.download_slots = asyncio.Semaphore(max_downloads)
+        self.upload_slots = asyncio.Semaphore(max_uploads)
+        self.small_size = small_size
+        self.large_size = large_size
+        self.aging_rate = aging_rate
+        # Har stage mein `reserved` slots sirf small lane ke; large lane max `large` slots tak
+        reserved = max(0, min(small_reserved, max_downloads - 1, max_uploads - 1))
+        large = min(large_slots or max(1, min(max_downloads, max_uploads) // 2), min(max_downloads, max_uploads) - reserved)
+        self._shared_slots = {"download": asyncio.Semaphore(max_downloads - reserved), "upload": asyncio.Semaphore(max_uploads - reserved)}
+        self._large_slots = {"download": asyncio.Semaphore(large), "upload": asyncio.Semaphore(large)}
+        self._lane_caps = {"small": self.max_active, "medium": self.max_active - 2 * reserved, "large": 2 * large}
+        self._queues = OrderedDict()       # uid -> sorted [(priority, job id, job)], round-robin order mein
+        self._depth = []                   # _depth[k] = kitne users ki line mein k se zyada jobs hain
+        self._lane_running = dict.fromkeys(LANES, 0)
+        self._batch_queued = {}            # RenameBatch -> deque[RenameJob], episode order mein
+        self._active = {}                  # uid -> running jobs
+        self._running = 0
+        self._refresher = None
+        self._tasks = set()
+        self.completed = 0
+        self.failed = 0
+        self.paths = {"fast": 0, "stream": 0}
+        self.bytes_saved = 0
+        self.paused = False                # restart drain ke dauraan naye jobs shuru nahi hote
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def queued(self):
+        return sum(self._depth)
+
+    def lane_for(self, job):
+        if job.cost <= self.small_size:
+            return "small"
+        return "large" if job.cost >= self.large_size else "medium"
+
+    def lane_queued(self, lane):
+        return sum(1 for queue in self._queues.values() for entry in queue if entry[2].lane == lane)
+
+    def lane_running(self, lane):
+        return self._lane_running[lane]
+
+    def _priority(self, job):
+        # cost - aging_rate * (ab - created) ka order wahi hai jo cost + aging_rate * created ka,
+        # isliye priority submit par ek baar nikal kar sorted list mein rakh sakte hain
+        return job.cost + self.aging_rate * job.created
+
+    async def submit(self, job):
+        job.lane = self.lane_for(job)
+        queue = self._queues.setdefault(job.uid, [])
+        entry = (self._priority(job), job.id, job)
+        queue.insert(bisect(queue, entry), entry)
+        self._resized(len(queue) - 1, len(queue))
+        if job.batch is not None:
+            self._batch_queued.setdefault(job.batch, deque()).append(job)
+        self._dispatch()
+        if job.started is None:
+            job.position = self._estimate_position(entry)
+            if self.on_position:
+                await self._notify(job, job.position)
+            self._ensure_refresher()
+        return job
+
+    def _resized(self, old, new):
+        # Kisi user ki line old se new length ki hui
+        if new > len(self._depth):
+            self._depth.extend([0] * (new - len(self._depth)))
+        for k in range(new, old):
+            self._depth[k] -= 1
+        for k in range(old, new):
+            self._depth[k] += 1
+        while self._depth and not self._depth[-1]:
+            self._depth.pop()
+
+    def _estimate_position(self, entry):
+        # Round-robin mein apni line ki depth d tak: d se pehle ki har depth par sab users, aur depth d par
+        # sab ko aage maan lo. Poori positions() har submit par O(queued) hoti, yeh O(d) hai
+        depth = self._queues[entry[2].uid].index(entry)
+        return sum(self._depth[:depth + 1])
+
+    def _lane_open(self, lane):
+        if self._lane_running[lane] >= self._lane_caps[lane]:
+            return False
+        # medium + large milkar small lane ke reserved slots nahi chhu sakte
+        return lane == "small" or self._lane_running["medium"] + self._lane_running["large"] < self._lane_caps["medium"]
+
+    def _eligible(self, job):
+        if not self._lane_open(job.lane):
+            return False
+        # Batch ki files episode order mein hi shuru hon, warna agli file slot pakad kar
+        # pichli ki upload turn ka wait karti rahegi (OrderedGate deadlock)
+        return job.batch is None or self._batch_queued[job.batch][0] is job
+
+    def _next_job(self):
+        # Users round-robin mein; har user ki line se sabse chhota job jo abhi chal sake
+        for uid, queue in self._queues.items():
+            if self._active.get(uid, 0) >= self.per_user:
+                continue
+            for i, entry in enumerate(queue):
+                job = entry[2]
+                if not self._eligible(job):
+                    continue
+                del queue[i]
+                self._resized(len(queue) + 1, len(queue))
+                if queue:
+                    self._queues.move_to_end(uid)   # round-robin: agla user pehle
+                else:
+                    del self._queues[uid]
+                if job.batch is not None:
+                    waiting = self._batch_queued[job.batch]
+                    waiting.popleft()
+                    if not waiting:
+                        del self._batch_queued[job.batch]
+                return job
+        return None
+
+    def _dispatch(self):
+        while self._running < self.max_active and not self.paused:
+            job = self._next_job()
+            if job is None:
+                return
+            uid = job.uid
+            self._active[uid] = self._active.get(uid, 0) + 1
+            self._lane_running[job.lane] += 1
+            self._running += 1
+            job.started = time.monotonic()
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job):
+        try:
+            await job.run(job)
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Rename job {job.id} failed : {e}")
+        finally:
+            self._running -= 1
+            self._lane_running[job.lane] -= 1
+            JOB_SECONDS.observe(time.monotonic() - job.created, lane=job.lane)
+            left = self._active.get(job.uid, 1) - 1
+            if left:
+                self._active[job.uid] = left
+            else:
+                self._active.pop(job.uid, None)
+                self._user_stages.pop(job.uid, None)
+            self._dispatch()
+
+    async def drain(self, timeout):
+        # Queue rok do aur chal rahe jobs ke khatam hone ka wait; queued jobs journal se restart ke baad chalenge.
+        # Deadline tak jo khatam na ho unki ginti wapas milti hai.
+        self.paused = True
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        return self._running
+
+    def cancel(self, keys):
+        # Cancel hue jobs line se turant hatao. Unka run phir bhi chalta hai (slot ke bina),
+        # jo shuru hote hi cancel dekh kar sirf cleanup karta hai
+        keys = set(keys)
+        removed = 0
+        for uid, queue in list(self._queues.items()):
+            cancelled = [entry[2] for entry in queue if entry[2].key in keys]
+            if not cancelled:
+                continue
+            queue[:] = [entry for entry in queue if entry[2].key not in keys]
+            self._resized(len(queue) + len(cancelled), len(queue))
+            if not queue:
+                del self._queues[uid]
+            for job in cancelled:
+                if job.batch is not None:
+                    waiting = self._batch_queued[job.batch]
+                    waiting.remove(job)
+                    if not waiting:
+                        del self._batch_queued[job.batch]
+                removed += 1
+                task = asyncio.create_task(self._cleanup(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        if removed:
+            self._dispatch()    # batch ki agli file ab line mein sabse aage ho sakti hai
+        return removed
+
+    async def _cleanup(self, job):
+        try:
+            await job.run(job)
+        except Exception as e:
+            logger.error(f"Cancelled job {job.id} cleanup failed : {e}")
+
+    def record_path(self, job, path, size):
+        job.path = path
+        self.paths[path] += 1
+        if path == "fast":
+            # download + upload dono bach gaye
+            self.bytes_saved += 2 * (size or 0)
+
+    @asynccontextmanager
+    async def stage(self, job, name):
+        # name "download" ya "upload"; hamesha isi order mein: user ki stage depth, lane ka hissa, global slot.
+        # Slot ka wait cancel button par turant chhootta hai (JobCancelled)
+        slots = []
+        if self.stage_depths:
+            stages = self._user_stages.setdefault(job.uid, {})
+            if name not in stages:
+                stages[name] = asyncio.Semaphore(self.stage_depths[name])
+            slots.append(stages[name])
+        if job.lane == "large":
+            slots.append(self._large_slots[name])
+        if job.lane != "small":
+            slots.append(self._shared_slots[name])
+        slots.append(self.download_slots if name == "download" else self.upload_slots)
+        async with AsyncExitStack() as stack:
+            for slot in slots:
+                await jobs.guard(job.key, slot.acquire)
+                stack.callback(slot.release)
+            yield
+
+    def positions(self):
+        # Round-robin order simulate karke har waiting job ki andazan position
+        # (lane caps aur per-user limit isme nahi gine jaate)
+        result = {}
+        queues = list(self._queues.values())
+        pos, depth = 0, 0
+        while True:
+            added = False
+            for queue in queues:
+                if depth < len(queue):
+                    pos += 1
+                    result[queue[depth][2].id] = pos
+                    added = True
+            if not added:
+                return result
+            depth += 1
+
+    async def _notify(self, job, position):
+        # True tab jab user tak position pahunch gayi
+        try:
+            return await self.on_position(job, position)
+        except Exception as e:
+            logger.warning(f"Queue position update failed : {e}")
+            return False
+
+    def _ensure_refresher(self):
+        if self.on_position and (self._refresher is None or self._refresher.done()):
+            self._refresher = asyncio.create_task(self._refresh_positions())
+
+    async def _refresh_positions(self):
+        while self.queued:
+            await asyncio.sleep(self.refresh_interval)
+            waiting = {entry[1]: entry[2] for queue in self._queues.values() for entry in queue}
+            # Line ke aage wale pehle, taaki edit budget kam pade to unhe pehle naya number mile.
+            # Jinka edit abhi budget mein nahi aaya unka purana number rehta hai, agle tick par phir koshish
+            for job_id, pos in self.positions().items():
+                job = waiting[job_id]
+                if job.started is None and position_moved(job.position, pos) and await self._notify(job, pos):
+                    job.position = pos
+
+
+async def show_position(job, position):
+    if job.batch:
+        return True     # batch ka ek hi status message hai, per-file position nahi
+    text = f"⏳ Queue Position : {position}\n\nAapki file line mein hai, turn aate hi rename shuru hoga."
+    if job.status_msg is None:
+        job.status_msg = await job.msg.reply_text(text, reply_markup=CANCEL_MARKUP)
+        # Cancel button is job ko line se hata de
+        jobs.attach(job.key, job.status_msg)
+        return True
+    # Refresh ke edits progress wale budget se hi (chat interval + global bucket), FloodWait se bachne ko
+    return await progress_reporter.edit(job.status_msg, text, CANCEL_MARKUP)
+
+
+scheduler = RenameScheduler(
+    Config.MAX_CONCURRENT_DOWNLOADS,
+    Config.MAX_CONCURRENT_UPLOADS,
+    Config.PER_USER_JOBS,
+    refresh_interval=Config.QUEUE_REFRESH_INTERVAL,
+    on_position=show_position,
+    stage_depths={
+        "download": Config.PIPELINE_DOWNLOAD_DEPTH,
+        "upload": Config.PIPELINE_UPLOAD_DEPTH,
+    } if Config.PIPELINE_MODE else None,
+    small_size=Config.SMALL_FILE_SIZE,
+    large_size=Config.LARGE_FILE_SIZE,
+    small_reserved=Config.SMALL_LANE_RESERVED,
+    large_slots=Config.LARGE_LANE_SLOTS,
+    aging_rate=Config.JOB_AGING_RATE,
+)
+
+Gauge("rename_jobs_active", "Rename jobs currently running", fn=lambda: scheduler.running)
+Gauge("rename_jobs_queued", "Rename jobs waiting in queue", fn=lambda: scheduler.queued)
+Gauge("rename_jobs_completed", "Rename jobs finished since start", fn=lambda: scheduler.completed)
+Gauge("rename_jobs_failed", "Rename jobs crashed since start", fn=lambda: scheduler.failed)
+Gauge("rename_fast_path_bytes_saved", "Bytes not transferred thanks to file_id reuse", fn=lambda: scheduler.bytes_saved)
@@ -0,0 +1,162 @@
+import asyncio, logging, os, shutil, time
+from contextlib import asynccontextmanager, contextmanager
+from config import Config
+from .metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_DIR = "downloads"
+KEEP = {"thumbs"}       # downloads/ ke andar ye directories sweep nahi hoti
+
+
+class StorageFull(Exception):
+    pass
+
+
+class MemoryBudget:
+    # Saare concurrent jobs ke in-memory buffers ka total `cap` bytes se upar nahi jaata
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.used = 0
+        self.peak = 0
+
+    def try_reserve(self, size):
+        # Budget na ho to wait nahi karte, job disk wale raaste par chala jata hai
+        if size <= 0 or self.used + size > self.cap:
+            return False
+        self.used += size
+        self.peak = max(self.peak, self.used)
+        return True
+
+    def release(self, size):
+        self.used = max(0, self.used - size)
+
+
+class DiskBudget:
+    # Download shuru hone se pehle file_size bytes reserve karo; jagah na ho to job line mein rukta hai.
+    # quota diya ho to disk ki jagah wahi capacity maani jaati hai (tests / shared volumes ke liye).
+
+    def __init__(self, directory, margin, quota=0):
+        self.directory = directory
+        self.margin = margin
+        self.quota = quota
+        self.reserved = 0
+        self.waiting = 0
+        self._active = {}       # workdir -> reserved bytes
+        self._cond = asyncio.Condition()
+
+    def _written(self):
+        # Chal rahe downloads ne jitna likh diya woh disk free mein already ghat chuka hai
+        total = 0
+        for workdir in self._active:
+            for root, _, files in os.walk(workdir):
+                for name in files:
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+        return total
+
+    def capacity(self):
+        if self.quota:
+            return self.quota
+        os.makedirs(self.directory, exist_ok=True)
+        return shutil.disk_usage(self.directory).free + self._written() - self.margin
+
+    def available(self):
+        return self.capacity() - self.reserved
+
+    def pressure(self):
+        # 0 = khali, 1 = poori reserve ho chuki
+        capacity = self.capacity()
+        return round(min(1.0, self.reserved / capacity), 4) if capacity > 0 else 1.0
+
+    def would_wait(self, size):
+        return size > self.available()
+
+    @asynccontextmanager
+    async def reserve(self, size, workdir, guard=None):
+        # guard: async callable(wait), jaise jobs.guard, jo cancel par wait beech mein tod de
+        async with self._cond:
+            # Sab jobs khatam hone par bhi jagah na bane to wait ka fayda nahi
+            if size > self.capacity():
+                raise StorageFull(f"{size} bytes ki jagah disk par nahi hai")
+            self.waiting += 1
+            try:
+                wait = lambda: self._cond.wait_for(lambda: not self._active or size <= self.available())
+                await (guard(wait) if guard else wait())
+            finally:
+                self.waiting -= 1
+            self.reserved += size
+            self._active[workdir] = size
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.reserved -= self._active.pop(workdir, 0)
+                self._cond.notify_all()
+
+
+def workspace_path(name):
+    return os.path.join(DOWNLOAD_DIR, f"job_{name}")
+
+
+@contextmanager
+def job_workspace(name, keep=None):
+    # Har job ki apni temp directory, taaki same naam ki files users ke beech na takrayein.
+    # Job kaise bhi khatam ho (error/cancel), directory yahin se hategi.
+    # Process crash ho jaye to directory bachi rehti hai aur journal se resume hone par wahi milti hai;
+    # keep() True de (restart ke waqt beech mein ruka job) to bhi directory resume ke liye rehti hai.
+    path = workspace_path(name)
+    os.makedirs(path, exist_ok=True)
+    ACTIVE_WORKSPACES.add(path)
+    try:
+        yield path
+    finally:
+        ACTIVE_WORKSPACES.discard(path)
+        if not (keep and keep()):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def sweep_orphans(min_age=0, keep=()):
+    # downloads/ mein jo kisi active job ka nahi hai (crash / purane partial files) woh hata do.
+    # keep: journal se resume hone wale jobs ki directories
+    if not os.path.isdir(DOWNLOAD_DIR):
+        return 0
+    removed = 0
+    now = time.time()
+    for name in os.listdir(DOWNLOAD_DIR):
+        path = os.path.join(DOWNLOAD_DIR, name)
+        if name in KEEP or path in ACTIVE_WORKSPACES or path in keep:
+            continue
+        try:
+            if now - os.path.getmtime(path) < min_age:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            removed += 1
+        except OSError as e:
+            logger.warning(f"Sweep failed for {path} : {e}")
+    return removed
+
+
+async def sweep_periodically(interval, min_age):
+    while True:
+        await asyncio.sleep(interval)
+        removed = sweep_orphans(min_age)
+        if removed:
+            logger.info(f"Storage sweep removed {removed} orphaned entries")
+
+
+ACTIVE_WORKSPACES = set()
+
+memory_budget = MemoryBudget(Config.IN_MEMORY_BUDGET)
+disk_budget = DiskBudget(DOWNLOAD_DIR, Config.DISK_FREE_MARGIN, Config.DOWNLOAD_QUOTA)
+
+Gauge("disk_pressure_ratio", "Reserved download bytes / usable disk capacity", fn=disk_budget.pressure)
+Gauge("disk_reserved_bytes", "Bytes reserved by running downloads", fn=lambda: disk_budget.reserved)
+Gauge("disk_waiting_jobs", "Jobs waiting for disk space", fn=lambda: disk_budget.waiting)
+Gauge("memory_buffer_bytes", "Bytes held by in-memory renames", fn=lambda: memory_budget.used)
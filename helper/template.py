@@ -0,0 +1,76 @@
+import re
+
+# Format template ko ek baar tokens (literal / placeholder) mein compile karo,
+# phir har file par sirf ek join. Token = (name, text); name None ho to literal.
+
+_BRACED = re.compile(r"\{\{|\}\}|\{(\w+)\}")
+_BARE = re.compile(r"(episode|Episode|EPISODE)|(quality|Quality|QUALITY)")
+
+FILENAME_FIELDS = ("episode", "quality", "old_name")
+CAPTION_FIELDS = ("filename", "filesize", "duration", "quality")
+
+
+def _compile_braced(template, fields):
+    tokens, pos = [], 0
+    for m in _BRACED.finditer(template):
+        if m.start() > pos:
+            tokens.append((None, template[pos:m.start()]))
+        name = m.group(1)
+        if name is None:
+            tokens.append((None, m.group(0)[0]))      # {{ / }} escape
+        elif name in fields:
+            tokens.append((name, m.group(0)))
+        else:
+            tokens.append((None, m.group(0)))         # unknown {key} literal rahega
+        pos = m.end()
+    if pos < len(template):
+        tokens.append((None, template[pos:]))
+    return tokens
+
+
+def compile_filename_template(template):
+    tokens = _compile_braced(template, FILENAME_FIELDS)
+    # Agar {episode}/{quality} use kiye hain to bare words ("episode") title ka hissa maane jayenge.
+    # Warna purana behaviour: bare keywords placeholder hain (episode sirf pehli baar).
+    if any(name in ("episode", "quality") for name, _ in tokens):
+        return _merge(tokens)
+    result, episode_done = [], False
+    for name, text in tokens:
+        if name is not None:
+            result.append((name, text))
+            continue
+        pos = 0
+        for m in _BARE.finditer(text):
+            if m.group(1) and episode_done:
+                continue
+            if m.start() > pos:
+                result.append((None, text[pos:m.start()]))
+            if m.group(1):
+                episode_done = True
+                result.append(("episode", m.group(0)))
+            else:
+                result.append(("quality", m.group(0)))
+            pos = m.end()
+        if pos < len(text):
+            result.append((None, text[pos:]))
+    return _merge(result)
+
+
+def compile_caption_template(template):
+    return _merge(_compile_braced(template, CAPTION_FIELDS))
+
+
+def _merge(tokens):
+    # Lagatar literals ko jod do taaki render mein kam pieces hon
+    merged = []
+    for name, text in tokens:
+        if name is None and merged and merged[-1][0] is None:
+            merged[-1] = (None, merged[-1][1] + text)
+        else:
+            merged.append((name, text))
+    return tuple(merged)
+
+
+def render(tokens, values):
+    # Value None ho to placeholder ka original text hi rehta hai; kabhi exception nahi
+    return "".join([text if name is None else (values.get(name) or text) for name, text in tokens])
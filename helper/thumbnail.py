@@ -0,0 +1,105 @@
+import asyncio, os
+from collections import OrderedDict
+from PIL import Image
+from config import Config
+from .storage import DOWNLOAD_DIR
+
+THUMB_DIR = os.path.join(DOWNLOAD_DIR, "thumbs")
+
+
+def _process(src, dst):
+    # PIL ka kaam thread pool mein chalta hai, event loop block nahi hota
+    with Image.open(src) as img:
+        img = img.convert("RGB")
+        img.thumbnail((320, 320), Image.LANCZOS)
+        img.save(dst, "JPEG")
+
+
+class ThumbCache:
+    # Processed 320px JPEG thumbnails disk par, file_unique_id se keyed, size-bounded LRU.
+    # Jo thumb kisi upload mein use ho raha hai (pinned) woh evict nahi hota.
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # key -> (path, size)
+        self._pins = {}                 # key -> active users
+        self._locks = {}                # key -> Lock (single-flight download)
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Restart ke baad purane processed thumbs dobara use ho sakein
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".jpg") and os.path.isfile(path):
+                files.append((os.path.getmtime(path), name[:-4], path, os.path.getsize(path)))
+            else:
+                os.remove(path)
+        for _, key, path, size in sorted(files):
+            self._entries[key] = (path, size)
+            self.size += size
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.jpg")
+
+    async def acquire(self, client, file_id, key):
+        if key not in self._entries:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                if key not in self._entries:
+                    self.misses += 1
+                    await self._fetch(client, file_id, key)
+            self._locks.pop(key, None)
+        else:
+            self.hits += 1
+        self._entries.move_to_end(key)
+        self._pins[key] = self._pins.get(key, 0) + 1
+        return self._entries[key][0]
+
+    def release(self, key):
+        left = self._pins.get(key, 1) - 1
+        if left:
+            self._pins[key] = left
+        else:
+            self._pins.pop(key, None)
+        self._evict()
+
+    async def _fetch(self, client, file_id, key):
+        path = self._path(key)
+        raw = await client.download_media(file_id, file_name=f"{path}.raw")
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _process, raw, path)
+        finally:
+            if os.path.exists(raw):
+                os.remove(raw)
+        size = os.path.getsize(path)
+        self._entries[key] = (path, size)
+        self.size += size
+        self._evict()
+
+    def invalidate(self, key):
+        entry = self._entries.pop(key, None) if key and key not in self._pins else None
+        if entry:
+            self.size -= entry[1]
+            if os.path.exists(entry[0]):
+                os.remove(entry[0])
+
+    def _evict(self):
+        for key in list(self._entries):
+            if self.size <= self.max_bytes:
+                return
+            if key in self._pins:
+                continue
+            self.invalidate(key)
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+thumb_cache = ThumbCache(THUMB_DIR, Config.THUMB_CACHE_MB * 1024 * 1024)
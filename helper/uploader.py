@@ -0,0 +1,174 @@
+import asyncio, json, logging, mmap, os, time
+from pyrogram import raw, StopTransmission, utils
+from pyrogram.errors import FloodWait
+from .downloader import session_pool
+
+logger = logging.getLogger(__name__)
+
+PART_SIZE = 512 * 1024      # upload.SaveBigFilePart ki max part size
+STATE_TTL = 3600            # Telegram uploaded parts thodi der hi rakhta hai, usse purani state bekaar
+
+
+class TelegramPartSink:
+    # Home DC ke pooled media sessions, har ek par SaveBigFilePart
+
+    def __init__(self, client):
+        self.client = client
+
+    async def open(self, count):
+        dc_id = await self.client.storage.dc_id()
+        sessions = await session_pool(self.client).get(dc_id, count)
+
+        def saver(session):
+            async def save(file_id, part, total, data):
+                ok = await session.invoke(raw.functions.upload.SaveBigFilePart(
+                    file_id=file_id, file_part=part, file_total_parts=total, bytes=data
+                ))
+                if not ok:
+                    raise IOError(f"Part {part} rejected")
+            return save
+
+        return [saver(s) for s in sessions]
+
+    async def close(self):
+        pass    # sessions pool ke hain, agle uploads bhi inhi se
+
+
+class ChunkedUploader:
+    # File mmap karke parts seedha usi memory se bhejte hain (koi extra copy nahi), kai sessions ek saath.
+    # Bheje gaye parts `<path>.upload` mein likhe jaate hain, retry wahin se shuru hota hai.
+
+    def __init__(self, parallelism, part_size=PART_SIZE, retries=3):
+        self.parallelism = parallelism
+        self.part_size = part_size
+        self.retries = retries
+
+    def _load_state(self, state_path, size):
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+            if (state.get("size") == size and state.get("part") == self.part_size
+                    and time.time() - state.get("created", 0) < STATE_TTL):
+                return state["file_id"], state["created"], set(state["done"])
+        except (OSError, ValueError, KeyError):
+            pass
+        return int.from_bytes(os.urandom(8), "big", signed=True), time.time(), set()
+
+    def _save_state(self, state_path, size, file_id, created, done):
+        tmp = f"{state_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"size": size, "part": self.part_size, "file_id": file_id,
+                       "created": created, "done": sorted(done)}, f)
+        os.replace(tmp, state_path)
+
+    async def upload(self, sink, path, progress=None, progress_args=()):
+        size = os.path.getsize(path)
+        state_path = f"{path}.upload"
+        total_parts = (size + self.part_size - 1) // self.part_size
+        file_id, created, done = self._load_state(state_path, size)
+        pending = asyncio.Queue()
+        for part in range(total_parts):
+            if part not in done:
+                pending.put_nowait(part)
+
+        f = open(path, "rb")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            sent = [sum(min(self.part_size, size - p * self.part_size) for p in done)]
+
+            async def worker(save):
+                while not pending.empty():
+                    part = pending.get_nowait()
+                    offset = part * self.part_size
+                    data = memoryview(mm)[offset:offset + self.part_size]
+                    await self._save(save, file_id, part, total_parts, data)
+                    done.add(part)
+                    sent[0] += len(data)
+                    del data
+                    if len(done) % 32 == 0:
+                        self._save_state(state_path, size, file_id, created, done)
+                    if progress:
+                        await progress(sent[0], size, *progress_args)
+
+            tasks = []
+            try:
+                # open() bhi try ke andar, beech mein fail ho to bhi close() chale
+                savers = await sink.open(min(self.parallelism, max(pending.qsize(), 1)))
+                tasks = [asyncio.create_task(worker(s)) for s in savers]
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                self._save_state(state_path, size, file_id, created, done)
+                await sink.close()
+        finally:
+            try:
+                mm.close()
+            except BufferError:
+                pass    # koi part abhi bhi kisi request mein refer ho raha hai, GC band kar dega
+            f.close()
+
+        if len(done) != total_parts:
+            raise IOError(f"Incomplete upload: {len(done)}/{total_parts} parts")
+        os.remove(state_path)     # poora upload ho gaya, resume state ki zarurat nahi
+        return raw.types.InputFileBig(id=file_id, parts=total_parts, name=os.path.basename(path))
+
+    async def _save(self, save, file_id, part, total, data):
+        for attempt in range(self.retries + 1):
+            try:
+                return await save(file_id, part, total, data)
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                logger.warning(f"Part {part} retry {attempt + 1} : {e}")
+                await asyncio.sleep(1 + attempt)
+        raise IOError(f"Part {part} failed")
+
+
+async def parallel_upload(client, path, parallelism, progress=None, progress_args=(), attempts=2):
+    uploader = ChunkedUploader(parallelism)
+    for attempt in range(attempts):
+        try:
+            return await uploader.upload(TelegramPartSink(client), path, progress, progress_args)
+        except StopTransmission:
+            raise       # user ne cancel kiya, retry nahi
+        except Exception as e:
+            # .upload state bachi rehti hai, sirf bache hue parts dobara jayenge
+            if attempt == attempts - 1:
+                raise
+            logger.warning(f"Parallel upload failed, resuming : {e}")
+
+
+async def send_uploaded(client, chat_id, mtype, file, file_name, caption, thumb, meta):
+    # Parts pehle hi server par hain, ab sirf assembled InputFile ke saath message bhejo
+    # (mime/attributes wahi jo pyrogram ke send_document/send_video/send_audio lagate hain)
+    name_attr = raw.types.DocumentAttributeFilename(file_name=file_name)
+    if mtype == "video":
+        mime = client.guess_mime_type(file_name) or "video/mp4"
+        attributes = [raw.types.DocumentAttributeVideo(
+            supports_streaming=True, duration=meta.duration, w=meta.width, h=meta.height
+        ), name_attr]
+    elif mtype == "audio":
+        mime = client.guess_mime_type(file_name) or "audio/mpeg"
+        attributes = [raw.types.DocumentAttributeAudio(duration=meta.duration), name_attr]
+    else:
+        mime = client.guess_mime_type(file_name) or "application/zip"
+        attributes = [name_attr]
+
+    media = raw.types.InputMediaUploadedDocument(
+        mime_type=mime,
+        file=file,
+        thumb=await client.save_file(thumb) if thumb else None,
+        attributes=attributes
+    )
+    await client.invoke(raw.functions.messages.SendMedia(
+        peer=await client.resolve_peer(chat_id),
+        media=media,
+        random_id=client.rnd_id(),
+        **await utils.parse_text_entities(client, caption, None, None)
+    ))
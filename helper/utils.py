@@ -3,42 +3,44 @@ from datetime import datetime, date
 from pytz import timezone
 from shortzy import Shortzy
 from config import Config, Txt
+from pyrogram import StopTransmission
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from .progress import ProgressReporter
+from .jobs import jobs
 
-async def progress_for_pyrogram(current, total, ud_type, message, start):
-    diff = time.time() - start
-    # Har 5 second ya last update par progress bar update karo
-    if round(diff % 5) == 0 or current == total:
-        pct = current * 100 / total
-        speed = current / diff
-        elapsed_ms = round(diff) * 1000
-        eta_ms = elapsed_ms + round((total - current) / speed) * 1000
-        elapsed = TimeFormatter(milliseconds=elapsed_ms)
-        eta = TimeFormatter(milliseconds=eta_ms)
-        
-        # Dynamic progress bar banane ka tarika:
-        bar_length = 10  # total blocks
-        filled_length = int(bar_length * current // total)
-        bar = '[' + '■' * filled_length + '□' * (bar_length - filled_length) + f'] {round(pct, 2)}%'
-        
-        txt = bar + Txt.PROGRESS_BAR.format(
-            round(pct, 2),
-            humanbytes(current),
-            humanbytes(total),
-            humanbytes(speed),
-            eta if eta != '' else "0 s"
-        )
-        try:
-            await message.edit(
-                text=f"{ud_type}\n\n{txt}",
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("✖️ Cancel ✖️", callback_data="close")]])
-            )
-        except Exception:
-            pass
+CANCEL_MARKUP = InlineKeyboardMarkup([[InlineKeyboardButton("✖️ Cancel ✖️", callback_data="close")]])
+
+def render_progress(current, total, speed, eta_s, ud_type):
+    pct = current * 100 / total if total else 0
+    eta = TimeFormatter(milliseconds=round(eta_s) * 1000)
+    
+    # Dynamic progress bar banane ka tarika:
+    bar_length = 10  # total blocks
+    filled_length = int(bar_length * current // total) if total else 0
+    bar = '[' + '■' * filled_length + '□' * (bar_length - filled_length) + f'] {round(pct, 2)}%'
+    
+    txt = bar + Txt.PROGRESS_BAR.format(
+        round(pct, 2),
+        humanbytes(current),
+        humanbytes(total),
+        humanbytes(speed),
+        eta if eta != '' else "0 s"
+    )
+    return f"{ud_type}\n\n{txt}", CANCEL_MARKUP
 
+progress_reporter = ProgressReporter(
+    render_progress,
+    chat_interval=Config.PROGRESS_CHAT_INTERVAL,
+    global_rate=Config.PROGRESS_GLOBAL_RATE,
+)
+
+async def progress_for_pyrogram(current, total, ud_type, message, start):
+    # Cancel dabaya gaya ho to transfer yahin ruk jaata hai (pyrogram ka client.stop_transmission() yahi raise karta hai)
+    if jobs.message_cancelled(message.chat.id, message.id):
+        raise StopTransmission
+    # Edit budget, coalescing aur speed/ETA sab ProgressReporter sambhalta hai
+    await progress_reporter.report(current, total, ud_type, message, start)
 
-            
-            
 
 def humanbytes(size):    
     if not size:
@@ -1,8 +1,14 @@
 from config import Config, Txt
 from helper.database import DvisPappa
+from helper.broadcast import broadcaster
+from helper.scheduler import scheduler, LANES
+from helper.jobs import jobs
+from helper.journal import journal
+from helper.metrics import STAGE_SECONDS, JOB_SECONDS, LOOP_LAG, BYTES_TOTAL, FLOOD_WAITS, MONGO_SECONDS
+from helper.utils import humanbytes
+from helper.dbaudit import MONGO_QUERIES
 from pyrogram.types import Message
 from pyrogram import Client, filters
-from pyrogram.errors import FloodWait, InputUserDeactivated, UserIsBlocked, PeerIdInvalid
 import os, sys, time, asyncio, logging, datetime
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
@@ -18,14 +24,27 @@ async def restart_bot(b, m):
     global is_restarting
     if not is_restarting:
         is_restarting = True
-        await m.reply_text("**🔄 Restarting.....**")
+        await m.reply_text(f"**🔄 Restarting.....**\n\nNaye jobs band, chal rahe jobs ke khatam hone ka wait (max `{Config.RESTART_DRAIN_TIMEOUT}s`)...")
+        # Handler ke andar b.stop() await nahi kar sakte (dispatcher isi handler ka wait karega), isliye alag task
+        asyncio.create_task(graceful_restart(b, m))
 
-        # Gracefully stop the bot's event loop
-        b.stop()
-        time.sleep(2)  # Adjust the delay duration based on your bot's shutdown time
+async def graceful_restart(b, m):
+    left = await scheduler.drain(Config.RESTART_DRAIN_TIMEOUT)
+    if left:
+        # Inka stage journal mein hai, restart ke baad wahin se resume honge. b.stop() ke baad yeh
+        # normal error se fail honge; journal unhe done likhne aur workspace hatane se rokta hai
+        logger.warning(f"Restarting with {left} jobs still running")
+        journal.interrupt()
+    try:
+        await m.reply_text(f"**♻️ Restart ho raha hai** (`{left}` jobs restart ke baad resume honge)")
+    except Exception:
+        pass
+
+    # Gracefully stop the bot
+    await b.stop()
 
-        # Restart the bot process
-        os.execl(sys.executable, sys.executable, *sys.argv)
+    # Restart the bot process
+    os.execl(sys.executable, sys.executable, *sys.argv)
 
 
 @Client.on_message(filters.private & filters.command(["tutorial"]))
@@ -49,52 +68,44 @@ async def get_stats(bot, message):
     st = await message.reply('**Accessing The Details.....**')    
     end_t = time.time()
     time_taken_s = (end_t - start_t) * 1000
-    await st.edit(text=f"**--Bot Status--** \n\n**⌚️ Bot Uptime :** {uptime} \n**🐌 Current Ping :** `{time_taken_s:.3f} ms` \n**👭 Total Users :** `{total_users}`")
+    await st.edit(text=f"**--Bot Status--** \n\n**⌚️ Bot Uptime :** {uptime} \n**🐌 Current Ping :** `{time_taken_s:.3f} ms` \n**👭 Total Users :** `{total_users}`\n\n{perf_summary()}")
+
+def perf_summary():
+    stages = " | ".join(f"{s} `{STAGE_SECONDS.mean(stage=s):.2f}s`" for s in ("db_lookup", "download", "metadata", "thumbnail", "upload"))
+    lanes = "\n".join(
+        f"   {lane} : `{scheduler.lane_running(lane)}` active, `{scheduler.lane_queued(lane)}` queued, "
+        f"p50 `{JOB_SECONDS.quantile(0.5, lane=lane):.1f}s`, p95 `{JOB_SECONDS.quantile(0.95, lane=lane):.1f}s`"
+        for lane in LANES
+    )
+    return (
+        f"**⚙️ Jobs :** `{scheduler.running}` active, `{scheduler.queued}` queued, `{scheduler.completed}` done, `{scheduler.failed}` failed\n"
+        f"**⏱ Avg Stage :** {stages}\n"
+        f"**🚦 Lanes :**\n{lanes}\n"
+        f"**🌀 Loop Lag :** `{LOOP_LAG.value() * 1000:.1f} ms`\n"
+        f"**📦 Transferred :** in `{humanbytes(BYTES_TOTAL.value(direction='in')) or '0 b'}`, out `{humanbytes(BYTES_TOTAL.value(direction='out')) or '0 b'}`\n"
+        f"**🌊 FloodWaits :** `{FLOOD_WAITS.total()}`\n"
+        f"**🍃 Mongo find_one :** `{MONGO_SECONDS.mean(op='find_one') * 1000:.1f} ms` avg, `{MONGO_QUERIES.total()}` queries total"
+    )
+
+@Client.on_message(filters.private & filters.command("jobs") & filters.user(Config.ADMIN))
+async def list_jobs(bot: Client, m: Message):
+    active = jobs.active()
+    if not active:
+        return await m.reply_text("✅ Abhi koi rename job nahi chal raha.")
+    now = time.monotonic()
+    lines = [
+        f"`{e.uid}` • {e.state}{' (cancelled)' if e.cancelled else ''} • {humanbytes(e.size) or '?'} • {int(now - e.created)}s\n   {e.name}"
+        for e in active[:30]
+    ]
+    more = f"\n\n...aur {len(active) - 30} jobs" if len(active) > 30 else ""
+    await m.reply_text(f"**⚙️ Active Jobs : {len(active)}**\n\n" + "\n".join(lines) + more)
 
 @Client.on_message(filters.command(["broadcast", "gcast"]) & filters.user(Config.ADMIN) & filters.reply)
 async def broadcast_handler(bot: Client, m: Message):
+    if broadcaster.running:
+        return await m.reply_text("⚠️ Ek broadcast pehle se chal raha hai.")
     await bot.send_message(Config.LOG_CHANNEL, f"{m.from_user.mention} or {m.from_user.id} Is Started The Broadcast......")
-    all_users = await DvisPappa.get_all_users()
-    broadcast_msg = m.reply_to_message
     sts_msg = await m.reply_text("Broadcast Started..!") 
-    done = 0
-    failed = 0
-    success = 0
-    start_time = time.time()
-    total_users = await DvisPappa.total_users_count()
-    async for user in all_users:
-        sts = await send_msg(user['_id'], broadcast_msg)
-        if sts == 200:
-           success += 1
-        else:
-           failed += 1
-        if sts == 400:
-           await DvisPappa.delete_user(user['_id'])
-        done += 1
-        if not done % 20:
-           await sts_msg.edit(f"Broadcast In Progress: \n\nTotal Users {total_users} \nCompleted : {done} / {total_users}\nSuccess : {success}\nFailed : {failed}")
-    completed_in = datetime.timedelta(seconds=int(time.time() - start_time))
-    await sts_msg.edit(f"Bʀᴏᴀᴅᴄᴀꜱᴛ Cᴏᴍᴩʟᴇᴛᴇᴅ: \nCᴏᴍᴩʟᴇᴛᴇᴅ Iɴ `{completed_in}`.\n\nTotal Users {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nFailed: {failed}")
-           
-async def send_msg(user_id, message):
-    try:
-        await message.copy(chat_id=int(user_id))
-        return 200
-    except FloodWait as e:
-        await asyncio.sleep(e.value)
-        return send_msg(user_id, message)
-    except InputUserDeactivated:
-        logger.info(f"{user_id} : Deactivated")
-        return 400
-    except UserIsBlocked:
-        logger.info(f"{user_id} : Blocked The Bot")
-        return 400
-    except PeerIdInvalid:
-        logger.info(f"{user_id} : User ID Invalid")
-        return 400
-    except Exception as e:
-        logger.error(f"{user_id} : {e}")
-        return 500
-
-
-
+    # Broadcast ghanton chal sakta hai; handler mein await karne par /restart ka b.stop() uske khatam hone tak atakta.
+    # Checkpoint se resume hota hai, isliye alag task mein chalana safe hai
+    broadcaster.launch(m.reply_to_message, sts_msg)
@@ -1,6 +1,7 @@
 from pyrogram import Client, filters
 from pyrogram.errors import FloodWait
 from helper.database import DvisPappa
+from helper.template import compile_filename_template
 
 @Client.on_message(filters.private & filters.command("autorename"))
 async def auto_rename_command(client, message):
@@ -9,9 +10,14 @@ async def auto_rename_command(client, message):
     # Extract the format from the command
     format_template = message.text.split("/autorename", 1)[1].strip()
 
+    # Template ek hi baar yahin compile hota hai; wahi tokens cached settings mein jaate hain
+    tokens = compile_filename_template(format_template)
+
     # Save the format template to the database
-    await DvisPappa.set_format_template(user_id, format_template)
+    await DvisPappa.set_format_template(user_id, format_template, tokens)
 
+    if not any(name for name, _ in tokens):
+        return await message.reply_text("**Auto Rename Format Updated ✅**\n\n⚠️ Format mein episode / quality / {old_name} keyword nahi hai, har file ka naam same rahega.")
     await message.reply_text("**Auto Rename Format Updated Successfully! ✅**")
 
 @Client.on_message(filters.private & filters.command("setmedia"))
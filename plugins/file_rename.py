@@ -1,62 +1,59 @@
-from pyrogram import Client, filters
+from pyrogram import Client, filters, StopTransmission
 from pyrogram.types import Message
-from PIL import Image
-from datetime import datetime
-from hachoir.metadata import extractMetadata
-from hachoir.parser import createParser
-from helper.utils import progress_for_pyrogram, humanbytes, convert
+from helper.utils import progress_for_pyrogram, progress_reporter, humanbytes, convert, CANCEL_MARKUP
 from helper.database import DvisPappa
+from helper.scheduler import scheduler, RenameJob
+from helper.filename_parser import parse_filename
+from helper.template import render
+from helper.storage import memory_budget, disk_budget, job_workspace, StorageFull
+from helper.thumbnail import thumb_cache
+from helper.metadata import metadata_service
+from helper.metrics import STAGE_SECONDS, BYTES_TOTAL
+from helper.downloader import parallel_download
+from helper.uploader import parallel_upload, send_uploaded
+from helper.batch import batch_collector, RenameBatch, episode_key
+from helper.jobs import jobs, JobCancelled
+from helper.job_queue import shared_queue
+from helper.journal import journal, workspace_name, download_complete
+from contextlib import nullcontext, asynccontextmanager
+from functools import partial
 from config import Config
-import os, time, re
-
-RENAMES = {}
-
-# --- Extraction Functions ---
-def extract_episode(fname: str) -> str:
-    pats = [
-        r'S(\d+)(?:E|EP)(\d+)',
-        r'S(\d+)\s*(?:E|EP|-\s*EP)(\d+)',
-        r'(?:[([{<]\s*(?:E|EP)\s*(\d+)\s*[)\]}>])',
-        r'(?:\s*-\s*(\d+)\s*)',
-        r'S(\d+)[^\d]*(\d+)'
-    ]
-    for i, pat in enumerate(pats):
-        m = re.search(pat, fname, re.IGNORECASE)
-        if m:
-            return m.group(2) if i in [0, 1, 4] else m.group(1)
-    return None
-
-def extract_quality(fname: str) -> str:
-    qpats = [
-        (r'\b(?:.*?(\d{3,4}[^\dp]*p).*?|.*?(\d{3,4}p))\b', lambda m: m.group(1) or m.group(2)),
-        (r'[([{<]?\s*4k\s*[)\]}>]?', lambda m: "4k"),
-        (r'[([{<]?\s*2k\s*[)\]}>]?', lambda m: "2k"),
-        (r'[([{<]?\s*HdRip\s*[)\]}>]?|\bHdRip\b', lambda m: "HdRip"),
-        (r'[([{<]?\s*4kX264\s*[)\]}>]?', lambda m: "4kX264"),
-        (r'[([{<]?\s*4kx265\s*[)\]}>]?', lambda m: "4kx265")
-    ]
-    for pat, func in qpats:
-        m = re.search(pat, fname, re.IGNORECASE)
-        if m:
-            return func(m)
-    return "Unknown"
+import os, time, asyncio
 
 # --- Thumbnail Function ---
-async def get_thumb(client: Client, msg: Message, mtype: str) -> str:
+async def get_thumb(client: Client, msg: Message, mtype: str, settings) -> tuple:
+    # (cache key, path) deta hai; path thumb_cache mein pinned rehta hai jab tak release na ho
     try:
-        t = await DvisPappa.get_thumbnail(msg.chat.id)
-        if t:
-            return await client.download_media(t)
-        elif mtype == "video" and hasattr(msg, 'video') and msg.video and msg.video.thumbs:
-            best = max(msg.video.thumbs, key=lambda t: t.width if hasattr(t, 'width') and t.width else 0)
-            p = await client.download_media(best.file_id)
-            with Image.open(p) as img:
-                if img.width > 320:
-                    img.convert("RGB").resize((320,320), Image.LANCZOS).save(p, "JPEG")
-            return p
+        with STAGE_SECONDS.time(stage="thumbnail"):
+            if settings.file_id:
+                key = settings.thumb_unique_id or settings.file_id
+                return key, await thumb_cache.acquire(client, settings.file_id, key)
+            elif mtype == "video" and msg.video and msg.video.thumbs:
+                best = max(msg.video.thumbs, key=lambda t: t.width if hasattr(t, 'width') and t.width else 0)
+                return best.file_unique_id, await thumb_cache.acquire(client, best.file_id, best.file_unique_id)
     except Exception as e:
         print(f"Thumbnail Error: {e}")
-    return None
+    return None, None
+
+def build_caption(settings, new_name: str, fsize: int, dur: int, q: str) -> str:
+    if not settings.caption_tokens:
+        return new_name
+    return render(settings.caption_tokens, {
+        "filename": new_name,
+        "filesize": humanbytes(fsize),
+        "duration": convert(dur),
+        "quality": q,
+    })
+
+# --- Fast Path Decision ---
+def choose_path(media_kind: str, old_name: str, new_name: str, mtype: str, custom_thumb: str) -> str:
+    # Telegram file_id dobara bhejne par file ka naam aur thumbnail wahi rehta hai,
+    # isliye fast path tabhi jab naam, media type aur thumbnail teeno na badlein
+    if not Config.FAST_PATH:
+        return "stream"
+    if media_kind != mtype or custom_thumb or new_name != old_name:
+        return "stream"
+    return "fast"
 
 # --- Main Handler ---
 @Client.on_message(filters.private & (filters.document | filters.video | filters.audio))
@@ -66,27 +63,196 @@ async def auto_rename(client: Client, msg: Message):
         return
     
     uid = msg.from_user.id
+    if scheduler.paused:
+        return await msg.reply_text("🔄 Bot restart ho raha hai, thodi der baad file dobara bhejo.")
+    if Config.ROLE == "frontend":
+        # Frontend khud rename nahi karta, job Mongo queue mein; koi bhi worker utha lega
+        status = await msg.reply_text("⏳ File queue mein hai, worker milte hi rename shuru hoga.")
+        return await shared_queue.enqueue(msg, status)
+    
+    media = msg.document or msg.video or msg.audio
+    # Same file pehle se queue/progress mein hai to dobara nahi
+    if not jobs.register(uid, media.file_unique_id, media.file_name, media.file_size):
+        return
+    
+    if Config.BATCH_MODE:
+        # Burst ki saari files ek saath aayengi rename_batch mein
+        return batch_collector.add(client, uid, msg)
+    await rename_batch(client, uid, [msg])
+
+async def rename_batch(client: Client, uid: int, msgs: list):
+    # Poore batch ke liye ek settings lookup, ek status message, ek thumbnail
+    def forget():
+        for m in msgs:
+            jobs.finish(job_key(uid, m))
+    
     try:
-        fmt = await DvisPappa.get_format_template(uid)
-        mtype = (await DvisPappa.get_media_preference(uid)) or "document"
+        # Ek hi snapshot se saari settings (cache hit par zero query)
+        with STAGE_SECONDS.time(stage="db_lookup"):
+            settings = await DvisPappa.get_user_settings(uid)
     except Exception as e:
-        return await msg.reply_text(f"⚠️ Database Error: {str(e)}")
+        forget()
+        return await msgs[0].reply_text(f"⚠️ Database Error: {str(e)}")
+    
+    if not settings or not settings.format_template:
+        forget()
+        return await msgs[0].reply_text("⚠️ Pehle /autorename command se format set karo.")
+    
+    # Journal mein pehle, taaki crash ke baad bhi yeh files dobara chal sakein
+    for m in msgs:
+        await journal.received(m)
+    
+    # Handler sirf job queue mein daalta hai, baaki kaam scheduler karega
+    if len(msgs) == 1:
+        return await scheduler.submit(RenameJob(uid, msgs[0], lambda job: rename_file(client, job, settings), key=job_key(uid, msgs[0])))
+    
+    msgs.sort(key=episode_key)
+    batch = RenameBatch(uid, msgs, settings)
+    batch.status_msg = await msgs[0].reply_text(f"📦 {batch.total} files ka batch mila, episode order mein rename hoga...")
+    for m in msgs:
+        jobs.attach(job_key(uid, m), batch.status_msg)
+    if settings.file_id:
+        batch.thumb = await get_thumb(client, msgs[0], None, settings)
+    for index, m in enumerate(msgs):
+        job = RenameJob(uid, m, lambda job: rename_batch_item(client, job, settings), batch=batch, index=index, key=job_key(uid, m))
+        job.status_msg = batch.status_msg
+        await scheduler.submit(job)
+
+batch_collector.on_flush = rename_batch
+
+def job_key(uid: int, msg: Message) -> tuple:
+    return uid, (msg.document or msg.video or msg.audio).file_unique_id
+
+async def run_shared_job(client: Client, doc: dict):
+    # Worker side: frontend ke daale job ka message (aur uska status message) la kar wahi pipeline
+    ids = [doc["message_id"]] + ([doc["status_id"]] if doc.get("status_id") else [])
+    found = await client.get_messages(doc["chat_id"], ids)
+    msg, status = found[0], (found[1] if len(found) > 1 and not found[1].empty else None)
+    if msg.empty or not (msg.document or msg.video or msg.audio):
+        return
     
-    if not fmt:
+    uid = doc["uid"]
+    media = msg.document or msg.video or msg.audio
+    if not jobs.register(uid, media.file_unique_id, media.file_name, media.file_size):
+        return
+    # Settings frontend process ne likhi hain, isliye cache ke bajaye seedha Mongo se
+    settings = await DvisPappa.get_user_settings(uid, fresh=True)
+    if not settings or not settings.format_template:
+        jobs.finish(job_key(uid, msg))
         return await msg.reply_text("⚠️ Pehle /autorename command se format set karo.")
+    await journal.received(msg)
+    
+    finished = asyncio.get_running_loop().create_future()
+    async def run(job: RenameJob):
+        try:
+            await rename_file(client, job, settings)
+        finally:
+            if not finished.done():
+                finished.set_result(None)
+    
+    job = RenameJob(uid, msg, run, key=job_key(uid, msg))
+    job.status_msg = status
+    await scheduler.submit(job)
+    # Lease tab tak chalti rahe jab tak file sach mein poori na ho
+    await finished
+
+async def resume_jobs(client: Client, docs: list):
+    # Startup par: pichle process ke adhure jobs dobara queue mein.
+    # Workspace ka naam message se bana hai, isliye poori download hui file wahin mil jaati hai.
+    resumed = 0
+    for doc in docs:
+        try:
+            msg = await client.get_messages(doc["chat_id"], doc["message_id"])
+        except Exception as e:
+            print(f"Resume Error: {e}")
+            continue
+        if msg.empty or not (msg.document or msg.video or msg.audio):
+            await journal.close(doc["_id"])
+            continue
+        uid = doc["uid"]
+        media = msg.document or msg.video or msg.audio
+        if not jobs.register(uid, media.file_unique_id, media.file_name, media.file_size):
+            continue
+        settings = await DvisPappa.get_user_settings(uid)
+        if not settings or not settings.format_template:
+            jobs.finish(job_key(uid, msg))
+            await journal.close(doc["_id"])
+            continue
+        job = RenameJob(uid, msg, lambda job, settings=settings: rename_file(client, job, settings), key=job_key(uid, msg))
+        try:
+            job.status_msg = await msg.reply_text("♻️ Bot restart hua tha, aapki file ka rename dobara shuru ho raha hai...")
+        except Exception as e:
+            print(f"Resume Notify Error: {e}")
+        await scheduler.submit(job)
+        resumed += 1
+    return resumed
+
+def batch_turn(job: RenameJob):
+    # Batch ki files download kisi bhi order mein hon, bheji episode order mein hi jaati hain
+    return job.batch.gate.turn(job.index) if job.batch else nullcontext()
+
+@asynccontextmanager
+async def reserve_disk(job: RenameJob, size: int, workdir: str):
+    # Batch ki files disk bhi episode order mein reserve karti hain. Warna agla episode jagah le kar
+    # pichle ki upload turn ka wait karta, aur pichla usi jagah ka: dono hamesha ke liye atak jaate
+    guard = partial(jobs.guard, job.key)
+    if job.batch:
+        await guard(partial(job.batch.disk_gate.wait, job.index))
+    async with disk_budget.reserve(size, workdir, guard=guard):
+        await disk_turn_done(job)
+        yield
+
+async def disk_turn_done(job: RenameJob):
+    if job.batch:
+        await job.batch.disk_gate.finish(job.index)
+
+async def rename_batch_item(client: Client, job: RenameJob, settings):
+    # rename_file kahin se bhi return ho, batch ka gate aage badhna chahiye
+    try:
+        await rename_file(client, job, settings)
+    finally:
+        await finish_batch_item(job)
+
+async def finish_batch_item(job: RenameJob):
+    batch = job.batch
+    # Jo file disk tak pahunchi hi nahi (fast path, error, cancel) uski disk turn bhi yahin aage badhti hai
+    await batch.disk_gate.finish(job.index)
+    await batch.gate.finish(job.index)
+    batch.done += 1
+    if batch.done == batch.total:
+        if batch.thumb[0]:
+            thumb_cache.release(batch.thumb[0])
+        text = f"✅ Batch complete : {batch.total} files"
+    else:
+        text = f"📦 Batch : {batch.done}/{batch.total} files ho gayi"
+    try:
+        progress_reporter.discard(batch.status_msg)
+        await batch.status_msg.edit(text)
+    except Exception as e:
+        print(f"Batch Status Error: {e}")
+
+async def rename_file(client: Client, job: RenameJob, settings):
+    msg = job.msg
+    mtype = settings.media_type or "document"
+    media = msg.document or msg.video or msg.audio
+    fid = media.file_id
     
     try:
         if msg.document:
-            fid, fname, fsize = msg.document.file_id, msg.document.file_name, msg.document.file_size
+            fname, fsize = msg.document.file_name, msg.document.file_size
         elif msg.video:
-            fid, fname, fsize = msg.video.file_id, msg.video.file_name or f"video_{msg.video.file_unique_id}", msg.video.file_size
+            fname, fsize = msg.video.file_name or f"video_{msg.video.file_unique_id}", msg.video.file_size
             fname = f"{os.path.splitext(fname)[0]}.mp4" if not os.path.splitext(fname)[1] else fname
         elif msg.audio:
-            fid, fname, fsize = msg.audio.file_id, msg.audio.file_name or f"audio_{msg.audio.file_unique_id}", msg.audio.file_size
+            fname, fsize = msg.audio.file_name or f"audio_{msg.audio.file_unique_id}", msg.audio.file_size
             fname = f"{os.path.splitext(fname)[0]}.mp3" if not os.path.splitext(fname)[1] else fname
         else:
+            jobs.finish(job.key)
+            await journal.done(msg)
             return await msg.reply_text("❌ Unsupported File Type")
     except Exception as e:
+        jobs.finish(job.key)
+        await journal.done(msg)
         return await msg.reply_text(f"❌ File Info Error: {str(e)}")
     
     # Force video format if file extension indicates video
@@ -95,103 +261,240 @@ async def auto_rename(client: Client, msg: Message):
     if ext in video_exts:
         mtype = "video"
     
-    if fid in RENAMES and (datetime.now() - RENAMES[fid]).seconds < 10:
+    interrupted = False
+    try:
+        # Queue mein rehte hue hi cancel ho gaya ho to kuch shuru mat karo
+        jobs.check(job.key)
+        info = parse_filename(fname or "")
+        q = info.quality
+        fmt = render(settings.format_tokens, {
+            "episode": info.episode,
+            "quality": q,
+            "old_name": os.path.splitext(fname)[0] if fname else "file",
+        })
+        new_name = f"{fmt}{ext}"
+        
+        media_kind = "document" if msg.document else "video" if msg.video else "audio"
+        if choose_path(media_kind, media.file_name, new_name, mtype, settings.file_id) == "fast":
+            try:
+                # Sirf naya caption, download/upload ki zarurat nahi
+                async with batch_turn(job):
+                    await client.send_cached_media(
+                        msg.chat.id,
+                        fid,
+                        caption=build_caption(settings, new_name, fsize, getattr(media, "duration", 0) or 0, q)
+                    )
+                scheduler.record_path(job, "fast", fsize)
+                if job.status_msg and not job.batch:
+                    await job.status_msg.delete()
+                return
+            except Exception as e:
+                print(f"Fast Path Error, streaming instead: {e}")
+        scheduler.record_path(job, "stream", fsize)
+        
+        # Chhoti files RAM mein hi (agar memory budget mein jagah ho), baaki job ki apni temp dir mein
+        in_memory = bool(fsize) and fsize <= Config.IN_MEMORY_THRESHOLD and memory_budget.try_reserve(fsize)
+        try:
+            with job_workspace(workspace_name(msg.chat.id, msg.id), keep=lambda: journal.interrupted) as workdir:
+                if in_memory:
+                    # Disk nahi chahiye, batch ki agli file ki disk turn na roko
+                    await disk_turn_done(job)
+                    await stream_rename(client, job, settings, mtype, new_name, fsize, q, None)
+                else:
+                    if disk_budget.would_wait(fsize or 0):
+                        await notify(job, "💾 Disk space ka wait ho raha hai, jagah khali hote hi download shuru hoga...", CANCEL_MARKUP)
+                    # Disk par jagah reserve hone ke baad hi download
+                    async with reserve_disk(job, fsize or 0, workdir):
+                        await stream_rename(client, job, settings, mtype, new_name, fsize, q, os.path.join(workdir, new_name))
+        finally:
+            if in_memory:
+                memory_budget.release(fsize)
+        
+    except JobCancelled:
+        # Cancel button status message khud hata deta hai, yahan bas resources chhodne hain
         return
-    RENAMES[fid] = datetime.now()
+    except StorageFull:
+        return await notify(job, "❌ Server par is file ke liye disk space nahi hai.")
+    except Exception as e:
+        if journal.interrupted:
+            # Restart ke waqt band hote session se ruka: journal mein adhura aur workspace wahin, restart ke baad resume
+            interrupted = True
+            return print(f"Rename Interrupted By Restart: {e}")
+        return await msg.reply_text(f"❌ Main Error: {str(e)}")
+    finally:
+        jobs.finish(job.key)
+        # Error ho ya success, user ko bataya ja chuka hai; crash ya restart par beech mein ruka job done nahi hota, isliye resume hoga
+        if not interrupted:
+            await journal.done(msg)
+
+async def notify(job: RenameJob, text: str, markup=None):
+    if job.batch:
+        text = job.batch.label(job.index) + text
+    if job.status_msg:
+        # Ruki hui progress ka trailing edit is text ko overwrite na kare
+        progress_reporter.discard(job.status_msg)
+        await job.status_msg.edit(text, reply_markup=markup)
+    else:
+        job.status_msg = await job.msg.reply_text(text, reply_markup=markup)
+    jobs.attach(job.key, job.status_msg)
+
+async def stream_rename(client: Client, job: RenameJob, settings, mtype: str, new_name: str, fsize: int, q: str, path: str):
+    # path None ho to file in-memory buffer mein aati hai
+    msg = job.msg
+    label = job.batch.label(job.index) if job.batch else ""
     
+    # Batch ka custom thumbnail pehle se tayyar hai, warna download ke saath hi banta rahe
+    shared_thumb = job.batch.thumb if job.batch else (None, None)
+    thumb_task = None if shared_thumb[1] else asyncio.create_task(get_thumb(client, msg, mtype, settings))
     try:
-        ep = extract_episode(fname or "")
-        if ep:
-            for ph in ["episode", "Episode", "EPISODE", "{episode}"]:
-                fmt = fmt.replace(ph, ep, 1)
-        q = extract_quality(fname or "")
-        for ph in ["quality", "Quality", "QUALITY", "{quality}"]:
-            fmt = fmt.replace(ph, q)
-        if "{old_name}" in fmt:
-            fmt = fmt.replace("{old_name}", os.path.splitext(fname)[0] if fname else "file")
+        if download_complete(path, fsize):
+            # Restart se pehle hi poori download ho chuki thi
+            await notify(job, "♻️ File pehle se downloaded hai, seedha upload...")
+            dmsg = job.status_msg
+            file = path
+        else:
+            await notify(job, "🚀 Download starting...", CANCEL_MARKUP)
+            dmsg = job.status_msg
+            try:
+                async with scheduler.stage(job, "download"):
+                    jobs.check(job.key)
+                    jobs.set_state(job.key, "downloading")
+                    await journal.stage(msg, "downloading")
+                    with STAGE_SECONDS.time(stage="download"):
+                        file = await download_file(client, msg, path, fsize, dmsg, label)
+                    # Cancel par pyrogram transfer rok kar None deta hai
+                    jobs.check(job.key)
+                    if file is None:
+                        # Baaki errors par bhi pyrogram None hi deta hai (partial file hata kar)
+                        raise IOError("Download adhura reh gaya")
+                BYTES_TOTAL.inc(fsize or 0, direction="in")
+            except JobCancelled:
+                raise
+            except Exception as e:
+                if journal.interrupted:
+                    raise
+                progress_reporter.discard(dmsg)
+                return await dmsg.edit(f"❌ Download Error: {str(e)}")
+        if path is None:
+            file.name = new_name
+        else:
+            await journal.stage(msg, "downloaded", path=path)
         
-        new_name = f"{fmt}{ext}"
-        path = f"downloads/{new_name}"
+        # Metadata worker pool mein, event loop free rehta hai
+        with STAGE_SECONDS.time(stage="metadata"):
+            meta = await metadata_service.extract(file, new_name)
         
-        dmsg = await msg.reply_text("🚀 Download starting...")
-        try:
-            await client.download_media(
-                message=msg, 
-                file_name=path, 
-                progress=progress_for_pyrogram, 
-                progress_args=("🚀 Download Started...", dmsg, time.time())
-            )
-        except Exception as e:
-            del RENAMES[fid]
-            return await dmsg.edit(f"❌ Download Error: {str(e)}")
+        caption = build_caption(settings, new_name, fsize, meta.duration, q)
+        _, thumb = await thumb_task if thumb_task else shared_thumb
         
-        dur = 0
         try:
-            meta = extractMetadata(createParser(path))
-            if meta and meta.has("duration"):
-                dur = meta.get("duration").seconds
+            async with batch_turn(job):
+                jobs.check(job.key)
+                progress_reporter.discard(dmsg)
+                umsg = await dmsg.edit(f"{label}📤 Upload starting...")
+                async with scheduler.stage(job, "upload"):
+                    jobs.check(job.key)
+                    jobs.set_state(job.key, "uploading")
+                    await journal.stage(msg, "uploading")
+                    with STAGE_SECONDS.time(stage="upload"):
+                        await upload_file(client, msg.chat.id, mtype, file, caption, thumb, meta, umsg, label)
+                    jobs.check(job.key)
+            BYTES_TOTAL.inc(fsize or 0, direction="out")
+        except JobCancelled:
+            raise
         except Exception as e:
-            print(f"Metadata Error: {e}")
-            dur = 0
+            if journal.interrupted:
+                raise
+            progress_reporter.discard(dmsg)
+            return await dmsg.edit(f"{label}❌ Upload Error: {str(e)}")
         
-        umsg = await dmsg.edit("📤 Upload starting...")
+        if not job.batch:
+            progress_reporter.discard(dmsg)
+            await dmsg.delete()
+    finally:
+        # get_thumb kabhi raise nahi karta, isliye yahan await safe hai
+        if thumb_task:
+            thumb_key, _ = await thumb_task
+            if thumb_key:
+                thumb_cache.release(thumb_key)
+
+async def download_file(client: Client, msg: Message, path: str, fsize: int, dmsg: Message, label: str = ""):
+    async def progress(current, total, *args):
+        if path:
+            # In-memory download ka offset resume mein kaam nahi aata, uska journal write bekaar hai
+            journal.progress(msg, current)
+        await progress_for_pyrogram(current, total, *args)
+    
+    # Badi files ke liye optional parallel engine: kai connections se chunks ek saath
+    if path and Config.DOWNLOAD_ENGINE == "parallel" and (fsize or 0) >= Config.PARALLEL_MIN_SIZE:
+        media = msg.document or msg.video or msg.audio
         try:
-            cap = await DvisPappa.get_caption(msg.chat.id)
-            caption = (cap.format(filename=new_name, filesize=humanbytes(fsize), duration=convert(dur), quality=q)
-                      # if cap else f"📕Name ➠ : {new_name}\n\n🔗 Size ➠ : {humanbytes(fsize)}\n\n⏰ Duration ➠ : {convert(dur)}\n\n🎥 Quality ➠ : {q}")
-                       if cap else f"{new_name}")
+            return await parallel_download(
+                client, media.file_id, path, fsize, Config.DOWNLOAD_PARALLELISM,
+                progress=progress,
+                progress_args=(f"{label}🚀 Download Started...", dmsg, time.time())
+            )
+        except StopTransmission:
+            return None     # download_media bhi cancel par None hi deta hai
         except Exception as e:
-            caption = f"📕Name ➠ : {new_name}\n\n🔗 Size ➠ : {humanbytes(fsize)}\n\n⏰ Duration ➠ : {convert(dur)}\n\n🎥 Quality ➠ : {q}"
-            caption = f"{new_name}"
-        
-        thumb = await get_thumb(client, msg, mtype)
-        
+            print(f"Parallel Download Error, using default engine: {e}")
+            for leftover in (path, f"{path}.parts"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+    # download_media file_name par hamesha os.path.split chalata hai, None nahi de sakte;
+    # in-memory buffer ka naam baad mein stream_rename set karta hai.
+    # Relative path pyrogram script ki directory (sys.argv[0]) se jodta hai, cwd se nahi; absolute dena
+    # zaroori hai taaki file wahi workspace mein aaye jise disk budget, sweep aur resume dekhte hain
+    target = {"in_memory": True} if path is None else {"file_name": os.path.abspath(path)}
+    return await client.download_media(
+        message=msg, 
+        progress=progress, 
+        progress_args=(f"{label}🚀 Download Started...", dmsg, time.time()),
+        **target
+    )
+
+async def upload_file(client: Client, chat_id: int, mtype: str, file, caption: str, thumb: str, meta, umsg: Message, label: str = ""):
+    # Badi files ke parts kai sessions se ek saath, phir ek hi SendMedia
+    if isinstance(file, str) and Config.UPLOAD_ENGINE == "parallel" and os.path.getsize(file) >= Config.PARALLEL_MIN_SIZE:
         try:
-            if mtype == "document":
-                await client.send_document(
-                    msg.chat.id, 
-                    document=path, 
-                    thumb=thumb, 
-                    caption=caption, 
-                    progress=progress_for_pyrogram, 
-                    progress_args=("📤 Upload Started...", umsg, time.time())
-                )
-            elif mtype == "video":
-                await client.send_video(
-                    msg.chat.id, 
-                    video=path, 
-                    caption=caption, 
-                    thumb=thumb, 
-                    duration=dur,
-                    progress=progress_for_pyrogram, 
-                    progress_args=("📤 Upload Started...", umsg, time.time())
-                )
-            elif mtype == "audio":
-                await client.send_audio(
-                    msg.chat.id, 
-                    audio=path, 
-                    caption=caption, 
-                    thumb=thumb, 
-                    duration=dur,
-                    progress=progress_for_pyrogram, 
-                    progress_args=("📤 Upload Started...", umsg, time.time())
-                )
+            input_file = await parallel_upload(
+                client, file, Config.UPLOAD_PARALLELISM,
+                progress=progress_for_pyrogram,
+                progress_args=(f"{label}📤 Upload Started...", umsg, time.time())
+            )
+            return await send_uploaded(client, chat_id, mtype, input_file, os.path.basename(file), caption, thumb, meta)
+        except StopTransmission:
+            return None
         except Exception as e:
-            if os.path.exists(path):
-                os.remove(path)
-            if thumb and os.path.exists(thumb):
-                os.remove(thumb)
-            del RENAMES[fid]
-            return await umsg.edit(f"❌ Upload Error: {str(e)}")
-        
-        await dmsg.delete()
-        if os.path.exists(path):
-            os.remove(path)
-        if thumb and os.path.exists(thumb):
-            os.remove(thumb)
-        del RENAMES[fid]
-        
-    except Exception as e:
-        if fid in RENAMES:
-            del RENAMES[fid]
-        return await msg.reply_text(f"❌ Main Error: {str(e)}")
+            print(f"Parallel Upload Error, using default engine: {e}")
+    if mtype == "document":
+        await client.send_document(
+            chat_id, 
+            document=file, 
+            thumb=thumb, 
+            caption=caption, 
+            progress=progress_for_pyrogram, 
+            progress_args=(f"{label}📤 Upload Started...", umsg, time.time())
+        )
+    elif mtype == "video":
+        await client.send_video(
+            chat_id, 
+            video=file, 
+            caption=caption, 
+            thumb=thumb, 
+            duration=meta.duration,
+            width=meta.width,
+            height=meta.height,
+            progress=progress_for_pyrogram, 
+            progress_args=(f"{label}📤 Upload Started...", umsg, time.time())
+        )
+    elif mtype == "audio":
+        await client.send_audio(
+            chat_id, 
+            audio=file, 
+            caption=caption, 
+            thumb=thumb, 
+            duration=meta.duration,
+            progress=progress_for_pyrogram, 
+            progress_args=(f"{label}📤 Upload Started...", umsg, time.time())
+        )
@@ -1,34 +1,34 @@
 from pyrogram import Client, filters, enums 
-from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-from pyrogram.errors import UserNotParticipant
+from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ChatMemberUpdated
 from config import Config
 from helper.database import DvisPappa
+from helper.membership import membership, BLOCKED
 
 async def not_subscribed(_, client, message):
     await DvisPappa.add_user(client, message)
     if not Config.FORCE_SUB:
         return False
-    try:             
-        user = await client.get_chat_member(Config.FORCE_SUB, message.from_user.id) 
-        if user.status == enums.ChatMemberStatus.BANNED:
-            return True 
-        else:
-            return False                
-    except UserNotParticipant:
-        pass
-    return True
+    # Cache / single-flight se, har message par get_chat_member nahi
+    status = await membership.get_status(client, Config.FORCE_SUB, message.from_user.id)
+    return status in BLOCKED
 
 
 @Client.on_message(filters.private & filters.create(not_subscribed))
 async def forces_sub(client, message):
     buttons = [[InlineKeyboardButton(text="🔺 Update Channel 🔺", url=f"https://t.me/{Config.FORCE_SUB}") ]]
     text = "<b>Hello Dear \n\nYou Need To Join In My Channel To Use Me\n\nKindly Please Join Channel</b>"
-    try:
-        user = await client.get_chat_member(Config.FORCE_SUB, message.from_user.id)    
-        if user.status == enums.ChatMemberStatus.BANNED:                                   
-            return await client.send_message(message.from_user.id, text="Sorry You Are Banned To Use Me")  
-    except UserNotParticipant:                       
-        return await message.reply_text(text=text, reply_markup=InlineKeyboardMarkup(buttons))
+    # Filter abhi abhi status cache kar chuka hai, dobara API call nahi
+    status = await membership.get_status(client, Config.FORCE_SUB, message.from_user.id)
+    if status == enums.ChatMemberStatus.BANNED:
+        return await client.send_message(message.from_user.id, text="Sorry You Are Banned To Use Me")  
     return await message.reply_text(text=text, reply_markup=InlineKeyboardMarkup(buttons))
-          
 
+
+if Config.FORCE_SUB:
+    @Client.on_chat_member_updated(filters.chat(Config.FORCE_SUB))
+    async def force_sub_member_update(client, update: ChatMemberUpdated):
+        # Bot channel mein admin ho to join/leave updates se cache turant sahi ho jata hai
+        member = update.new_chat_member or update.old_chat_member
+        if not member or not member.user:
+            return
+        membership.update(member.user.id, update.new_chat_member.status if update.new_chat_member else None)
@@ -3,6 +3,8 @@ from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
 
 from helper.database import DvisPappa
+from helper.jobs import jobs
+from helper.scheduler import scheduler
 from config import Config, Txt
 # verify_user aur check_token ko import karna hata diya gaya hai
 
@@ -142,6 +144,11 @@ async def cb_handler(client, query: CallbackQuery):
         )
     
     elif data == "close":
+        # Progress/status message ka Cancel ho to uska rename job bhi rok do:
+        # chal raha transfer agle progress callback par rukta hai, queued job line se turant hat-ta hai
+        cancelled = jobs.cancel_message(query.message.chat.id, query.message.id, user_id)
+        if cancelled:
+            scheduler.cancel(cancelled)
         try:
             await query.message.delete()
             await query.message.reply_to_message.delete()
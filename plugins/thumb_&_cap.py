@@ -1,5 +1,12 @@
 from pyrogram import Client, filters 
 from helper.database import DvisPappa
+from helper.thumbnail import thumb_cache
+
+async def drop_cached_thumb(user_id):
+    # Purana processed thumbnail cache se hata do
+    settings = await DvisPappa.get_user_settings(user_id)
+    if settings and settings.file_id:
+        thumb_cache.invalidate(settings.thumb_unique_id or settings.file_id)
 
 @Client.on_message(filters.private & filters.command('set_caption'))
 async def add_caption(client, message):
@@ -36,13 +43,15 @@ async def viewthumb(client, message):
 		
 @Client.on_message(filters.private & filters.command(['del_thumb', 'delthumb']))
 async def removethumb(client, message):
+    await drop_cached_thumb(message.from_user.id)
     await DvisPappa.set_thumbnail(message.from_user.id, file_id=None)
     await message.reply_text("**Thumbnail Deleted Successfully 🗑️**")
 	
 @Client.on_message(filters.private & filters.photo)
 async def addthumbs(client, message):
     mkn = await message.reply_text("Please Wait ...")
-    await DvisPappa.set_thumbnail(message.from_user.id, file_id=message.photo.file_id)                
+    await drop_cached_thumb(message.from_user.id)
+    await DvisPappa.set_thumbnail(message.from_user.id, file_id=message.photo.file_id, unique_id=message.photo.file_unique_id)
     await mkn.edit("**Thumbnail Saved Successfully ✅️**")
 
 
@@ -1,4 +1,5 @@
 from aiohttp import web
+from helper.metrics import render_metrics
 
 routes = web.RouteTableDef()
 
@@ -7,6 +8,11 @@ async def root_route_handler(request):
     return web.json_response("net_pro_max")
 
 
+@routes.get("/metrics")
+async def metrics_handler(request):
+    return web.Response(text=render_metrics(), content_type="text/plain", headers={"X-Prometheus-Format": "0.0.4"})
+
+
 async def web_server():
     web_app = web.Application(client_max_size=30000000)
     web_app.add_routes(routes)
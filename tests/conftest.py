@@ -0,0 +1,18 @@
+import os, sys
+
+# config.py import hote hi env padhta hai; tests ke liye dummy values (Mongo/Telegram se koi connection nahi banta)
+os.environ.setdefault("DB_URL", "mongodb://127.0.0.1:1")
+os.environ.setdefault("LOG_CHANNEL", "-1001")
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # downloads/ aur thumbs relative paths hain, har test apni temp directory mein
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,338 @@
+import asyncio, io, itertools
+from pyrogram import Client, enums, types
+from pyrogram.file_id import FileId, FileType
+
+# Network ke bina chalne wala pyrogram Client: download_media/handle_download asli pyrogram ka code hai,
+# sirf get_file (MTProto) aur send_* fake hain jo bheji gayi files record karte hain.
+
+CHUNK = 64 * 1024
+
+
+class FakeMessage:
+    # Bot ke bheje status messages (reply_text / send_message ka return)
+
+    def __init__(self, client, chat_id, id, text, reply_markup=None):
+        self._client = client
+        self.chat = types.Chat(id=chat_id, type=enums.ChatType.PRIVATE)
+        self.id = id
+        self.text = text
+        self.reply_markup = reply_markup
+        self.edits = []
+        self.deleted = False
+        self.empty = False
+
+    async def edit(self, text, reply_markup=None, **kwargs):
+        self.text = text
+        self.reply_markup = reply_markup
+        self.edits.append(text)
+        return self
+
+    edit_text = edit
+
+    async def delete(self):
+        self.deleted = True
+
+
+class Sent:
+    __slots__ = ("kind", "chat_id", "name", "data", "caption", "thumb", "extra")
+
+    def __init__(self, kind, chat_id, name, data, caption, thumb, extra):
+        self.kind = kind
+        self.chat_id = chat_id
+        self.name = name
+        self.data = data
+        self.caption = caption
+        self.thumb = thumb
+        self.extra = extra
+
+
+class FakeClient(Client):
+
+    def __init__(self, chunk_delay=0):
+        super().__init__("fake", api_id=1, api_hash="test", in_memory=True, no_updates=True)
+        self.chunk_delay = chunk_delay
+        self.files = {}         # media_id -> bytes
+        self.messages = []      # FakeMessage jo bot ne bheje
+        self.sent = []          # Sent (renamed files)
+        self._ids = itertools.count(1000)
+
+    async def get_file(self, file_id, file_size=0, limit=0, offset=0, progress=None, progress_args=()):
+        data = self.files[file_id.media_id]
+        for start in range(0, len(data), CHUNK):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            chunk = data[start:start + CHUNK]
+            yield chunk
+            if progress:
+                await progress(min(start + CHUNK, len(data)), len(data), *progress_args)
+
+    async def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        message = FakeMessage(self, chat_id, next(self._ids), text, reply_markup)
+        self.messages.append(message)
+        return message
+
+    async def _send(self, kind, chat_id, file, caption, thumb, progress, progress_args, extra):
+        if isinstance(file, str):
+            with open(file, "rb") as f:
+                data = f.read()
+            name = file.replace("\\", "/").rsplit("/", 1)[-1]
+        else:
+            data = file.getvalue()
+            name = file.name
+        if progress:
+            await progress(len(data), len(data), *progress_args)
+        self.sent.append(Sent(kind, chat_id, name, data, caption, thumb, extra))
+        return FakeMessage(self, chat_id, next(self._ids), caption)
+
+    async def send_document(self, chat_id, document, thumb=None, caption=None, progress=None, progress_args=(), **kwargs):
+        return await self._send("document", chat_id, document, caption, thumb, progress, progress_args, kwargs)
+
+    async def send_video(self, chat_id, video, thumb=None, caption=None, progress=None, progress_args=(), **kwargs):
+        return await self._send("video", chat_id, video, caption, thumb, progress, progress_args, kwargs)
+
+    async def send_audio(self, chat_id, audio, thumb=None, caption=None, progress=None, progress_args=(), **kwargs):
+        return await self._send("audio", chat_id, audio, caption, thumb, progress, progress_args, kwargs)
+
+    async def send_cached_media(self, chat_id, file_id, caption=None, **kwargs):
+        self.sent.append(Sent("cached", chat_id, None, file_id, caption, None, kwargs))
+        return FakeMessage(self, chat_id, next(self._ids), caption)
+
+
+_media_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def make_message(client, uid, name, data, kind="document", duration=0):
+    # Asli pyrogram types.Message, taaki reply_text/download_media wahi code chalayein jo production mein
+    media_id = next(_media_ids)
+    client.files[media_id] = data
+    file_type = {"document": FileType.DOCUMENT, "video": FileType.VIDEO, "audio": FileType.AUDIO}[kind]
+    file_id = FileId(file_type=file_type, dc_id=2, media_id=media_id, access_hash=0, file_reference=b"").encode()
+    common = dict(client=client, file_id=file_id, file_unique_id=f"u{media_id}", file_name=name, file_size=len(data))
+    media = {
+        "document": lambda: types.Document(**common),
+        "video": lambda: types.Video(width=0, height=0, duration=duration, **common),
+        "audio": lambda: types.Audio(duration=duration, **common),
+    }[kind]()
+    return types.Message(
+        id=next(_message_ids),
+        chat=types.Chat(id=uid, type=enums.ChatType.PRIVATE, client=client),
+        from_user=types.User(id=uid, client=client),
+        client=client,
+        **{kind: media}
+    )
+
+
+def fake_file(size):
+    return (bytes(range(251)) * (size // 251 + 1))[:size]
+
+
+# --- Fake Motor collection ---
+# Jitni Mongo query/update syntax yeh bot use karta hai utni hi: $in/$lt/$gt/$gte/$lte/$ne filters,
+# $set/$setOnInsert/$inc/$unset updates, upserts, sort aur bulk_write(UpdateOne).
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        value = doc.get(key)
+        if isinstance(cond, dict) and any(k.startswith("$") for k in cond):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op in ("$lt", "$gt", "$lte", "$gte"):
+                    if value is None:
+                        return False
+                    if op == "$lt" and not value < arg:
+                        return False
+                    if op == "$gt" and not value > arg:
+                        return False
+                    if op == "$lte" and not value <= arg:
+                        return False
+                    if op == "$gte" and not value >= arg:
+                        return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    return {k: v for k, v in doc.items() if projection.get(k) or k == "_id"}
+
+
+def _sort_key(sort):
+    if isinstance(sort, str):
+        sort = [(sort, 1)]
+    return sort
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.matched_count = fields.get("matched_count", 0)
+        self.modified_count = fields.get("modified_count", 0)
+        self.upserted_id = fields.get("upserted_id")
+        self.deleted_count = fields.get("deleted_count", 0)
+
+
+class FakeCursor:
+
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        keys = [(key, direction)] if isinstance(key, str) else key
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda d: d.get(field), reverse=order < 0)
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        # Motor ki tarah cursor aage badhta hai, agli call agle docs deti hai
+        length = len(self._docs) if length is None else length
+        batch, self._docs = self._docs[:length], self._docs[length:]
+        return batch
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self._docs:
+            yield doc
+
+
+class FakeCollection:
+
+    def __init__(self, latency=0):
+        self.docs = {}
+        self.latency = latency      # har call par simulated network round trip
+        self.calls = []
+        self.indexes = []
+        self.fail = 0               # agle itne calls IOError denge
+
+    async def _op(self, name):
+        self.calls.append(name)
+        if self.fail:
+            self.fail -= 1
+            raise IOError(f"fake {name} failed")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _find(self, query):
+        key = query.get("_id")
+        if key is not None and not isinstance(key, dict):
+            # _id lookup index jaisa, taaki 10k-user benchmarks fake ki scanning na napein
+            doc = self.docs.get(key)
+            return [doc] if doc is not None and _matches(doc, query) else []
+        return [d for d in self.docs.values() if _matches(d, query)]
+
+    def _apply(self, doc, update, inserted):
+        for key, value in update.get("$set", {}).items():
+            doc[key] = value
+        if inserted:
+            for key, value in update.get("$setOnInsert", {}).items():
+                doc[key] = value
+        for key, value in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + value
+        for key in update.get("$unset", {}):
+            doc.pop(key, None)
+
+    def _update(self, query, update, upsert=False, many=False, sort=None):
+        found = self._find(query)
+        if sort:
+            for field, order in reversed(_sort_key(sort)):
+                found.sort(key=lambda d: d.get(field), reverse=order < 0)
+        if not many:
+            found = found[:1]
+        for doc in found:
+            self._apply(doc, update, False)
+        if found or not upsert:
+            return found, None
+        doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+        self._apply(doc, update, True)
+        self.docs[doc["_id"]] = doc
+        return [doc], doc["_id"]
+
+    async def find_one(self, query, projection=None):
+        await self._op("find_one")
+        found = self._find(query)
+        return _project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None):
+        self.calls.append("find")
+        return FakeCursor([_project(d, projection) for d in self._find(query or {})])
+
+    async def count_documents(self, query):
+        await self._op("count_documents")
+        return len(self._find(query))
+
+    async def insert_one(self, doc):
+        await self._op("insert_one")
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        await self._op("update_one")
+        found, upserted = self._update(query, update, upsert)
+        return _Result(matched_count=len(found) if upserted is None else 0, modified_count=len(found), upserted_id=upserted)
+
+    async def update_many(self, query, update):
+        await self._op("update_many")
+        found, _ = self._update(query, update, many=True)
+        return _Result(matched_count=len(found), modified_count=len(found))
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None, upsert=False):
+        await self._op("find_one_and_update")
+        found, _ = self._update(query, update, upsert, sort=sort)
+        return dict(found[0]) if found else None
+
+    async def replace_one(self, query, doc, upsert=False):
+        await self._op("replace_one")
+        self.docs[query["_id"]] = dict(doc, _id=query["_id"])
+
+    async def delete_one(self, query):
+        await self._op("delete_one")
+        found = self._find(query)[:1]
+        for doc in found:
+            del self.docs[doc["_id"]]
+        return _Result(deleted_count=len(found))
+
+    async def delete_many(self, query):
+        await self._op("delete_many")
+        found = self._find(query)
+        for doc in found:
+            del self.docs[doc["_id"]]
+        return _Result(deleted_count=len(found))
+
+    async def bulk_write(self, requests, ordered=True):
+        await self._op("bulk_write")
+        for request in requests:
+            update = request._doc
+            clash = set(update.get("$set", {})) & set(update.get("$setOnInsert", {}))
+            assert not clash, f"Updating the path {clash} would create a conflict"
+            self._update(request._filter, update, request._upsert)
+
+    async def create_index(self, keys, **kwargs):
+        await self._op("create_index")
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name")
+
+
+def fake_database(latency=0, write_behind=False):
+    # Asli Database class, sirf collections fake (CountingCollection wrapper ke saath, jaise production mein)
+    from config import Config
+    from helper.database import Database, WriteBehind
+    from helper.dbaudit import CountingCollection
+    db = Database(Config.DB_URL, "test")
+    db.col = CountingCollection(FakeCollection(latency), "user")
+    db.broadcast = CountingCollection(FakeCollection(latency), "broadcast")
+    db.jobs = CountingCollection(FakeCollection(latency), "rename_jobs")
+    db.writes = WriteBehind(db.col, Config.WRITE_BATCH_SIZE, Config.WRITE_FLUSH_INTERVAL) if write_behind else None
+    return db
+
+
+def raw(collection):
+    # CountingCollection ke andar ka FakeCollection
+    return collection._collection
@@ -0,0 +1,147 @@
+import asyncio, os, time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import plugins.file_rename as fr
+from helper.database import UserSettings
+from helper.jobs import jobs
+from helper.journal import journal
+from helper.metadata import metadata_service
+from helper.scheduler import RenameScheduler, RenameJob, show_position
+from helper.storage import MemoryBudget, DiskBudget
+from helper.utils import CANCEL_MARKUP
+from fakes import FakeClient, make_message
+
+GB = 1024 * 1024 * 1024
+
+
+class ZeroFile:
+    # 2 GB ki "file" bina 2 GB RAM ke: FakeClient.get_file sirf len() aur slices maangta hai
+    def __init__(self, size):
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, part):
+        return bytes(len(range(*part.indices(self.size))))
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(fr, "scheduler", RenameScheduler(1, 1, 1, on_position=show_position))
+    monkeypatch.setattr(fr, "memory_budget", MemoryBudget(64 * 1024 * 1024))
+    monkeypatch.setattr(fr, "disk_budget", DiskBudget("downloads", 0, quota=3 * GB))
+    monkeypatch.setattr(journal, "enabled", False)
+    monkeypatch.setattr(metadata_service, "_pool", ThreadPoolExecutor(2))
+    return fr
+
+
+def settings(uid):
+    return UserSettings({"_id": uid, "format_template": "{old_name} [R]", "media_type": "document"})
+
+
+async def submit(client, uid, name, size):
+    msg = make_message(client, uid, name, ZeroFile(size))
+    media = msg.document
+    jobs.register(uid, media.file_unique_id, media.file_name, media.file_size)
+    job = RenameJob(uid, msg, lambda job: fr.rename_file(client, job, settings(uid)), key=fr.job_key(uid, msg))
+    await fr.scheduler.submit(job)
+    return job
+
+
+def press_cancel(message):
+    # Wahi jo start_&_cb.py ka "close" callback karta hai
+    cancelled = jobs.cancel_message(message.chat.id, message.id)
+    fr.scheduler.cancel(cancelled)
+    return cancelled
+
+
+async def until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition never became true"
+        await asyncio.sleep(0.005)
+    return time.monotonic()
+
+
+def freed(job):
+    return jobs.get(job.key) is None and not os.path.exists(f"downloads/job_{job.msg.chat.id}_{job.msg.id}")
+
+
+def test_cancel_running_2gb_download_frees_everything_within_1s(pipeline):
+    async def main():
+        client = FakeClient(chunk_delay=0.001)
+        job = await submit(client, 21, "movie.mkv", 2 * GB)
+        await until(lambda: pipeline.disk_budget.reserved == 2 * GB and job.status_msg is not None)
+        await asyncio.sleep(0.2)       # download beech mein
+        assert press_cancel(job.status_msg) == [job.key]
+        pressed = time.monotonic()
+        done = await until(lambda: freed(job) and pipeline.disk_budget.reserved == 0 and pipeline.scheduler.running == 0)
+        return client, done - pressed
+
+    client, seconds = asyncio.run(main())
+    print(f"\n2 GB download cancelled, resources freed in {seconds * 1000:.0f} ms")
+    assert seconds < 1
+    assert client.sent == []
+    assert os.listdir("downloads") == []
+
+
+def test_cancel_while_waiting_for_disk_space(pipeline, monkeypatch):
+    # Pehla job 2 GB reserve karke chal raha hai, dusra 2 GB ke liye disk ka wait kar raha hai (quota 3 GB)
+    monkeypatch.setattr(pipeline, "scheduler", RenameScheduler(2, 2, 1, on_position=show_position))
+
+    async def main():
+        client = FakeClient(chunk_delay=0.001)
+        first = await submit(client, 31, "a.mkv", 2 * GB)
+        await until(lambda: pipeline.disk_budget.reserved == 2 * GB)
+        second = await submit(client, 32, "b.mkv", 2 * GB)
+        await until(lambda: pipeline.disk_budget.waiting == 1 and second.status_msg is not None)
+        assert second.status_msg.reply_markup is CANCEL_MARKUP
+        press_cancel(second.status_msg)
+        pressed = time.monotonic()
+        done = await until(lambda: freed(second) and pipeline.disk_budget.waiting == 0)
+        assert pipeline.disk_budget.reserved == 2 * GB     # pehla job chalta rahe
+        press_cancel(first.status_msg)
+        await until(lambda: freed(first) and pipeline.scheduler.running == 0)
+        return done - pressed
+
+    assert asyncio.run(main()) < 1
+    assert pipeline.disk_budget.reserved == 0
+
+
+def test_cancel_while_waiting_for_stage_slot(pipeline, monkeypatch):
+    # Ek hi download slot; dusre user ka job slot ke wait mein cancel
+    monkeypatch.setattr(pipeline, "disk_budget", DiskBudget("downloads", 0, quota=5 * GB))
+    monkeypatch.setattr(pipeline, "scheduler", RenameScheduler(1, 1, 1, on_position=show_position))
+
+    async def main():
+        client = FakeClient(chunk_delay=0.001)
+        first = await submit(client, 41, "a.mkv", 2 * GB)
+        second = await submit(client, 42, "b.mkv", 2 * GB)
+        await until(lambda: pipeline.disk_budget.reserved == 4 * GB and second.status_msg is not None)
+        press_cancel(second.status_msg)
+        pressed = time.monotonic()
+        done = await until(lambda: freed(second) and pipeline.disk_budget.reserved == 2 * GB)
+        press_cancel(first.status_msg)
+        await until(lambda: freed(first) and pipeline.scheduler.running == 0)
+        return done - pressed
+
+    assert asyncio.run(main()) < 1
+
+
+def test_queue_position_message_cancels_queued_job(pipeline):
+    async def main():
+        client = FakeClient(chunk_delay=0.001)
+        running = await submit(client, 51, "a.mkv", GB)
+        queued = await submit(client, 51, "b.mkv", GB)
+        # Per-user cap 1: dusri file line mein, position message par Cancel button
+        assert queued.started is None
+        assert queued.status_msg.reply_markup is CANCEL_MARKUP
+        assert press_cancel(queued.status_msg) == [queued.key]
+        assert pipeline.scheduler.queued == 0
+        await until(lambda: freed(queued))
+        press_cancel(running.status_msg)
+        await until(lambda: freed(running) and pipeline.scheduler.running == 0)
+        return client
+
+    assert asyncio.run(main()).sent == []
@@ -0,0 +1,159 @@
+import asyncio, random, time
+from types import SimpleNamespace
+from helper.database import TTLCache, KnownUsers
+from helper.template import render
+from fakes import fake_database, raw
+
+
+def user(uid, **fields):
+    return dict({"_id": uid, "file_id": None, "caption": None, "format_template": None}, **fields)
+
+
+def test_settings_snapshot_fetched_once_then_served_from_cache():
+    db = fake_database()
+    raw(db.col).docs[1] = user(1, format_template="{old_name} [R]", caption="{filename}", media_type="video")
+
+    async def main():
+        # Rename ke saare getters ek hi snapshot se
+        first = await db.get_user_settings(1)
+        values = [await db.get_format_template(1), await db.get_caption(1), await db.get_media_preference(1)]
+        return first, values
+
+    first, values = asyncio.run(main())
+    assert values == ["{old_name} [R]", "{filename}", "video"]
+    assert raw(db.col).calls == ["find_one"]
+    assert first.format_tokens is not None and first.caption_tokens is not None
+    assert db.settings_cache.stats()["hits"] == 3
+
+
+def test_writes_update_cached_snapshot_without_refetch():
+    db = fake_database()
+    raw(db.col).docs[1] = user(1, format_template="old")
+
+    async def main():
+        await db.get_user_settings(1)
+        await db.set_format_template(1, "new {episode}")
+        return await db.get_user_settings(1)
+
+    settings = asyncio.run(main())
+    assert settings.format_template == "new {episode}"
+    # Compiled tokens bhi naye template ke
+    assert render(settings.format_tokens, {"episode": "05", "quality": "", "old_name": "x"}) == "new 05"
+    assert raw(db.col).calls == ["find_one", "update_one"]
+    assert raw(db.col).docs[1]["format_template"] == "new {episode}"
+
+
+def test_autorename_compiles_template_once(monkeypatch):
+    import helper.database as database
+    from plugins import auto_rename
+    db = fake_database()
+    raw(db.col).docs[1] = user(1, format_template="old")
+    monkeypatch.setattr(auto_rename, "DvisPappa", db)
+    compiled = []
+
+    def counting(compile):
+        def wrapper(template):
+            compiled.append(template)
+            return compile(template)
+        return wrapper
+
+    monkeypatch.setattr(auto_rename, "compile_filename_template", counting(auto_rename.compile_filename_template))
+    monkeypatch.setattr(database, "compile_filename_template", counting(database.compile_filename_template))
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    message = SimpleNamespace(from_user=SimpleNamespace(id=1), text="/autorename Show E{episode}", reply_text=reply_text)
+
+    async def main():
+        await db.get_user_settings(1)
+        compiled.clear()
+        await auto_rename.auto_rename_command(None, message)
+        return await db.get_user_settings(1)
+
+    settings = asyncio.run(main())
+    # Command ka compile hi cached snapshot mein gaya, update ne dobara compile nahi kiya
+    assert compiled == ["Show E{episode}"]
+    assert render(settings.format_tokens, {"episode": "07", "quality": "", "old_name": "x"}) == "Show E07"
+    assert replies == ["**Auto Rename Format Updated Successfully! ✅**"]
+
+
+def test_cache_entries_expire_and_lru_is_bounded():
+    db = fake_database()
+    db.settings_cache = TTLCache(2, 0.05)
+    for uid in (1, 2, 3):
+        raw(db.col).docs[uid] = user(uid)
+
+    async def main():
+        for uid in (1, 2, 3):
+            await db.get_user_settings(uid)
+        assert len(db.settings_cache) == 2      # sabse purana (1) bahar
+        await db.get_user_settings(1)
+        time.sleep(0.06)
+        await db.get_user_settings(1)           # TTL khatam, dobara Mongo
+
+    asyncio.run(main())
+    assert raw(db.col).calls.count("find_one") == 5
+
+
+
+class LogBot:
+    # send_log ke liye: sirf bheje gaye log messages ginta hai
+    mention = "bot"
+
+    def __init__(self):
+        self.logs = []
+
+    async def send_message(self, chat_id, text):
+        self.logs.append(text)
+
+
+def new_user_message(uid):
+    return SimpleNamespace(from_user=SimpleNamespace(id=uid, first_name="A", last_name=None, username=None, mention="A"))
+
+
+def test_known_users_skip_mongo_for_existing_and_unknown_ids():
+    db = fake_database()
+    raw(db.col).docs = {uid: user(uid) for uid in (1, 2, 3)}
+    bot = LogBot()
+
+    async def main():
+        await db.load_known_users()
+        raw(db.col).calls.clear()
+        await db.add_user(bot, new_user_message(2))           # purana user: koi query nahi
+        assert await db.get_user_settings(999) is None        # anjaan id: find_one nahi
+        assert await db.total_users_count() == 3
+        assert raw(db.col).calls == []
+        await db.add_user(bot, new_user_message(4))           # naya: ek upsert, ek log
+        await db.add_user(bot, new_user_message(4))
+        await db.delete_user(1)
+        return await db.is_user_exist(4), await db.is_user_exist(1), await db.total_users_count()
+
+    assert asyncio.run(main()) == (True, False, 3)
+    assert raw(db.col).calls == ["update_one", "delete_many"]
+    assert len(bot.logs) == 1
+
+
+def test_known_users_1m_benchmark():
+    ids = range(1, 2_000_001, 2)       # 1M users, beech mein gaps
+    known = KnownUsers()
+    start = time.perf_counter()
+    known.load(ids)
+    load = time.perf_counter() - start
+
+    probes = [random.Random(3).randrange(2_000_000) for _ in range(200_000)]
+    start = time.perf_counter()
+    found = sum(1 for uid in probes if uid in known)
+    lookups = len(probes) / (time.perf_counter() - start)
+    print(f"\nknown users, 1M ids: load {load:.2f} s, {known._base.itemsize * len(known._base) / 1e6:.1f} MB, "
+          f"{lookups:,.0f} lookups/s")
+    assert len(known) == 1_000_000
+    assert found == sum(1 for uid in probes if uid % 2)
+    assert known._base.itemsize * len(known._base) <= 8 * 1_000_000
+    assert lookups > 100_000
+
+    for uid in range(0, 2_000_000, 1000):
+        known.add(uid)
+    known.discard(1)
+    assert 0 in known and 1 not in known and len(known) == 1_000_000 + 2000 - 1
@@ -0,0 +1,196 @@
+import asyncio, os, time
+from types import SimpleNamespace
+import pytest
+from pyrogram import StopTransmission
+from pyrogram.file_id import FileId, FileType
+import helper.downloader as downloader
+from helper.downloader import ChunkedDownloader, TelegramChunkSource, MediaSessionPool, parallel_download
+from fakes import fake_file
+
+CHUNK = 64 * 1024
+
+
+class FakeChunkSource:
+    # Local "chunk server": har fetch par latency, aur chaho to kisi offset par failure
+
+    def __init__(self, data, latency=0, fail_at=None):
+        self.data = data
+        self.latency = latency
+        self.fail_at = fail_at
+        self.fetched = []
+        self.opened = self.closed = 0
+
+    async def open(self, count):
+        self.opened += 1
+
+        async def fetch(offset, limit):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if offset == self.fail_at:
+                raise ConnectionError("connection reset")
+            self.fetched.append(offset)
+            return self.data[offset:offset + limit]
+
+        return [fetch] * count
+
+    async def close(self):
+        self.closed += 1
+
+
+def test_chunks_written_to_right_offsets():
+    data = fake_file(10 * CHUNK + 123)
+    source = FakeChunkSource(data, latency=0.001)
+    path = asyncio.run(ChunkedDownloader(4, CHUNK).download(source, "out.bin", len(data)))
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert not os.path.exists("out.bin.parts")
+    assert source.closed == 1
+
+
+def test_resume_fetches_only_missing_chunks():
+    data = fake_file(40 * CHUNK)
+    dl = ChunkedDownloader(1, CHUNK, retries=0)
+    first = FakeChunkSource(data, fail_at=20 * CHUNK)
+    with pytest.raises(ConnectionError):
+        asyncio.run(dl.download(first, "out.bin", len(data)))
+    assert first.closed == 1 and os.path.exists("out.bin.parts")
+
+    second = FakeChunkSource(data)
+    asyncio.run(dl.download(second, "out.bin", len(data)))
+    assert sorted(second.fetched) == [i * CHUNK for i in range(20, 40)]
+    with open("out.bin", "rb") as f:
+        assert f.read() == data
+
+
+def test_cancel_is_not_retried(monkeypatch):
+    data = fake_file(8 * CHUNK)
+    sources = []
+
+    def source(client, file_id):
+        sources.append(FakeChunkSource(data))
+        return sources[-1]
+
+    async def progress(current, total):
+        raise StopTransmission
+
+    monkeypatch.setattr(downloader, "TelegramChunkSource", source)
+    with pytest.raises(StopTransmission):
+        asyncio.run(parallel_download(None, "x", "out.bin", len(data), 2, progress=progress))
+    # Retry hota to doosra source khulta
+    assert len(sources) == 1 and sources[0].closed == 1
+
+
+# --- Media session pool ---
+
+class FakeSession:
+    started = []
+    stopped = []
+    imports = []
+    fail_on_start = None
+
+    def __init__(self, client, dc_id, auth_key, test_mode, is_media=False):
+        self.dc_id = dc_id
+        self.auth_key = auth_key
+
+    async def start(self):
+        if len(FakeSession.started) == FakeSession.fail_on_start:
+            raise ConnectionError("start failed")
+        FakeSession.started.append(self)
+
+    async def stop(self):
+        FakeSession.stopped.append(self)
+
+    async def invoke(self, query):
+        FakeSession.imports.append(query)
+
+
+class FakeAuth:
+    created = 0
+
+    def __init__(self, client, dc_id, test_mode):
+        pass
+
+    async def create(self):
+        FakeAuth.created += 1
+        return b"foreign-key"
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    FakeSession.started, FakeSession.stopped, FakeSession.imports = [], [], []
+    FakeSession.fail_on_start = None
+    FakeAuth.created = 0
+    monkeypatch.setattr(downloader, "Session", FakeSession)
+    monkeypatch.setattr(downloader, "Auth", FakeAuth)
+    exports = []
+
+    async def invoke(query):
+        exports.append(query)
+        return SimpleNamespace(id=1, bytes=b"auth")
+
+    async def value(v):
+        return v
+
+    class Client:
+        storage = SimpleNamespace(dc_id=lambda: value(2), test_mode=lambda: value(False), auth_key=lambda: value(b"home-key"))
+
+    client = Client()
+    client.invoke = invoke
+    return SimpleNamespace(client=client, exports=exports)
+
+
+def file_on_dc(dc_id):
+    return FileId(file_type=FileType.DOCUMENT, dc_id=dc_id, media_id=1, access_hash=0, file_reference=b"").encode()
+
+
+def test_foreign_dc_sessions_are_created_once_and_reused(sessions):
+    async def main():
+        for _ in range(5):
+            source = TelegramChunkSource(sessions.client, file_on_dc(4))
+            assert len(await source.open(4)) == 4
+            await source.close()
+        await downloader.close_session_pools()
+
+    asyncio.run(main())
+    # 5 files, 4 connections each: sirf 4 sessions, ek auth key, ek export/import
+    assert len(FakeSession.started) == 4
+    assert FakeAuth.created == 1
+    assert len(sessions.exports) == 1 and len(FakeSession.imports) == 1
+    assert {s.auth_key for s in FakeSession.started} == {b"foreign-key"}
+    assert sorted(map(id, FakeSession.stopped)) == sorted(map(id, FakeSession.started))
+
+
+def test_home_dc_uses_stored_auth_key(sessions):
+    pool = MediaSessionPool(sessions.client)
+    asyncio.run(pool.get(2, 3))
+    assert FakeAuth.created == 0 and not sessions.exports
+    assert {s.auth_key for s in FakeSession.started} == {b"home-key"}
+
+
+def test_sessions_started_before_a_failure_are_not_leaked(sessions):
+    FakeSession.fail_on_start = 2
+    pool = MediaSessionPool(sessions.client)
+
+    async def main():
+        with pytest.raises(ConnectionError):
+            await pool.get(4, 4)
+        await pool.close()
+
+    asyncio.run(main())
+    assert len(FakeSession.started) == 2
+    assert sorted(map(id, FakeSession.stopped)) == sorted(map(id, FakeSession.started))
+
+
+def test_benchmark_parallel_download_against_fake_chunk_server():
+    # 64 chunks, har fetch par 5ms latency: throughput parallelism ke saath badhna chahiye
+    data = fake_file(64 * CHUNK)
+    speeds = {}
+    for parallelism in (1, 4, 8):
+        source = FakeChunkSource(data, latency=0.005)
+        start = time.perf_counter()
+        asyncio.run(ChunkedDownloader(parallelism, CHUNK).download(source, f"p{parallelism}.bin", len(data)))
+        speeds[parallelism] = len(data) / (time.perf_counter() - start) / 1024 / 1024
+        os.remove(f"p{parallelism}.bin")
+    print("\nparallel download MB/s:", {k: round(v, 1) for k, v in speeds.items()})
+    assert speeds[4] > 2.5 * speeds[1]
+    assert speeds[8] > speeds[4]
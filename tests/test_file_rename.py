@@ -0,0 +1,202 @@
+import asyncio, os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import plugins.file_rename as fr
+from config import Config
+from helper.database import UserSettings
+from helper.jobs import jobs
+from helper.journal import journal
+from helper.metadata import metadata_service
+from helper.scheduler import RenameScheduler, RenameJob
+from helper.storage import MemoryBudget, DiskBudget
+from helper.dbaudit import track_queries
+from fakes import FakeClient, make_message, fake_file, fake_database, raw
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    # Har test ke liye taaza scheduler/budgets, journal band, metadata thread pool mein
+    monkeypatch.setattr(fr, "scheduler", RenameScheduler(2, 2, 1))
+    monkeypatch.setattr(fr, "memory_budget", MemoryBudget(64 * 1024 * 1024))
+    monkeypatch.setattr(fr, "disk_budget", DiskBudget("downloads", 0, quota=1024 * 1024 * 1024))
+    monkeypatch.setattr(journal, "enabled", False)
+    monkeypatch.setattr(metadata_service, "_pool", ThreadPoolExecutor(2))
+    return fr
+
+
+def settings(uid, template="{old_name} [R]", media_type="document"):
+    return UserSettings({"_id": uid, "format_template": template, "media_type": media_type})
+
+
+async def rename(client, msg, user_settings):
+    uid = msg.from_user.id
+    media = msg.document or msg.video or msg.audio
+    jobs.register(uid, media.file_unique_id, media.file_name, media.file_size)
+    job = RenameJob(uid, msg, None, key=fr.job_key(uid, msg))
+    await fr.rename_file(client, job, user_settings)
+    return job
+
+
+def run_rename(uid, name, data, user_settings, kind="document"):
+    # pyrogram Client event loop ke andar hi banta hai
+    async def main():
+        client = FakeClient()
+        msg = make_message(client, uid, name, data, kind)
+        await rename(client, msg, user_settings)
+        return client
+    return asyncio.run(main())
+
+
+def test_small_file_renamed_in_memory(pipeline):
+    data = fake_file(300 * 1024)
+    client = run_rename(11, "notes.pdf", data, settings(11))
+
+    assert [s.name for s in client.sent] == ["notes [R].pdf"]
+    assert client.sent[0].kind == "document"
+    assert client.sent[0].data == data
+    # RAM budget use hua aur wapas mila, disk par kuch nahi likha
+    assert pipeline.memory_budget.peak == len(data)
+    assert pipeline.memory_budget.used == 0
+    assert not os.listdir("downloads")
+    assert not any("Error" in m.text or any("Error" in e for e in m.edits) for m in client.messages)
+
+
+def test_small_video_in_memory_keeps_new_name(pipeline):
+    data = fake_file(128 * 1024)
+    client = run_rename(12, "Show.S01E05.720p.mkv", data, settings(12, "Show E{episode} {quality}"))
+
+    sent = client.sent[0]
+    assert (sent.kind, sent.name) == ("video", "Show E05 720p.mkv")
+    assert sent.data == data
+
+
+def test_large_file_goes_through_job_workspace(pipeline, monkeypatch):
+    monkeypatch.setattr(Config, "IN_MEMORY_THRESHOLD", 64 * 1024)
+    data = fake_file(256 * 1024)
+    client = run_rename(13, "archive.zip", data, settings(13))
+
+    assert client.sent[0].name == "archive [R].zip"
+    assert client.sent[0].data == data
+    assert pipeline.memory_budget.peak == 0
+    # Workspace aur disk reservation job ke saath hi khatam
+    assert os.listdir("downloads") == []
+    assert pipeline.disk_budget.reserved == 0
+
+
+def test_choose_path():
+    assert fr.choose_path("document", "a.pdf", "a.pdf", "document", None) == "fast"
+    assert fr.choose_path("document", "a.pdf", "b.pdf", "document", None) == "stream"
+    assert fr.choose_path("document", "a.mkv", "a.mkv", "video", None) == "stream"
+    assert fr.choose_path("document", "a.pdf", "a.pdf", "document", "thumb_file_id") == "stream"
+
+
+def test_unchanged_name_reuses_file_id_and_counts_bytes_saved(pipeline):
+    data = fake_file(5 * 1024 * 1024)
+
+    async def main():
+        client = FakeClient()
+        msg = make_message(client, 14, "report.pdf", data)
+        client.files.clear()        # koi download hua to KeyError
+        await rename(client, msg, settings(14, "{old_name}"))
+        return client, msg
+
+    client, msg = asyncio.run(main())
+    assert [(s.kind, s.data) for s in client.sent] == [("cached", msg.document.file_id)]
+    assert pipeline.scheduler.paths == {"fast": 1, "stream": 0}
+    assert pipeline.scheduler.bytes_saved == 2 * len(data)
+
+
+def test_failed_fast_send_falls_back_to_stream(pipeline):
+    data = fake_file(64 * 1024)
+
+    async def main():
+        client = FakeClient()
+
+        async def refuse(*args, **kwargs):
+            raise RuntimeError("FILE_REFERENCE_EXPIRED")
+        client.send_cached_media = refuse
+        msg = make_message(client, 15, "report.pdf", data)
+        await rename(client, msg, settings(15, "{old_name}"))
+        return client
+
+    client = asyncio.run(main())
+    assert [(s.kind, s.name, s.data) for s in client.sent] == [("document", "report.pdf", data)]
+    assert pipeline.scheduler.paths == {"fast": 0, "stream": 1}
+    assert pipeline.scheduler.bytes_saved == 0
+
+
+def test_one_rename_costs_at_most_one_read(pipeline, monkeypatch):
+    # Journal chalu, usi fake db par: settings ka read budget ke andar, aur journal ke writes bhi gine jaate hain
+    db = fake_database()
+    raw(db.col).docs[16] = {"_id": 16, "format_template": "{old_name} [R]"}
+    monkeypatch.setattr(fr, "DvisPappa", db)
+    monkeypatch.setattr(journal, "db", db)
+    monkeypatch.setattr(journal, "enabled", True)
+
+    async def one(client, name, size):
+        msg = make_message(client, 16, name, fake_file(size))
+        media = msg.document
+        jobs.register(16, media.file_unique_id, media.file_name, media.file_size)
+        with track_queries() as tracker:
+            await fr.rename_batch(client, 16, [msg])
+            while fr.scheduler.running or fr.scheduler.queued or journal._tasks:
+                await asyncio.sleep(0.01)
+        return tracker
+
+    async def main():
+        client = FakeClient()
+        cold = await one(client, "a.pdf", 1024)
+        warm = await one(client, "b.pdf", 1024)
+        monkeypatch.setattr(Config, "IN_MEMORY_THRESHOLD", 512)
+        disk = await one(client, "c.pdf", 1024)
+        return cold, warm, disk, client
+
+    cold, warm, disk, client = asyncio.run(main())
+    assert [s.name for s in client.sent] == ["a [R].pdf", "b [R].pdf", "c [R].pdf"]
+    # In-memory rename: settings ka ek read (cold cache par) + journal: received, downloading, uploading, done
+    assert dict(cold.ops) == {"find_one": 1, "update_one": 4}
+    assert dict(warm.ops) == {"update_one": 4}
+    # Disk par upar se ek offset aur "downloaded" (path ke saath)
+    assert dict(disk.ops) == {"update_one": 6}
+    assert all(doc["stage"] == "done" and doc["state"] == "done" for doc in raw(db.jobs).docs.values())
+
+
+def test_ensure_indexes_creates_claim_and_history_ttl():
+    db = fake_database()
+    asyncio.run(db.ensure_indexes())
+    names = {kwargs["name"]: kwargs for _, kwargs in raw(db.jobs).indexes}
+    assert set(names) == {"claim", "state_created", "history_ttl"}
+    assert names["history_ttl"]["expireAfterSeconds"] == Config.JOB_HISTORY_TTL
+
+
+def test_batch_reserves_disk_in_episode_order(pipeline, monkeypatch):
+    # Quota mein ek hi file aati hai. E02 chhoti hai aur pehle aayi, E01 badi: agar E02 jagah le leti
+    # to E01 ki upload turn ka wait karti aur E01 usi jagah ka, dono atak jaate
+    KB = 1024
+    monkeypatch.setattr(Config, "IN_MEMORY_THRESHOLD", 16 * KB)
+    monkeypatch.setattr(fr, "scheduler", RenameScheduler(2, 2, 2))
+    monkeypatch.setattr(fr, "disk_budget", DiskBudget("downloads", 0, quota=300 * KB))
+    db = fake_database()
+    raw(db.col).docs[17] = {"_id": 17, "format_template": "{old_name} [R]"}
+    monkeypatch.setattr(fr, "DvisPappa", db)
+
+    async def main():
+        client = FakeClient()
+        msgs = [make_message(client, 17, "Show S01E02.mkv", fake_file(120 * KB)),
+                make_message(client, 17, "Show S01E01.mkv", fake_file(200 * KB))]
+        for m in msgs:
+            jobs.register(17, m.document.file_unique_id, m.document.file_name, m.document.file_size)
+        # Kisi aur user ka download 150 KB pakde hue hai: E02 abhi fit hoti hai, E01 nahi
+        async with fr.disk_budget.reserve(150 * KB, "downloads/job_other"):
+            await fr.rename_batch(client, 17, msgs)
+            while fr.scheduler.running < 2:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            assert fr.disk_budget.reserved == 150 * KB
+        while fr.scheduler.running or fr.scheduler.queued:
+            await asyncio.sleep(0.01)
+        return client
+
+    client = asyncio.run(asyncio.wait_for(main(), 10))
+    assert [s.name for s in client.sent] == ["Show S01E01 [R].mkv", "Show S01E02 [R].mkv"]
+    assert fr.disk_budget.reserved == 0
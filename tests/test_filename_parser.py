@@ -0,0 +1,74 @@
+import csv, os, re, time
+import pytest
+from helper.filename_parser import parse_filename
+
+# (naam, season, episode, quality, codec, source)
+CORPUS = [
+    ("Show.S01E05.720p.WEB-DL.x264.mkv", "01", "05", "720p", "x264", "WEB-DL"),
+    ("[SubGroup] Anime Name - 12 [1080p].mkv", None, "12", "1080p", None, None),
+    ("Anime Name [E07] 480p HEVC.mp4", None, "07", "480p", "HEVC", None),
+    ("Series S2 - 03 (2160p BluRay x265).mkv", "2", "03", "2160p", "x265", "BluRay"),
+    ("Movie.Name.2019.1080p.BluRay.H.264.mkv", None, None, "1080p", "H.264", "BluRay"),
+    ("Some Show Episode 12 4K HDRip.mp4", None, "12", "4k", None, "HdRip"),
+    ("Show S03EP04 HDTV XviD.avi", "03", "04", "Unknown", "XviD", "HDTV"),
+    ("Show Season 2 Episode 9 720P WEBRip.mkv", "2", "9", "720p", None, "WEBRip"),
+    ("Show.S10E100.1080i.AV1.mkv", "10", "100", "1080i", "AV1", None),
+    ("Film 2160p.mkv", None, None, "2160p", None, None),
+    ("notes.pdf", None, None, "Unknown", None, None),
+    ("Track 01 - Artist.mp3", None, None, "Unknown", None, None),
+]
+
+
+
+def release_names():
+    # data/release_names.tsv: scene TV, fansub, web/bluray movie aur "Episode N" naming schemes se bane
+    # ~3,400 naam, har field ki expected value ke saath (khaali column = None)
+    path = os.path.join(os.path.dirname(__file__), "data", "release_names.tsv")
+    with open(path, newline="", encoding="utf-8") as f:
+        return [tuple(v or None for v in row.values()) for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)]
+
+
+@pytest.mark.parametrize("name,season,episode,quality,codec,source", CORPUS + release_names())
+def test_corpus(name, season, episode, quality, codec, source):
+    parsed = parse_filename(name)
+    assert (parsed.season, parsed.episode, parsed.quality, parsed.codec, parsed.source) == (season, episode, quality, codec, source)
+
+
+def test_fansub_crc_and_bare_dash_episode():
+    # [CRC32] tag ke andar ka "E0..." episode nahi hai, aur "- 249.mkv" mein extension se pehle ka number episode hai
+    assert parse_filename("[EMBER] Show - 936 [E047ECB1].mkv").episode == "936"
+    assert parse_filename("[DKB] Show - 249.mkv").episode == "249"
+    assert parse_filename("Movie - 2.0 Remaster.mkv").episode is None
+
+
+# Baseline ka quality pattern, sirf benchmark ke comparison ke liye
+OLD_QUALITY = re.compile(r'\b(?:.*?(\d{3,4}[^\dp]*p).*?|.*?(\d{3,4}p))\b', re.IGNORECASE)
+
+
+def best_of(fn, arg, runs=3):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_microbenchmark_pathological_names_scale_linearly():
+    # Bahut saare numbers, koi 'p' nahi: purana pattern har position se backtrack karta tha
+    small = "1234 " * 200
+    large = "1234 " * 2000
+    new_small, new_large = best_of(parse_filename, small), best_of(parse_filename, large)
+    old_small = best_of(OLD_QUALITY.search, small)
+    per_char = new_large / len(large) * 1e6
+    print(f"\nparse_filename: {per_char:.2f} us/char on {len(large)} chars; "
+          f"1 KB name new {new_small * 1e3:.2f} ms vs old quality regex {old_small * 1e3:.2f} ms")
+    # 10x lambi string, ~10x time (quadratic hota to ~100x)
+    assert new_large < new_small * 30
+    assert new_small < old_small
+
+    corpus_names = [row[0] for row in release_names()] * 4
+    start = time.perf_counter()
+    for name in corpus_names:
+        parse_filename(name)
+    print(f"corpus: {(time.perf_counter() - start) / len(corpus_names) * 1e6:.1f} us/name")
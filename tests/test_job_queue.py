@@ -0,0 +1,77 @@
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+from helper.job_queue import SharedQueue
+from fakes import fake_database, raw
+
+
+def message(uid, msg_id):
+    return SimpleNamespace(
+        id=msg_id,
+        chat=SimpleNamespace(id=uid),
+        from_user=SimpleNamespace(id=uid),
+        document=SimpleNamespace(file_unique_id=f"u{msg_id}", file_size=1000),
+        video=None,
+        audio=None,
+    )
+
+
+class Partitioned:
+    # Worker ka Mongo connection; dead=True ke baad har call fail, jaise process mar gaya ho
+    def __init__(self, db):
+        self.db = db
+        self.dead = False
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+
+        async def call(*args, **kwargs):
+            if self.dead:
+                raise IOError("worker is gone")
+            return await attr(*args, **kwargs)
+        return call
+
+
+def test_leases_spread_jobs_across_workers_and_recover_a_dead_one():
+    db = fake_database()
+    frontend = SharedQueue(db, "frontend", 0.2, 0.05, 0.01, 3)
+    handled = Counter()
+    by_worker = Counter()
+
+    async def main():
+        for i in range(100):
+            await frontend.enqueue(message(i % 7, i))
+
+        links = {f"w{n}": Partitioned(db) for n in range(4)}
+        queues = {name: SharedQueue(link, name, 0.2, 0.05, 0.01, 3) for name, link in links.items()}
+
+        def handler(name):
+            async def handle(client, doc):
+                if name == "w0":
+                    # w0 apne claim kiye jobs ke saath "mar" jata hai: na heartbeat, na finish
+                    links["w0"].dead = True
+                    await asyncio.Event().wait()
+                await asyncio.sleep(0.005)
+                handled[doc["_id"]] += 1
+                by_worker[name] += 1
+            return handle
+
+        # Har worker max 3 jobs ek saath, jaise has_local_capacity()
+        tasks = [asyncio.create_task(q.run_worker(None, handler(name), lambda q=q: len(q._tasks) < 3)) for name, q in queues.items()]
+        while sum(handled.values()) < 100:
+            await asyncio.sleep(0.02)
+        for task in tasks:
+            task.cancel()
+        for q in queues.values():
+            for task in list(q._tasks):
+                task.cancel()
+        await asyncio.gather(*tasks, *(t for q in queues.values() for t in q._tasks), return_exceptions=True)
+
+    asyncio.run(asyncio.wait_for(main(), 20))
+    docs = raw(db.jobs).docs
+    # Har job ek hi baar poora hua, w0 ke jobs lease expire hone par baaki workers ne kiye
+    assert set(handled.values()) == {1} and len(handled) == 100
+    assert all(d["state"] == "done" and d.get("finished_at") for d in docs.values())
+    assert max(d["attempts"] for d in docs.values()) == 2
+    assert by_worker["w0"] == 0
+    assert all(by_worker[w] > 10 for w in ("w1", "w2", "w3"))
@@ -0,0 +1,152 @@
+import asyncio, os
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from config import Config
+from helper.jobs import jobs
+from helper.journal import JobJournal, journal, journal_id, workspace_name, download_complete, resumable_workspaces
+from helper.metadata import metadata_service
+from helper.scheduler import RenameScheduler
+from helper.storage import DiskBudget, sweep_orphans, workspace_path
+from fakes import FakeClient, make_message, fake_file, fake_database, raw
+
+
+def message(chat_id, msg_id, size=1000):
+    return SimpleNamespace(
+        id=msg_id,
+        chat=SimpleNamespace(id=chat_id),
+        from_user=SimpleNamespace(id=chat_id),
+        document=SimpleNamespace(file_unique_id=f"u{msg_id}", file_size=size),
+        video=None,
+        audio=None,
+    )
+
+
+def test_journal_stages_and_close_sets_finished_at(monkeypatch):
+    monkeypatch.setattr(Config, "ROLE", "all")
+    db = fake_database()
+    journal = JobJournal(db, "w1", True, 15)
+    msg = message(5, 10)
+
+    async def main():
+        await journal.received(msg)
+        await journal.stage(msg, "downloaded", path="downloads/job_5_10/a.mkv")
+        assert [d["_id"] for d in await journal.unfinished()] == ["5:10"]
+        await journal.done(msg)
+        return await journal.unfinished()
+
+    assert asyncio.run(main()) == []
+    doc = raw(db.jobs).docs[journal_id(msg)]
+    assert (doc["state"], doc["stage"], doc["path"]) == ("done", "done", "downloads/job_5_10/a.mkv")
+    # history_ttl index isi field se purane docs hatata hai
+    assert doc["finished_at"] is not None
+
+
+def test_requeued_shared_job_has_no_finished_at():
+    db = fake_database()
+
+    async def main():
+        await db.enqueue_job({"_id": "1:1", "uid": 1})
+        await db.enqueue_job({"_id": "1:2", "uid": 1})
+        a = await db.claim_job("w1", 60, 3)
+        b = await db.claim_job("w1", 60, 3)
+        await db.finish_job(a["_id"], "w1", "queued")
+        await db.finish_job(b["_id"], "w1", "done")
+
+    asyncio.run(main())
+    docs = raw(db.jobs).docs
+    assert docs["1:1"]["state"] == "queued" and "finished_at" not in docs["1:1"]
+    assert docs["1:2"]["state"] == "done" and docs["1:2"]["finished_at"] is not None
+
+
+def test_sweep_keeps_resumable_workspaces():
+    kept = workspace_path(workspace_name(5, 10))
+    os.makedirs(kept)
+    with open(os.path.join(kept, "a.mkv"), "wb") as f:
+        f.write(b"x" * 10)
+    os.makedirs(workspace_path(workspace_name(5, 11)))
+
+    removed = sweep_orphans(keep=resumable_workspaces([{"chat_id": 5, "message_id": 10}]))
+
+    assert removed == 1
+    assert os.listdir("downloads") == [os.path.basename(kept)]
+
+
+def test_download_complete_needs_full_size_and_no_parts_file():
+    os.makedirs("downloads")
+    path = os.path.join("downloads", "a.mkv")
+    with open(path, "wb") as f:
+        f.write(b"x" * 10)
+    assert download_complete(path, 10)
+    assert not download_complete(path, 11)
+    open(f"{path}.parts", "w").close()
+    assert not download_complete(path, 10)
+    assert not download_complete(None, 10)
+
+
+@pytest.mark.parametrize("stage", ["download", "upload"])
+def test_drain_timeout_leaves_running_job_for_resume(stage, monkeypatch):
+    # /restart ki deadline par ek job download ya upload ke beech mein hai. b.stop() ke baad woh normal error se
+    # fail hota hai; journal mein done nahi likhna, workspace (aur upload wale case mein poori file) rehni chahiye
+    import plugins.admin_panel as admin
+    import plugins.file_rename as fr
+    db = fake_database()
+    raw(db.col).docs[31] = {"_id": 31, "format_template": "{old_name} [R]"}
+    sched = RenameScheduler(1, 1, 1)
+    for module in (fr, admin):
+        monkeypatch.setattr(module, "scheduler", sched)
+    monkeypatch.setattr(fr, "DvisPappa", db)
+    monkeypatch.setattr(fr, "disk_budget", DiskBudget("downloads", 0, quota=64 * 1024 * 1024))
+    monkeypatch.setattr(journal, "db", db)
+    monkeypatch.setattr(journal, "enabled", True)
+    monkeypatch.setattr(journal, "_interrupted", False)
+    monkeypatch.setattr(metadata_service, "_pool", ThreadPoolExecutor(1))
+    monkeypatch.setattr(Config, "ROLE", "all")
+    monkeypatch.setattr(Config, "IN_MEMORY_THRESHOLD", 0)
+    monkeypatch.setattr(Config, "RESTART_DRAIN_TIMEOUT", 0.1)
+    execs = []
+    monkeypatch.setattr(os, "execl", lambda *args: execs.append(args))
+
+    class StoppingClient(FakeClient):
+        # stop() ke baad har MTProto call fail, jaise band session par
+        stopped = False
+
+        async def get_file(self, *args, **kwargs):
+            async for chunk in super().get_file(*args, **kwargs):
+                if self.stopped:
+                    raise ConnectionError("Client has not been started yet")
+                yield chunk
+
+        async def _send(self, *args):
+            while not self.stopped:
+                await asyncio.sleep(0.01)
+            raise ConnectionError("Client has not been started yet")
+
+        async def stop(self, block=True):
+            self.stopped = True
+
+    async def main():
+        client = StoppingClient(chunk_delay=0.05 if stage == "download" else 0)
+        msg = make_message(client, 31, "Show S01E01.mkv", fake_file(2 * 1024 * 1024))
+        jobs.register(31, msg.document.file_unique_id, msg.document.file_name, msg.document.file_size)
+        await fr.rename_batch(client, 31, [msg])
+        replies = []
+
+        async def reply_text(text, **kwargs):
+            replies.append(text)
+        await admin.graceful_restart(client, SimpleNamespace(reply_text=reply_text))
+        while sched.running:
+            await asyncio.sleep(0.01)
+        return client, msg, replies, await journal.unfinished()
+
+    client, msg, replies, unfinished = asyncio.run(main())
+    assert len(execs) == 1 and "`1` jobs" in replies[0]
+    assert [doc["_id"] for doc in unfinished] == [journal_id(msg)]
+    assert unfinished[0]["stage"] == ("downloading" if stage == "download" else "uploading")
+    workspace = workspace_path(workspace_name(31, msg.id))
+    assert os.path.isdir(workspace) and workspace in resumable_workspaces(unfinished)
+    if stage == "upload":
+        # Restart ke baad download dobara nahi hoga
+        assert download_complete(os.path.join(workspace, "Show S01E01 [R].mkv"), 2 * 1024 * 1024)
+    # User ko koi error nahi dikhaya, job chupchaap resume ke liye chhoda
+    assert not any("Error" in m.text or any("Error" in e for e in m.edits) for m in client.messages)
@@ -0,0 +1,117 @@
+import asyncio, importlib
+from types import SimpleNamespace
+from pyrogram import enums
+from pyrogram.errors import UserNotParticipant
+from config import Config
+from helper.membership import MembershipCache, NOT_MEMBER
+
+MEMBER = enums.ChatMemberStatus.MEMBER
+LEFT = enums.ChatMemberStatus.LEFT
+BANNED = enums.ChatMemberStatus.BANNED
+
+
+class MemberClient:
+    # get_chat_member ka fake: `statuses` mein jo ho wahi, warna UserNotParticipant
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.calls = []
+        self.sent = []
+
+    async def get_chat_member(self, chat, user_id):
+        self.calls.append(user_id)
+        status = self.statuses.get(user_id)
+        if status is None:
+            raise UserNotParticipant()
+        return SimpleNamespace(status=status)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def test_member_status_served_from_cache():
+    cache = MembershipCache(positive_ttl=60, negative_ttl=60, maxsize=10)
+    client = MemberClient({1: MEMBER})
+
+    async def main():
+        return [await cache.get_status(client, "chan", 1) for _ in range(3)]
+
+    assert asyncio.run(main()) == [MEMBER] * 3
+    assert client.calls == [1]
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["api_lookups"] == 1
+
+
+def test_entries_expire_and_non_members_expire_sooner():
+    cache = MembershipCache(positive_ttl=0.3, negative_ttl=0.05, maxsize=10)
+    client = MemberClient({1: MEMBER})
+
+    async def main():
+        await cache.get_status(client, "chan", 1)
+        assert await cache.get_status(client, "chan", 2) == NOT_MEMBER
+        await asyncio.sleep(0.1)
+        # Non-member ka negative TTL khatam, member abhi bhi cache mein
+        await cache.get_status(client, "chan", 1)
+        await cache.get_status(client, "chan", 2)
+        assert client.calls == [1, 2, 2]
+        await asyncio.sleep(0.3)
+        await cache.get_status(client, "chan", 1)
+
+    asyncio.run(main())
+    assert client.calls == [1, 2, 2, 1]
+
+
+def load_force_subs(monkeypatch, cache):
+    # chat_member handler sirf FORCE_SUB set hone par hi bante hain
+    monkeypatch.setattr(Config, "FORCE_SUB", "fsub_channel")
+    import plugins.force_subs as force_subs
+    force_subs = importlib.reload(force_subs)
+    monkeypatch.setattr(force_subs, "membership", cache)
+
+    async def add_user(client, message):
+        pass
+
+    monkeypatch.setattr(force_subs, "DvisPappa", SimpleNamespace(add_user=add_user))
+    return force_subs
+
+
+def member_update(user_id, new_status):
+    user = SimpleNamespace(id=user_id)
+    new = SimpleNamespace(user=user, status=new_status) if new_status else None
+    return SimpleNamespace(old_chat_member=SimpleNamespace(user=user, status=MEMBER), new_chat_member=new)
+
+
+def private_message(client, user_id):
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    return SimpleNamespace(from_user=SimpleNamespace(id=user_id), reply_text=reply_text, replies=replies)
+
+
+def test_chat_member_update_evicts_left_and_banned_members(monkeypatch):
+    cache = MembershipCache(positive_ttl=600, negative_ttl=600, maxsize=10)
+    force_subs = load_force_subs(monkeypatch, cache)
+    client = MemberClient({1: MEMBER, 2: MEMBER, 3: MEMBER})
+
+    async def main():
+        for uid in (1, 2, 3):
+            assert not await force_subs.not_subscribed(None, client, private_message(client, uid))
+        # 1 ne channel chhoda, 2 ban hua, 3 ko admin ne nikaal diya (new_chat_member nahi aata)
+        await force_subs.force_sub_member_update(client, member_update(1, LEFT))
+        await force_subs.force_sub_member_update(client, member_update(2, BANNED))
+        await force_subs.force_sub_member_update(client, member_update(3, None))
+        blocked = [await force_subs.not_subscribed(None, client, private_message(client, uid)) for uid in (1, 2, 3)]
+        left, banned = private_message(client, 1), private_message(client, 2)
+        await force_subs.forces_sub(client, left)
+        await force_subs.forces_sub(client, banned)
+        return blocked, left, banned
+
+    blocked, left, banned = asyncio.run(main())
+    # Positive TTL abhi baaki tha, phir bhi update ke baad turant block; koi naya API call nahi
+    assert blocked == [True, True, True]
+    assert client.calls == [1, 2, 3]
+    assert cache.stats()["api_lookups"] == 3
+    assert "Join" in left.replies[0]
+    assert banned.replies == [] and client.sent == [(2, "Sorry You Are Banned To Use Me")]
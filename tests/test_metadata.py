@@ -0,0 +1,101 @@
+import asyncio, io, time, wave
+from concurrent.futures import ThreadPoolExecutor
+import helper.metadata as metadata
+from helper.metadata import MetadataService, extract_sync
+from helper.storage import MemoryBudget
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz frame (header + khali data); hachoir duration frames gin kar nikalta hai
+MP3_FRAME = bytes.fromhex("FFFB9064") + bytes(413)
+
+
+def wav(seconds):
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(bytes(seconds * 16000))
+    return out.getvalue()
+
+
+def test_wav_duration_from_header():
+    assert extract_sync(wav(10), "a.wav", 64 * 1024)[0] == 10
+
+
+def test_process_pool_uses_spawn_and_parses():
+    service = MetadataService(1, True, 64 * 1024)
+    try:
+        assert service._pool._mp_context.get_start_method() == "spawn"
+        info = asyncio.run(service.extract(io.BytesIO(wav(7)), "a.wav"))
+    finally:
+        service._pool.shutdown()
+    assert info.duration == 7
+
+
+def test_in_memory_file_sends_only_header_when_budget_is_full(monkeypatch):
+    # Header mein duration nahi (mp3 bina frames ke) aur memory budget bhara hua: poori file ki copy nahi banni chahiye
+    seen = []
+
+    def recording(source, name, head_bytes, full=True):
+        seen.append(len(source))
+        return extract_sync(source, name, head_bytes, full)
+
+    monkeypatch.setattr(metadata, "extract_sync", recording)
+    monkeypatch.setattr(metadata, "memory_budget", MemoryBudget(0))
+    service = MetadataService(1, False, 64 * 1024)
+    data = bytes(1024 * 1024)
+    asyncio.run(service.extract(io.BytesIO(data), "blob.bin"))
+    assert seen == [64 * 1024]
+
+    # Budget mein jagah ho to fallback chalta hai, aur copy ka hisaab budget mein hota hai
+    budget = MemoryBudget(4 * 1024 * 1024)
+    monkeypatch.setattr(metadata, "memory_budget", budget)
+    seen.clear()
+    asyncio.run(service.extract(io.BytesIO(data), "blob.bin"))
+    assert seen == [64 * 1024, len(data)]
+    assert (budget.peak, budget.used) == (len(data), 0)
+
+
+def test_event_loop_lag_benchmark_50_jobs(tmp_path):
+    # 50 mp3 files (~4 MB) ka metadata: loop par seedha hachoir vs process pool.
+    # Ek ticker har 5 ms jaagta hai; sabse bada late-wakeup hi loop lag hai jo baaki users ko dikhta hai
+    paths = []
+    for i in range(50):
+        path = tmp_path / f"{i}.mp3"
+        path.write_bytes(MP3_FRAME * 10_000)
+        paths.append(str(path))
+
+    async def measure(extract):
+        lag = 0
+        done = False
+
+        async def ticker():
+            nonlocal lag
+            while not done:
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lag = max(lag, time.perf_counter() - start - 0.005)
+
+        tick = asyncio.create_task(ticker())
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(extract(p) for p in paths))
+        elapsed = time.perf_counter() - start
+        done = True
+        await tick
+        assert all(r.duration for r in results)
+        return lag * 1000, elapsed
+
+    async def inline(path):
+        return metadata.MediaInfo(*extract_sync(path, "a.mp3", 4 * 1024 * 1024))
+
+    service = MetadataService(2, True, 4 * 1024 * 1024)
+    try:
+        asyncio.run(service.extract(paths[0], "a.mp3"))    # spawn workers pehle se garam
+        blocking = asyncio.run(measure(inline))
+        pooled = asyncio.run(measure(lambda p: service.extract(p, "a.mp3")))
+    finally:
+        service._pool.shutdown()
+    print(f"\nmetadata, 50 jobs: inline max loop lag {blocking[0]:.0f} ms ({blocking[1]:.2f} s), "
+          f"process pool {pooled[0]:.0f} ms ({pooled[1]:.2f} s)")
+    assert pooled[0] < blocking[0]
@@ -0,0 +1,113 @@
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from pyrogram.errors import FloodWait
+from helper import metrics
+from helper.metrics import Counter, Histogram, STAGE_SECONDS, MONGO_SECONDS
+from helper.progress import ProgressReporter
+from helper.utils import render_progress
+from route import web_server
+from fakes import FakeMessage, fake_database, raw
+
+
+def mongo_count(op):
+    state = MONGO_SECONDS._values.get((op,))
+    return state[2] if state else 0
+
+
+def test_every_collection_call_is_timed_once():
+    db = fake_database(latency=0.01)
+    raw(db.jobs).docs["j1"] = {"_id": "j1", "state": "local", "created": 1}
+    ops = ("find_one", "replace_one", "delete_one", "find", "update_one")
+    before = {op: mongo_count(op) for op in ops}
+    sum_before = MONGO_SECONDS._values.get(("replace_one",), [None, 0.0, 0])[1]
+
+    async def main():
+        # Broadcast checkpoint getters pehle hath se time nahi hote the
+        await db.save_broadcast_checkpoint({"_id": "current", "done": 0})
+        await db.get_broadcast_checkpoint()
+        await db.clear_broadcast_checkpoint()
+        await db.journal_job("j2", {"state": "local"})
+        return await db.get_unfinished_jobs()
+
+    assert [job["_id"] for job in asyncio.run(main())] == ["j1"]
+    assert {op: mongo_count(op) - before[op] for op in ops} == dict.fromkeys(ops, 1)
+    # Latency await ki hai, call banne ki nahi
+    assert MONGO_SECONDS._values[("replace_one",)][1] - sum_before >= 0.01
+
+
+def scrape(text):
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            values[series] = float(value)
+    return values
+
+
+class FloodedMessage(FakeMessage):
+
+    async def edit(self, text, reply_markup=None, **kwargs):
+        raise FloodWait(value=3)
+
+
+def test_metrics_route_exposes_stage_mongo_and_floodwait_series():
+    db = fake_database()
+    reporter = ProgressReporter(render_progress, chat_interval=0, global_rate=20)
+
+    async def main():
+        client = TestClient(TestServer(await web_server()))
+        await client.start_server()
+        try:
+            async def get():
+                resp = await client.get("/metrics")
+                assert resp.status == 200
+                assert resp.headers["Content-Type"].startswith("text/plain")
+                return scrape(await resp.text())
+
+            before = await get()
+            STAGE_SECONDS.observe(2.0, stage="download")
+            await db.get_user_settings(42)
+            await reporter.report(10, 100, "📥 Downloading", FloodedMessage(None, 1, 1, ""), 0)
+            reporter.discard(FloodedMessage(None, 1, 1, ""))
+            return before, await get()
+        finally:
+            await client.close()
+
+    before, after = asyncio.run(main())
+
+    def delta(series):
+        return after.get(series, 0) - before.get(series, 0)
+
+    assert delta('rename_stage_seconds_count{stage="download"}') == 1
+    assert delta('rename_stage_seconds_sum{stage="download"}') == 2.0
+    assert delta('rename_stage_seconds_bucket{stage="download",le="2.5"}') == 1
+    assert delta('rename_stage_seconds_bucket{stage="download",le="1"}') == 0
+    assert delta('mongo_query_seconds_count{op="find_one"}') == 1
+    assert delta('mongo_query_seconds_bucket{op="find_one",le="+Inf"}') == 1
+    assert delta('mongo_queries_total{collection="user",op="find_one"}') == 1
+    assert delta('flood_waits_total{source="progress"}') == 1
+
+
+def test_perf_summary_reports_recorded_metrics(monkeypatch):
+    from plugins import admin_panel
+    # Taaza metrics, global registry (aur doosre tests ki values) se alag
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+    stages = Histogram("stage_test", "", labels=("stage",))
+    mongo = Histogram("mongo_test", "", labels=("op",))
+    floods = Counter("flood_test", "", labels=("source",))
+    queries = Counter("queries_test", "", labels=("collection", "op"))
+    for name, metric in (("STAGE_SECONDS", stages), ("MONGO_SECONDS", mongo), ("FLOOD_WAITS", floods), ("MONGO_QUERIES", queries)):
+        monkeypatch.setattr(admin_panel, name, metric)
+    stages.observe(2, stage="download")
+    stages.observe(4, stage="download")
+    stages.observe(0.5, stage="upload")
+    mongo.observe(0.004, op="find_one")
+    mongo.observe(0.006, op="find_one")
+    floods.inc(source="progress")
+    floods.inc(source="broadcast")
+    queries.inc(7, collection="user", op="find_one")
+
+    text = admin_panel.perf_summary()
+    assert "download `3.00s`" in text and "upload `0.50s`" in text and "metadata `0.00s`" in text
+    assert "**🌊 FloodWaits :** `2`" in text
+    assert "`5.0 ms` avg, `7` queries total" in text
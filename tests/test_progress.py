@@ -0,0 +1,95 @@
+import asyncio, time
+from helper.progress import ProgressReporter
+from helper.utils import render_progress
+from fakes import FakeMessage
+
+
+class TimedMessage(FakeMessage):
+    def __init__(self, chat_id, id, log):
+        super().__init__(None, chat_id, id, "")
+        self.log = log
+
+    async def edit(self, text, reply_markup=None, **kwargs):
+        self.log.append((self.chat.id, time.monotonic()))
+        return await super().edit(text, reply_markup)
+
+
+def test_500_transfers_respect_global_and_per_chat_limits():
+    # 500 transfers 100 chats mein (5 per chat), har transfer 100 callbacks ~2 s mein
+    log = []
+    messages = []
+    reporter = ProgressReporter(render_progress, chat_interval=1, global_rate=100)
+
+    async def transfer(i):
+        message = TimedMessage(i % 100, i, log)
+        messages.append(message)
+        start = time.time()
+        total = 100 * 1024 * 1024
+        for step in range(1, 101):
+            await reporter.report(step * total // 100, total, "📥 Downloading", message, start)
+            await asyncio.sleep(0.02)
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(*(transfer(i) for i in range(500)))
+        # Ruke hue aakhri states trailing edits mein jaate hain
+        while reporter.stats()["active"]:
+            await asyncio.sleep(0.05)
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    stats = reporter.stats()
+    print(f"\n500 transfers x 100 callbacks in {elapsed:.1f} s: {stats['edits']} edits, "
+          f"{stats['coalesced']} coalesced, {stats['unchanged']} unchanged, {stats['trailing']} trailing")
+    # Bucket: shuru ka burst (100) + 100/s
+    assert stats["edits"] <= 100 + 100 * elapsed + 1
+    assert stats["edits"] - stats["trailing"] + stats["coalesced"] + stats["unchanged"] == 500 * 100
+    # Har transfer ka 100% user tak pahuncha
+    assert all(m.text.startswith("📥 Downloading\n\n[■■■■■■■■■■] 100.0%") for m in messages)
+    by_chat = {}
+    for chat_id, at in log:
+        by_chat.setdefault(chat_id, []).append(at)
+    for times in by_chat.values():
+        assert all(b - a >= 1 - 0.01 for a, b in zip(times, times[1:]))
+    # Khatam transfers ki state nahi rehti
+    assert stats["active"] == 0
+
+
+def test_coalesced_state_goes_out_as_trailing_edit():
+    reporter = ProgressReporter(render_progress, chat_interval=0.2, global_rate=20)
+
+    async def main():
+        message = FakeMessage(None, 1, 1, "")
+        start = time.time()
+        # Pehla callback turant jaata hai, baaki interval ke andar coalesce
+        for current in (10, 40, 70, 100):
+            await reporter.report(current, 100, "📤 Uploading", message, start)
+        assert len(message.edits) == 1 and "10.0%" in message.text
+        while reporter.stats()["active"]:
+            await asyncio.sleep(0.02)
+        return message
+
+    message = asyncio.run(main())
+    # Beech ke 40/70 chhoote, aakhri state ek hi trailing edit mein
+    assert len(message.edits) == 2
+    assert "100.0%" in message.text
+    assert reporter.stats()["trailing"] == 1
+
+
+def test_discard_drops_pending_trailing_edit():
+    reporter = ProgressReporter(render_progress, chat_interval=0.2, global_rate=20)
+
+    async def main():
+        message = FakeMessage(None, 1, 1, "")
+        start = time.time()
+        await reporter.report(10, 100, "📥 Downloading", message, start)
+        await reporter.report(50, 100, "📥 Downloading", message, start)
+        # Download fail hua, caller message par error likhta hai
+        reporter.discard(message)
+        await message.edit("❌ Download Error")
+        await asyncio.sleep(0.4)
+        return message
+
+    message = asyncio.run(main())
+    assert message.text == "❌ Download Error"
+    assert reporter.stats()["active"] == 0
@@ -0,0 +1,262 @@
+import asyncio, random, time
+from collections import Counter
+from types import SimpleNamespace
+import helper.scheduler as scheduler_module
+from helper.scheduler import RenameScheduler, RenameJob, show_position, position_moved
+from helper.progress import ProgressReporter
+from helper.utils import render_progress
+from fakes import FakeMessage
+
+MB = 1024 * 1024
+
+
+def job(uid, size, run):
+    msg = SimpleNamespace(document=SimpleNamespace(file_size=size), video=None, audio=None)
+    return RenameJob(uid, msg, run, key=(uid, size))
+
+
+async def submit_all(sched, jobs):
+    # Sab jobs pehle line mein, phir ek saath dispatch, taaki start order sirf scheduler tay kare
+    sched.paused = True
+    for j in jobs:
+        await sched.submit(j)
+    sched.paused = False
+    sched._dispatch()
+    while sched.running or sched.queued:
+        await asyncio.sleep(0)
+
+
+def test_fairness_1000_jobs_heavy_user_cannot_starve_others():
+    # Ek user 900 files ek saath bhejta hai, phir 100 users ek-ek; round-robin mein
+    # har halka user pehle ~200 starts mein aa jaana chahiye, aur heavy user per-user cap se upar nahi
+    started = []
+    running = {}
+    peak = {}
+
+    async def run(j):
+        started.append(j.uid)
+        running[j.uid] = running.get(j.uid, 0) + 1
+        peak[j.uid] = max(peak.get(j.uid, 0), running[j.uid])
+        await asyncio.sleep(0)
+        running[j.uid] -= 1
+
+    async def main():
+        sched = RenameScheduler(5, 5, 2)
+        jobs = [job(1, MB, run) for _ in range(900)] + [job(uid, MB, run) for uid in range(2, 102)]
+        await submit_all(sched, jobs)
+        return sched
+
+    sched = asyncio.run(main())
+    assert len(started) == 1000 and sched.completed == 1000
+    first = started[:200]
+    assert set(range(2, 102)) <= set(first)
+    assert first.count(1) <= 101
+    assert max(peak.values()) <= 2
+
+
+def test_sjf_within_user_round_robin_between_users():
+    started = []
+
+    async def run(j):
+        started.append((j.uid, j.cost // MB))
+        await asyncio.sleep(0)
+
+    async def main():
+        sched = RenameScheduler(1, 1, 5)
+        await submit_all(sched, [
+            job(1, 900 * MB, run), job(1, 10 * MB, run), job(1, 300 * MB, run), job(1, 40 * MB, run),
+            job(2, 2000 * MB, run),
+        ])
+
+    asyncio.run(main())
+    # user 1 ki line size order mein, aur user 2 ki badi file user 1 ki saari files ke peeche nahi
+    assert [size for uid, size in started if uid == 1] == [10, 40, 300, 900]
+    assert started.index((2, 2000)) == 1
+
+
+def test_per_user_cap_applies_in_pipeline_mode():
+    async def measure(per_user):
+        peak = 0
+        active = 0
+
+        async def run(j):
+            nonlocal peak, active
+            active += 1
+            peak = max(peak, active)
+            async with sched.stage(j, "download"):
+                await asyncio.sleep(0.002)
+            async with sched.stage(j, "upload"):
+                await asyncio.sleep(0.002)
+            active -= 1
+
+        sched = RenameScheduler(5, 5, per_user, stage_depths={"download": 1, "upload": 1})
+        await submit_all(sched, [job(1, MB, run) for _ in range(6)])
+        return peak
+
+    assert asyncio.run(measure(1)) == 1
+    # 0 = default: download + upload depth, yaani file N ka upload aur N+1 ka download saath
+    assert asyncio.run(measure(0)) == 2
+
+
+def test_lanes_p95_simulation():
+    # 600 jobs, 200 users, har ~6 s ek job; 75% small, 18% medium, 7% large (1.5-4 GB).
+    # Har stage 20 MB/s, 5+5 slots. Waqt 1000x tez chalaya gaya hai, latencies simulated seconds mein.
+    scale = 1000
+    rate = 20 * MB
+    rng = random.Random(7)
+    plan = []
+    for i in range(600):
+        r = rng.random()
+        if r < 0.75:
+            size = rng.randint(1, 45) * MB
+        elif r < 0.93:
+            size = rng.randint(60, 900) * MB
+        else:
+            size = rng.randint(1500, 4000) * MB
+        plan.append((rng.randrange(200), size))
+
+    def lane_of(size):
+        return "small" if size <= 50 * MB else "large" if size >= 1024 * MB else "medium"
+
+    async def simulate(**lanes):
+        latencies = {"small": [], "medium": [], "large": []}
+        sched = RenameScheduler(5, 5, 0, stage_depths={"download": 1, "upload": 1}, **lanes)
+
+        async def run(j):
+            seconds = j.cost / rate / scale
+            async with sched.stage(j, "download"):
+                await asyncio.sleep(seconds)
+            async with sched.stage(j, "upload"):
+                await asyncio.sleep(seconds)
+            latencies[lane_of(j.cost)].append((time.monotonic() - j.created) * scale)
+
+        for uid, size in plan:
+            await sched.submit(job(uid, size, run))
+            await asyncio.sleep(6 / scale)
+        while sched.running or sched.queued:
+            await asyncio.sleep(0.01)
+        return {lane: sorted(v)[int(len(v) * 0.95)] for lane, v in latencies.items()}
+
+    plain = asyncio.run(simulate())
+    laned = asyncio.run(simulate(small_size=50 * MB, large_size=1024 * MB, small_reserved=1, aging_rate=10 * MB))
+    print(f"\nsimulated p95 seconds, no lanes: { {k: round(v) for k, v in plain.items()} }, "
+          f"lanes: { {k: round(v) for k, v in laned.items()} }")
+    assert laned["small"] < plain["small"]
+    assert laned["small"] < laned["medium"] < laned["large"]
+
+
+def test_pipelining_benchmark_one_user_10_files():
+    # Ek user ki 10 files, download aur upload 20 ms each. Serial: har file ke dono stages ek ke baad ek;
+    # pipelined: file N ka upload aur N+1 ka download saath
+    async def measure(**mode):
+        overlap = 0
+        in_stage = {"download": 0, "upload": 0}
+
+        async def run(j):
+            nonlocal overlap
+            for name in ("download", "upload"):
+                async with sched.stage(j, name):
+                    in_stage[name] += 1
+                    if in_stage["download"] and in_stage["upload"]:
+                        overlap += 1
+                    await asyncio.sleep(0.02)
+                    in_stage[name] -= 1
+
+        sched = RenameScheduler(5, 5, **mode)
+        start = time.perf_counter()
+        await submit_all(sched, [job(1, MB, run) for _ in range(10)])
+        return time.perf_counter() - start, overlap
+
+    serial, serial_overlap = asyncio.run(measure(per_user=1))
+    pipelined, overlap = asyncio.run(measure(per_user=0, stage_depths={"download": 1, "upload": 1}))
+    print(f"\n10 files x (20 ms down + 20 ms up): serial {serial * 1000:.0f} ms, pipelined {pipelined * 1000:.0f} ms")
+    assert serial_overlap == 0 and overlap > 0
+    assert pipelined < serial * 0.75
+
+
+def test_queue_positions_follow_round_robin_and_refresh():
+    # Heavy user ki 3 files, phir do users ki ek-ek: position round-robin order mein, aur refresher purane numbers sudharta hai
+    updates = []
+
+    async def on_position(j, position):
+        updates.append((j.uid, position))
+        return True
+
+    async def main():
+        release = asyncio.Event()
+
+        async def run(j):
+            await release.wait()
+
+        sched = RenameScheduler(1, 0, 1, refresh_interval=0.01, on_position=on_position)
+        await sched.submit(job(9, MB, run))         # akela slot pakad leta hai
+        for uid in (1, 1, 1, 2, 3):
+            await sched.submit(job(uid, MB, run))
+        await asyncio.sleep(0.05)
+        release.set()
+        while sched.running or sched.queued:
+            await asyncio.sleep(0.005)
+        return sched.positions()
+
+    left = asyncio.run(main())
+    assert updates[:5] == [(1, 1), (1, 2), (1, 3), (2, 2), (3, 3)]
+    # user 1 ki 2nd/3rd file naye users ke peeche chali gayi
+    assert (1, 4) in updates and (1, 5) in updates
+    assert left == {}
+
+
+def test_position_refresh_stays_within_edit_budget(monkeypatch):
+    # 300 users ki ek-ek file line mein, har dequeue par sabki position badalti hai.
+    # Refresh edits shared bucket (burst 20 + 20/s) ke andar, aur peeche wale sirf ~10% badlav par
+    reporter = ProgressReporter(render_progress, chat_interval=1, global_rate=20)
+    monkeypatch.setattr(scheduler_module, "progress_reporter", reporter)
+    edits = Counter()
+
+    class Status(FakeMessage):
+        async def edit(self, text, reply_markup=None, **kwargs):
+            edits[self.chat.id] += 1
+            return await super().edit(text, reply_markup)
+
+    def queued_job(uid, run):
+        j = job(uid, MB, run)
+
+        async def reply_text(text, reply_markup=None):
+            return Status(None, uid, uid, text, reply_markup)
+        j.msg.reply_text = reply_text
+        return j
+
+    async def main():
+        turns = asyncio.Semaphore(0)
+
+        async def run(j):
+            await turns.acquire()
+
+        sched = RenameScheduler(1, 0, 1, refresh_interval=0.05, on_position=show_position)
+        waiting = [queued_job(uid, run) for uid in range(1, 302)]
+        for j in waiting:
+            await sched.submit(j)
+        # Submit par andazan position (O(depth)) yahan round-robin wali se milti hai
+        assert [j.position for j in waiting[1:]] == list(range(1, 301))
+        start = time.monotonic()
+        for _ in range(20):
+            turns.release()
+            await asyncio.sleep(0.05)
+        elapsed, made = time.monotonic() - start, sum(edits.values())
+        for _ in range(300):
+            turns.release()
+        while sched.running or sched.queued:
+            await asyncio.sleep(0.01)
+        return elapsed, made, waiting
+
+    elapsed, made, waiting = asyncio.run(main())
+    print(f"\n20 dequeues with 300 waiting: {made} position edits in {elapsed:.2f} s")
+    assert made <= 20 + 20 * elapsed + 1
+    # Aage wale users ko naya number mila, line ke peeche (position 200+) 20 ka badlav edit layak nahi
+    assert any(edits[uid] for uid in range(22, 40))
+    assert not any(edits[uid] for uid in range(200, 302))
+
+
+def test_position_moved():
+    assert position_moved(None, 7)
+    assert position_moved(5, 4)
+    assert not position_moved(300, 280) and position_moved(300, 270)
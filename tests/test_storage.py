@@ -0,0 +1,74 @@
+import asyncio, os, random
+import pytest
+from helper.storage import DiskBudget, MemoryBudget, StorageFull, job_workspace, sweep_orphans, ACTIVE_WORKSPACES
+
+MB = 1024 * 1024
+
+
+def test_workspace_removed_even_when_job_fails():
+    with pytest.raises(RuntimeError):
+        with job_workspace("5_10") as path:
+            with open(os.path.join(path, "Show E01.mkv"), "wb") as f:
+                f.write(b"x")
+            assert path in ACTIVE_WORKSPACES
+            raise RuntimeError("upload failed")
+    assert not os.path.exists(path)
+    assert path not in ACTIVE_WORKSPACES
+
+
+def test_same_file_name_for_two_users_does_not_collide():
+    with job_workspace("1_1") as a, job_workspace("2_1") as b:
+        for path, data in ((a, b"first"), (b, b"second")):
+            with open(os.path.join(path, "Show E01.mkv"), "wb") as f:
+                f.write(data)
+        assert open(os.path.join(a, "Show E01.mkv"), "rb").read() == b"first"
+
+
+def test_sweep_keeps_thumbs_active_and_resumable_dirs():
+    os.makedirs("downloads/thumbs")
+    for name in ("job_orphan", "job_resume"):
+        os.makedirs(f"downloads/{name}")
+    open("downloads/stray.part", "wb").close()
+    with job_workspace("active") as active:
+        removed = sweep_orphans(keep={"downloads/job_resume"})
+        assert os.path.isdir(active)
+    assert removed == 2
+    assert sorted(os.listdir("downloads")) == ["job_resume", "thumbs"]
+
+
+def test_memory_budget_never_overcommits():
+    budget = MemoryBudget(10 * MB)
+    assert budget.try_reserve(6 * MB)
+    assert not budget.try_reserve(5 * MB)       # disk wale raaste par jayega
+    budget.release(6 * MB)
+    assert budget.try_reserve(10 * MB) and budget.peak == 10 * MB
+
+
+def test_disk_budget_with_fake_quota_never_exceeds_it():
+    # 30 downloads, 100-900 MB, 2 GB quota; reserved kabhi quota se upar nahi, sab aakhir mein chalte hain
+    quota = 2048 * MB
+    rng = random.Random(5)
+    sizes = [rng.randint(100, 900) * MB for _ in range(30)]
+
+    async def main():
+        budget = DiskBudget("downloads", 0, quota=quota)
+        peak = 0
+        waited = 0
+
+        async def download(i, size):
+            nonlocal peak, waited
+            waited += budget.would_wait(size)
+            async with budget.reserve(size, f"downloads/job_{i}"):
+                peak = max(peak, budget.reserved)
+                await asyncio.sleep(rng.random() * 0.01)
+
+        await asyncio.gather(*(download(i, s) for i, s in enumerate(sizes)))
+        with pytest.raises(StorageFull):
+            async with budget.reserve(quota + 1, "downloads/job_big"):
+                pass
+        return budget, peak, waited
+
+    budget, peak, waited = asyncio.run(main())
+    assert peak <= quota
+    assert waited > 0
+    assert (budget.reserved, budget.waiting) == (0, 0)
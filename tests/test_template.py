@@ -0,0 +1,39 @@
+import time
+from helper.template import compile_filename_template, compile_caption_template, render
+
+VALUES = {"episode": "05", "quality": "720p", "old_name": "Show.S01E05"}
+
+
+def test_braced_placeholders_keep_bare_words_literal():
+    tokens = compile_filename_template("Episode Guide {episode} [{quality}]")
+    assert render(tokens, VALUES) == "Episode Guide 05 [720p]"
+
+
+def test_bare_keywords_without_braces_keep_old_behaviour():
+    # Sirf pehla "episode" placeholder hai, quality har jagah
+    assert render(compile_filename_template("Show episode quality episode"), VALUES) == "Show 05 720p episode"
+
+
+def test_unknown_keys_escapes_and_missing_values_never_raise():
+    tokens = compile_caption_template("{filename} {{raw}} {unknown} {duration} {")
+    assert render(tokens, {"filename": "a.mkv", "duration": None}) == "a.mkv {raw} {unknown} {duration} {"
+
+
+def test_render_benchmark():
+    # Compiled tokens (cache se) vs har file par compile + render
+    template = "[Group] {old_name} - E{episode} [{quality}] episode special"
+    tokens = compile_filename_template(template)
+    n = 20_000
+
+    start = time.perf_counter()
+    for _ in range(n):
+        render(tokens, VALUES)
+    cached = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for _ in range(n):
+        render(compile_filename_template(template), VALUES)
+    uncached = (time.perf_counter() - start) / n
+
+    print(f"\ntemplate render: {cached * 1e6:.2f} us cached tokens, {uncached * 1e6:.2f} us compile + render")
+    assert cached < uncached
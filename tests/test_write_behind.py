@@ -0,0 +1,107 @@
+import asyncio, time
+from types import SimpleNamespace
+from config import Config
+from helper.job_queue import SharedQueue
+from fakes import fake_database, raw
+
+
+def message(uid, msg_id):
+    return SimpleNamespace(
+        id=msg_id,
+        chat=SimpleNamespace(id=uid),
+        from_user=SimpleNamespace(id=uid),
+        document=SimpleNamespace(file_unique_id=f"u{msg_id}", file_size=1000),
+        video=None,
+        audio=None,
+    )
+
+
+def test_overlay_shows_buffered_writes_before_flush():
+    db = fake_database(write_behind=True)
+    raw(db.col).docs[7] = {"_id": 7, "caption": None, "format_template": None, "file_id": None}
+
+    async def main():
+        await db.set_format_template(7, "{old_name} v2")
+        db.settings_cache.pop(7)
+        return await db.get_user_settings(7)
+
+    assert asyncio.run(main()).format_template == "{old_name} v2"
+    assert raw(db.col).docs[7]["format_template"] is None     # abhi Mongo tak nahi gaya
+
+
+def test_enqueue_flushes_users_pending_writes_for_worker():
+    # Frontend ka write buffer mein hai; worker alag process hai, uska get_user_settings(fresh=True)
+    # sirf Mongo dekhta hai, isliye enqueue se pehle woh write likha jana chahiye
+    frontend = fake_database(write_behind=True)
+    worker = fake_database()
+    worker.col = frontend.col
+    raw(frontend.col).docs[7] = {"_id": 7, "caption": None, "format_template": None, "file_id": None}
+    raw(frontend.col).docs[8] = {"_id": 8, "caption": None, "format_template": None, "file_id": None}
+    queue = SharedQueue(frontend, "frontend", 30, 10, 1, 3)
+
+    async def main():
+        await frontend.set_format_template(7, "{old_name} v2")
+        await frontend.set_caption(8, "other user")
+        await queue.enqueue(message(7, 1))
+        return await worker.get_user_settings(7, fresh=True)
+
+    assert asyncio.run(main()).format_template == "{old_name} v2"
+    assert raw(frontend.jobs).docs["7:1"]["state"] == "queued"
+    # Sirf job wale user ka write gaya, baaki batch ke liye ruke rahe
+    assert raw(frontend.col).docs[8]["caption"] is None
+    assert len(frontend.writes) == 1
+
+
+def test_failed_user_flush_keeps_write_buffered():
+    db = fake_database(write_behind=True)
+    raw(db.col).docs[7] = {"_id": 7, "caption": None, "format_template": None, "file_id": None}
+
+    async def main():
+        await db.set_caption(7, "a")
+        raw(db.col).fail = 1
+        try:
+            await db.sync_user(7)
+        except IOError:
+            pass
+        else:
+            raise AssertionError("flush failure swallowed")
+        await db.set_format_template(7, "b")
+        await db.writes.flush()
+
+    asyncio.run(main())
+    assert (raw(db.col).docs[7]["caption"], raw(db.col).docs[7]["format_template"]) == ("a", "b")
+    assert len(db.writes) == 0
+
+
+def test_write_behind_benchmark_10k_users(monkeypatch):
+    # 10k users ek-ek setting badlein: direct update_one vs write-behind bulk_write.
+    # 1 ms simulated Mongo round trip, aur Motor ka apna connection pool limit (100) semaphore se
+    users = 10_000
+    latency = 0.001
+
+    async def run(write_behind):
+        monkeypatch.setattr(Config, "WRITE_BATCH_SIZE", 500)
+        db = fake_database(latency=latency, write_behind=write_behind)
+        raw(db.col).docs = {uid: {"_id": uid, "caption": None} for uid in range(users)}
+        pool = asyncio.Semaphore(100)
+        original = raw(db.col)._op
+
+        async def limited(name):
+            async with pool:
+                await original(name)
+        raw(db.col)._op = limited
+        start = time.perf_counter()
+        await asyncio.gather(*(db.set_caption(uid, f"c{uid}") for uid in range(users)))
+        if db.writes is not None:
+            await db.writes.flush()
+        elapsed = time.perf_counter() - start
+        assert all(doc["caption"] == f"c{doc['_id']}" for doc in raw(db.col).docs.values())
+        return elapsed, len(raw(db.col).calls)
+
+    direct, direct_calls = asyncio.run(run(False))
+    buffered, buffered_calls = asyncio.run(run(True))
+    print(f"\nwrite-behind, {users} users: direct {users / direct:,.0f} ops/s ({direct_calls} round trips), "
+          f"buffered {users / buffered:,.0f} ops/s ({buffered_calls} round trips)")
+    assert direct_calls == users
+    assert buffered_calls <= users // 500 + 1
+    assert buffered < direct